@@ -0,0 +1,21 @@
+/**
+ * Compilation variants measured by `scripts/benchmark.js`: the flags read by
+ * `environment_config()` of the token contracts. `scripts/matrix.js` covers
+ * every combination.
+ *
+ * @format
+ */
+
+const defaults = {
+  debug_mode: false,
+  readable: true,
+  force_layouts: true,
+  lazy_entry_points: false,
+  lazy_entry_points_multiple: false,
+};
+
+module.exports = {
+  default: defaults,
+  lazy_entry_points: { ...defaults, lazy_entry_points: true },
+  lazy_entry_points_multiple: { ...defaults, lazy_entry_points_multiple: true },
+};
@@ -0,0 +1,901 @@
+/**
+ * Standard workloads measured by `scripts/benchmark.js` and
+ * `scripts/matrix.js`, one per token standard.
+ *
+ * The compilation targets are originated in order, then the steps are
+ * applied in order. Arguments are plain objects keyed by the field names of
+ * the entrypoint parameters, and are encoded against each variant's compiled
+ * parameter type, so the same workloads run on every layout. Steps marked
+ * `setup` are applied but not reported.
+ *
+ * @format
+ */
+const crypto = require("crypto");
+const { MichelsonMap } = require("@taquito/michelson-encoder");
+const { b58cencode, prefix, Prefix } = require("@taquito/utils");
+const merkle = require("../scripts/merkle");
+
+// stand-in investor addresses
+const investors = (count) =>
+  Array.from({ length: count }, (_, i) =>
+    b58cencode(
+      crypto.createHash("sha256").update(`investor ${i}`).digest().subarray(0, 20),
+      prefix[Prefix.TZ1]
+    )
+  );
+
+// Storage is seeded in chunks of 250 entries per operation.
+const CHUNK = 250;
+const chunks = (items) =>
+  Array.from({ length: Math.ceil(items.length / CHUNK) }, (_, i) =>
+    items.slice(i * CHUNK, (i + 1) * CHUNK)
+  );
+
+// Merkle tree of 2^17 approved accounts: `account` and stand-in leaves.
+const MERKLE_LEAVES = 1 << 17;
+const merkleTrees = {};
+function merkleTree(account) {
+  if (!merkleTrees[account]) {
+    const leaves = [merkle.leaf(account)];
+    for (let i = 1; i < MERKLE_LEAVES; i++) {
+      leaves.push(crypto.createHash("sha256").update(`investor ${i}`).digest());
+    }
+    merkleTrees[account] = merkle.build(leaves);
+  }
+  return merkleTrees[account];
+}
+
+module.exports = {
+  st12: {
+    contracts: [
+      {
+        name: "whitelist",
+        source: "contracts/compliance/Whitelist.py",
+        target: "Whitelist_compiled",
+      },
+      {
+        name: "validator",
+        source: "contracts/extension/WhitelistValidator.py",
+        target: "WhitelistValidator_compiled",
+        // compiled without storage: the address of the Whitelist
+        storage: ({ whitelist }) => ({ string: whitelist }),
+      },
+      {
+        name: "escrow",
+        source: "contracts/wallet/VestingEscrowMinterBurnerWallet.py",
+        target: "VestingEscrowMinterBurnerWallet_compiled",
+      },
+      {
+        name: "token",
+        source: "contracts/token/FA1.2.py",
+        target: "ST12_compiled",
+      },
+    ],
+
+    // addresses of the compilation targets' storage -> mockup accounts or
+    // originated contracts
+    addresses: {
+      tz1f6KNARa6KykKhoxAugtKwohmEfz8jrvUH: "bootstrap1",
+      tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr: "bootstrap1",
+      KT1QkFxZqfCok6LZUJ7zDn6gCDBS7kSao26P: "validator",
+      KT1S3M3Cn7XBLcNi54cfvMP15j9ew4W4eb1C: "escrow",
+    },
+
+    steps: [
+      {
+        name: "addToWhitelist",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap2 }) => ({ token, account: bootstrap2 }),
+      },
+      {
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap3, escrow }) => [{ token, accounts: [bootstrap3, escrow] }],
+      },
+      {
+        name: "assertValid",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap2 }) => ({ token, account: bootstrap2 }),
+      },
+      {
+        name: "mint",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [{ address: bootstrap2, amount: 1000 }],
+      },
+      {
+        name: "transfer",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ from_: bootstrap2, to_: bootstrap3, value: 10 }),
+      },
+      {
+        name: "transferMultiple",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => [
+          { from_: bootstrap2, to_: bootstrap3, value: 10 },
+          { from_: bootstrap2, to_: bootstrap3, value: 20 },
+        ],
+      },
+      {
+        name: "approve",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap3 }) => ({ spender: bootstrap3, value: 100 }),
+      },
+      {
+        setup: true,
+        name: "addVestingPlan",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: ({ token }) => ({
+          start: "2020-01-01T00:00:00Z",
+          cliff: "2020-06-01T00:00:00Z",
+          end: "2021-01-01T00:00:00Z",
+          token_address: token,
+          token_id: null,
+          metadata: null,
+        }),
+      },
+      {
+        name: "vest",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => [
+          { beneficiery: bootstrap3, plan_id: 0, vesting_amount: 100, label: null },
+        ],
+      },
+      {
+        name: "claim",
+        contract: "escrow",
+        sender: "bootstrap3",
+      },
+    ],
+  },
+
+  // ST2 is compiled without validators, so transfers need no Whitelist. The
+  // steps move a single unit of token 0, which every FA2_config allows
+  // (single_asset, non_fungible).
+  st2: {
+    contracts: [
+      {
+        name: "token",
+        source: "contracts/token/FA2.py",
+        target: "ST2_compiled",
+      },
+    ],
+
+    addresses: {
+      tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr: "bootstrap1",
+    },
+
+    steps: [
+      {
+        name: "mint",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [
+          { address: bootstrap2, amount: 1, token_id: 0, metadata: new MichelsonMap() },
+        ],
+      },
+      {
+        name: "transfer",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => [
+          { from_: bootstrap2, txs: [{ to_: bootstrap3, token_id: 0, amount: 1 }] },
+        ],
+      },
+      {
+        name: "transferMultiple",
+        contract: "token",
+        sender: "bootstrap3",
+        arg: ({ bootstrap2, bootstrap3 }) => [
+          { from_: bootstrap3, to_: bootstrap2, token_id: 0, amount: 1 },
+        ],
+      },
+      {
+        name: "update_operators",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => [
+          { add_operator: { owner: bootstrap2, operator: bootstrap3, token_id: 0 } },
+        ],
+      },
+    ],
+  },
+};
+
+// ST12 in push mode: the Whitelist pushes the valid accounts to the token,
+// which checks them locally instead of reading the WhitelistValidator.
+// Compare its `transfer` with the one of `st12`.
+module.exports.st12_push = {
+  ...module.exports.st12,
+  steps: [
+    {
+      setup: true,
+      name: "setWhitelist",
+      contract: "token",
+      sender: "bootstrap1",
+      arg: ({ whitelist }) => whitelist,
+    },
+    {
+      setup: true,
+      name: "addSubscriber",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ token }) => token,
+    },
+    {
+      setup: true,
+      name: "revokeRole",
+      contract: "token",
+      sender: "bootstrap1",
+      // VALIDATOR_ROLE
+      arg: ({ validator }) => [{ role: 5, account: validator }],
+    },
+    ...module.exports.st12.steps,
+  ],
+};
+
+// Merkle whitelist: `proveMembership` checks a proof of depth 17, then the
+// cached entry is read by `assertValid`, a direct big-map lookup.
+module.exports.merkle = {
+  contracts: [module.exports.st12.contracts[0]],
+
+  addresses: module.exports.st12.addresses,
+
+  steps: [
+    {
+      setup: true,
+      name: "setMerkleRoot",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap2, bootstrap3 }) => ({
+        token: bootstrap3,
+        root: merkle.root(merkleTree(bootstrap2)).toString("hex"),
+      }),
+    },
+    {
+      name: "proveMembership",
+      contract: "whitelist",
+      sender: "bootstrap2",
+      arg: ({ bootstrap2, bootstrap3 }) => ({
+        token: bootstrap3,
+        account: bootstrap2,
+        proof: merkle.proof(merkleTree(bootstrap2), 0).map((node) => node.toString("hex")),
+      }),
+    },
+    {
+      name: "assertValid",
+      contract: "whitelist",
+      sender: "bootstrap2",
+      arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+    },
+  ],
+};
+
+// Onboarding a base of 5,000 investors onto a new token: per account, in
+// chunks of 250 (`addToWhitelistBatch i/20`), against admitting their group
+// once. Both are followed by an `assertValid` of the last investor.
+const GROUP_INVESTORS = 5000;
+const groupInvestors = chunks(investors(GROUP_INVESTORS));
+const lastInvestor = groupInvestors[groupInvestors.length - 1].slice(-1)[0];
+
+module.exports.groups = {
+  contracts: [module.exports.st12.contracts[0]],
+
+  addresses: module.exports.st12.addresses,
+
+  steps: [
+    ...groupInvestors.map((accounts, i) => ({
+      setup: true,
+      label: `setInvestorGroups ${i + 1}/${groupInvestors.length}`,
+      name: "setInvestorGroups",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: () => accounts.map((account) => ({ account, group: 1 })),
+    })),
+    ...groupInvestors.map((accounts, i) => ({
+      label: `addToWhitelistBatch ${i + 1}/${groupInvestors.length}`,
+      name: "addToWhitelistBatch",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap2 }) => [{ token: bootstrap2, accounts }],
+    })),
+    {
+      label: "assertValid (account)",
+      name: "assertValid",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap2 }) => ({ token: bootstrap2, account: lastInvestor }),
+    },
+    {
+      name: "admitGroup",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap3 }) => ({ token: bootstrap3, group: 1, members: [] }),
+    },
+    {
+      label: "assertValid (group)",
+      name: "assertValid",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap3 }) => ({ token: bootstrap3, account: lastInvestor }),
+    },
+  ],
+};
+
+// `assertValid` of a whitelisted account against blacklists of growing size
+// (`blacklist_<size>`), seeded with stand-in accounts in chunks of 250.
+// Compare the `assertValid` gas of the workloads: the blacklist is a big-map,
+// so it should not grow with the size.
+const BLACKLIST_SIZES = [0, 1000, 10000];
+
+for (const size of BLACKLIST_SIZES) {
+  module.exports[`blacklist_${size}`] = {
+    contracts: [module.exports.st12.contracts[0]],
+
+    addresses: module.exports.st12.addresses,
+
+    steps: [
+      ...chunks(investors(size)).map((accounts) => ({
+        setup: true,
+        name: "addToBlacklistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: () => accounts,
+      })),
+      {
+        setup: true,
+        name: "addToWhitelist",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+      },
+      {
+        name: "assertValid",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+      },
+      {
+        name: "addToBlacklist",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => ({ account: bootstrap2 }),
+      },
+    ],
+  };
+}
+
+// Scaling of the Whitelist (`whitelist_<size>`): `size` stand-in accounts are
+// whitelisted for the token before an account is checked, added and removed.
+// Every entry has its own big-map slot, so the measured gas should not grow
+// with the size.
+const WHITELIST_SIZES = [10, 1000, 10000];
+
+for (const size of WHITELIST_SIZES) {
+  module.exports[`whitelist_${size}`] = {
+    contracts: [module.exports.st12.contracts[0]],
+
+    addresses: module.exports.st12.addresses,
+
+    steps: [
+      ...chunks(investors(size)).map((accounts) => ({
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => [{ token: bootstrap3, accounts }],
+      })),
+      {
+        label: "assertValid (seeded)",
+        name: "assertValid",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => ({ token: bootstrap3, account: investors(1)[0] }),
+      },
+      {
+        name: "addToWhitelist",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+      },
+      {
+        name: "assertValid",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+      },
+      {
+        name: "removeFromWhitelist",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ token: bootstrap3, account: bootstrap2 }),
+      },
+    ],
+  };
+}
+
+// Amortized cost of batch whitelisting: one `addToWhitelist` against
+// `addToWhitelistBatch` calls of 1, 50 and 500 distinct accounts. Divide the
+// gas of each batch by its size to compare the cost per entry.
+const BATCH_SIZES = [1, 50, 500];
+const batchAccounts = investors(BATCH_SIZES.reduce((total, size) => total + size, 1));
+
+module.exports.whitelist_batch = {
+  contracts: [module.exports.st12.contracts[0]],
+
+  addresses: module.exports.st12.addresses,
+
+  steps: [
+    {
+      name: "addToWhitelist",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ bootstrap3 }) => ({ token: bootstrap3, account: batchAccounts[0] }),
+    },
+    ...BATCH_SIZES.map((size, i) => {
+      const start = 1 + BATCH_SIZES.slice(0, i).reduce((total, n) => total + n, 0);
+      return {
+        label: `addToWhitelistBatch (${size})`,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => [
+          { token: bootstrap3, accounts: batchAccounts.slice(start, start + size) },
+        ],
+      };
+    }),
+  ],
+};
+
+// Scaling of the vesting escrow (`escrow_<size>`): `size` schedules are
+// vested to up to 1,000 stand-in beneficieries before bootstrap2 vests and
+// claims a single schedule. A claim only loads the claimer's schedules, so
+// the measured gas should not grow with the size.
+const ESCROW_SIZES = [10, 1000, 10000];
+const ESCROW_BENEFICIERIES = investors(1000);
+
+for (const size of ESCROW_SIZES) {
+  const schedules = Array.from({ length: size }, (_, i) => ({
+    beneficiery: ESCROW_BENEFICIERIES[i % ESCROW_BENEFICIERIES.length],
+    plan_id: 0,
+    vesting_amount: 100,
+    label: null,
+  }));
+
+  module.exports[`escrow_${size}`] = {
+    ...module.exports.st12,
+
+    steps: [
+      {
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap2, escrow }) => [{ token, accounts: [bootstrap2, escrow] }],
+      },
+      // the `addVestingPlan` step of `st12`
+      module.exports.st12.steps.find((step) => step.name === "addVestingPlan"),
+      ...chunks(schedules).map((vests) => ({
+        setup: true,
+        name: "vest",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: () => vests,
+      })),
+      {
+        name: "vest",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [
+          { beneficiery: bootstrap2, plan_id: 0, vesting_amount: 100, label: null },
+        ],
+      },
+      {
+        name: "claim",
+        contract: "escrow",
+        sender: "bootstrap2",
+      },
+    ],
+  };
+}
+
+// `vest` calls of 1, 10 and 50 schedules of the same plan, which mint once
+// for the whole call. `scripts/cost-model.js` derives the fixed and
+// per-schedule gas of a call from the smallest and largest, and checks the
+// middle one against them.
+const VEST_BATCH_SIZES = [1, 10, 50];
+const vestBeneficieries = investors(VEST_BATCH_SIZES[VEST_BATCH_SIZES.length - 1]);
+
+module.exports.vest_batch = {
+  ...module.exports.st12,
+
+  steps: [
+    {
+      setup: true,
+      name: "addToWhitelistBatch",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ token, escrow }) => [{ token, accounts: [escrow] }],
+    },
+    module.exports.st12.steps.find((step) => step.name === "addVestingPlan"),
+    ...VEST_BATCH_SIZES.map((size) => ({
+      label: `vest (${size})`,
+      name: "vest",
+      contract: "escrow",
+      sender: "bootstrap1",
+      arg: () =>
+        vestBeneficieries
+          .slice(0, size)
+          .map((beneficiery) => ({ beneficiery, plan_id: 0, vesting_amount: 100, label: null })),
+    })),
+  ],
+};
+
+// Balance operations of an ST12 holder with 0, 10 and 100 allowances
+// (`approvals_<count>`). The allowances are kept in their own big-map, so the
+// measured gas should not grow with the count.
+const APPROVAL_COUNTS = [0, 10, 100];
+
+for (const count of APPROVAL_COUNTS) {
+  module.exports[`approvals_${count}`] = {
+    ...module.exports.st12,
+
+    steps: [
+      {
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap2, bootstrap3 }) => [{ token, accounts: [bootstrap2, bootstrap3] }],
+      },
+      {
+        setup: true,
+        name: "mint",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [{ address: bootstrap2, amount: 1000 }],
+      },
+      ...investors(count).map((spender) => ({
+        setup: true,
+        name: "approve",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: () => ({ spender, value: 1 }),
+      })),
+      {
+        name: "mint",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [{ address: bootstrap2, amount: 1 }],
+      },
+      {
+        name: "transfer",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ from_: bootstrap2, to_: bootstrap3, value: 1 }),
+      },
+      {
+        name: "burn",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [{ address: bootstrap2, amount: 1 }],
+      },
+    ],
+  };
+}
+
+// The ST12 contracts and an ST2 token, which the escrow mints as a minter.
+const MINTER_ROLE = 2;
+const withFA2 = {
+  contracts: [
+    ...module.exports.st12.contracts,
+    { ...module.exports.st2.contracts[0], name: "fa2" },
+  ],
+
+  addresses: module.exports.st12.addresses,
+};
+
+const decimals = () => {
+  const metadata = new MichelsonMap();
+  metadata.set("decimals", Buffer.from("18").toString("hex"));
+  return metadata;
+};
+
+// `vest` of 10, 100 and 500 schedules (`vest_<size>`) spread over a plan of
+// the ST12 token and a plan of token 0 of the ST2 token: the escrow mints
+// once per token contract, so `internal_operations` should stay at 2.
+const VEST_SIZES = [10, 100, 500];
+
+for (const size of VEST_SIZES) {
+  const beneficieries = investors(size);
+
+  module.exports[`vest_${size}`] = {
+    ...withFA2,
+
+    steps: [
+      {
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, escrow }) => [{ token, accounts: [escrow] }],
+      },
+      {
+        setup: true,
+        name: "grantRole",
+        contract: "fa2",
+        sender: "bootstrap1",
+        arg: ({ escrow }) => [{ role: MINTER_ROLE, account: escrow }],
+      },
+      // plan 0: the `addVestingPlan` step of `st12`
+      module.exports.st12.steps.find((step) => step.name === "addVestingPlan"),
+      {
+        setup: true,
+        name: "addVestingPlan",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: ({ fa2 }) => ({
+          start: "2020-01-01T00:00:00Z",
+          cliff: "2020-06-01T00:00:00Z",
+          end: "2021-01-01T00:00:00Z",
+          token_address: fa2,
+          token_id: 0,
+          metadata: decimals(),
+        }),
+      },
+      {
+        label: `vest (${size})`,
+        name: "vest",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: () =>
+          beneficieries.map((beneficiery, i) => ({
+            beneficiery,
+            plan_id: i % 2,
+            vesting_amount: 100,
+            label: null,
+          })),
+      },
+    ],
+  };
+}
+
+// Claims of a beneficiery with 50 schedules of which 45 have ended
+// (`claim_finished`): the first claim settles and prunes them, the second one
+// only iterates over the 5 schedules of a plan still vesting.
+const CLAIM_SCHEDULES = 50;
+const CLAIM_FINISHED = 45;
+
+module.exports.claim_finished = {
+  ...module.exports.st12,
+
+  steps: [
+    {
+      setup: true,
+      name: "addToWhitelistBatch",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ token, bootstrap2, escrow }) => [{ token, accounts: [bootstrap2, escrow] }],
+    },
+    // plan 0, ended: the `addVestingPlan` step of `st12`
+    module.exports.st12.steps.find((step) => step.name === "addVestingPlan"),
+    {
+      setup: true,
+      name: "addVestingPlan",
+      contract: "escrow",
+      sender: "bootstrap1",
+      arg: ({ token }) => ({
+        start: "2020-01-01T00:00:00Z",
+        cliff: "2020-06-01T00:00:00Z",
+        end: "2100-01-01T00:00:00Z",
+        token_address: token,
+        token_id: null,
+        metadata: null,
+      }),
+    },
+    {
+      setup: true,
+      name: "vest",
+      contract: "escrow",
+      sender: "bootstrap1",
+      arg: ({ bootstrap2 }) =>
+        Array.from({ length: CLAIM_SCHEDULES }, (_, i) => ({
+          beneficiery: bootstrap2,
+          plan_id: i < CLAIM_FINISHED ? 0 : 1,
+          vesting_amount: 100,
+          label: null,
+        })),
+    },
+    {
+      label: "claim (first)",
+      name: "claim",
+      contract: "escrow",
+      sender: "bootstrap2",
+    },
+    {
+      label: "claim (pruned)",
+      name: "claim",
+      contract: "escrow",
+      sender: "bootstrap2",
+    },
+  ],
+};
+
+// Keeper settlement (`keeper_<max>`): 100 beneficieries with 4 schedules
+// each of an ended ST2 plan are queued, then settled by `processClaims`
+// calls of at most 20, 100 and 400 schedules. Compare the gas of a call with
+// the operation gas limit to choose the budget.
+const KEEPER_BUDGETS = [20, 100, 400];
+const KEEPER_SCHEDULES = 4;
+const keeperBeneficieries = investors(100);
+
+for (const budget of KEEPER_BUDGETS) {
+  const calls = Math.ceil((keeperBeneficieries.length * KEEPER_SCHEDULES) / budget);
+  const schedules = keeperBeneficieries.flatMap((beneficiery) =>
+    Array.from({ length: KEEPER_SCHEDULES }, () => ({
+      beneficiery,
+      plan_id: 0,
+      vesting_amount: 100,
+      label: null,
+    }))
+  );
+
+  module.exports[`keeper_${budget}`] = {
+    ...withFA2,
+
+    steps: [
+      {
+        setup: true,
+        name: "grantRole",
+        contract: "fa2",
+        sender: "bootstrap1",
+        arg: ({ escrow }) => [{ role: MINTER_ROLE, account: escrow }],
+      },
+      {
+        setup: true,
+        name: "addVestingPlan",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: ({ fa2 }) => ({
+          start: "2020-01-01T00:00:00Z",
+          cliff: "2020-06-01T00:00:00Z",
+          end: "2021-01-01T00:00:00Z",
+          token_address: fa2,
+          token_id: 0,
+          metadata: decimals(),
+        }),
+      },
+      ...chunks(schedules).map((vests) => ({
+        setup: true,
+        name: "vest",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: () => vests,
+      })),
+      {
+        setup: true,
+        name: "queueClaims",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: () => keeperBeneficieries,
+      },
+      ...Array.from({ length: calls }, (_, i) => ({
+        label: `processClaims (${budget}) ${i + 1}/${calls}`,
+        name: "processClaims",
+        contract: "escrow",
+        sender: "bootstrap1",
+        arg: () => budget,
+      })),
+    ],
+  };
+}
+
+// Storage of 1,000 beneficieries vested on a single plan (`plan_1000`): the
+// dates and token are stored once by `addVestingPlan`, then each `vest` call
+// of 250 schedules only pays for the schedules themselves. The paid storage
+// bytes of the `vest` calls divided by 1,000 is the storage per beneficiery.
+const planBeneficieries = investors(1000);
+
+module.exports.plan_1000 = {
+  ...module.exports.st12,
+
+  steps: [
+    {
+      setup: true,
+      name: "addToWhitelistBatch",
+      contract: "whitelist",
+      sender: "bootstrap1",
+      arg: ({ token, escrow }) => [{ token, accounts: [escrow] }],
+    },
+    {
+      ...module.exports.st12.steps.find((step) => step.name === "addVestingPlan"),
+      setup: false,
+    },
+    ...chunks(planBeneficieries).map((beneficieries, i, all) => ({
+      label: `vest ${i + 1}/${all.length}`,
+      name: "vest",
+      contract: "escrow",
+      sender: "bootstrap1",
+      arg: () =>
+        beneficieries.map((beneficiery) => ({
+          beneficiery,
+          plan_id: 0,
+          vesting_amount: 100,
+          label: null,
+        })),
+    })),
+  ],
+};
+
+// ST12 with a growing number of controllers (`roles_<count>`): role
+// membership is one big-map lookup per account, so the measured gas should
+// not grow with the count. bootstrap3 is granted the role last.
+const CONTROLLER_ROLE = 1;
+const ROLE_COUNTS = [1, 50, 500];
+
+for (const count of ROLE_COUNTS) {
+  const controllers = investors(count - 1);
+
+  module.exports[`roles_${count}`] = {
+    ...module.exports.st12,
+
+    steps: [
+      {
+        setup: true,
+        name: "addToWhitelistBatch",
+        contract: "whitelist",
+        sender: "bootstrap1",
+        arg: ({ token, bootstrap2, bootstrap3 }) => [{ token, accounts: [bootstrap2, bootstrap3] }],
+      },
+      {
+        setup: true,
+        name: "mint",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap2 }) => [{ address: bootstrap2, amount: 1000 }],
+      },
+      ...chunks(controllers).map((accounts) => ({
+        setup: true,
+        name: "grantRole",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: () => accounts.map((account) => ({ role: CONTROLLER_ROLE, account })),
+      })),
+      {
+        setup: true,
+        name: "grantRole",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => [{ role: CONTROLLER_ROLE, account: bootstrap3 }],
+      },
+      {
+        name: "transfer",
+        contract: "token",
+        sender: "bootstrap2",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ from_: bootstrap2, to_: bootstrap3, value: 1 }),
+      },
+      {
+        label: "transfer (controller)",
+        name: "transfer",
+        contract: "token",
+        sender: "bootstrap3",
+        arg: ({ bootstrap2, bootstrap3 }) => ({ from_: bootstrap2, to_: bootstrap3, value: 1 }),
+      },
+      {
+        name: "assertRole",
+        contract: "token",
+        sender: "bootstrap1",
+        arg: ({ bootstrap3 }) => ({ role: CONTROLLER_ROLE, account: bootstrap3 }),
+      },
+    ],
+  };
+}
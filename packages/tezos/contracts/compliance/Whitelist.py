@@ -6,112 +6,674 @@ ADMIN_ROLE = 0
 WHITELIST_ADMIN_ROLE = 1
 BLACKLIST_ADMIN_ROLE = 2
 
-def make_role(role_admin, members=sp.set([], t=sp.TAddress)):
-    return sp.record(
-        role_admin = role_admin,
-        members = members
+# default period of validity of an account's KYC, in seconds
+KYC_VALIDITY = 365 * 24 * 3600
+
+def role_mask(*roles):
+    mask = 0
+    for role in roles:
+        mask |= 1 << role
+    return sp.nat(mask)
+
+
+# Roles are kept in a big-map from each member to the bitmask of its roles
+# (bit `n` is set for role `n`), so that a single lookup answers every role
+# question about an account.
+def make_roles(administrators=[]):
+    return sp.big_map(
+        {administrator: role_mask(ADMIN_ROLE) for administrator in administrators},
+        tkey=sp.TAddress,
+        tvalue=sp.TNat
     )
 
 
-def make_roles(administrators=sp.set([], t=sp.TAddress)):
-    return sp.map(
-        {
-            ADMIN_ROLE: make_role(ADMIN_ROLE, administrators),
-            WHITELIST_ADMIN_ROLE: make_role(ADMIN_ROLE),
-            BLACKLIST_ADMIN_ROLE: make_role(ADMIN_ROLE)
-        },
-        tkey=sp.TNat, 
-        tvalue=sp.TRecord(
-            role_admin=sp.TNat,
-            members=sp.TSet(t=sp.TAddress)
-        )
+# Blacklisted accounts are kept in a lazy set: a big-map whose values are all
+# `Unit`, so that the check made by every `assertValid` does not depend on the
+# size of the blacklist.
+def make_blacklist():
+    return sp.big_map(
+        {},
+        tkey=sp.TAddress,
+        tvalue=sp.TUnit
+    )
+
+
+# Whitelisted `(token, account)` pairs are kept in a big-map whose keys are
+# the pairs, so a membership check only loads the single entry it asks for.
+# Each entry holds the epoch of its token it was added in: only entries of
+# the token's current epoch count, so that bumping the epoch resets the whole
+# whitelist of the token in a single write. It also holds the expiry of the
+# account's KYC, compared with `sp.now` on every check.
+def whitelist_key_type():
+    return sp.TRecord(
+        token=sp.TAddress,
+        account=sp.TAddress
+    ).layout(("token", "account"))
+
+
+def make_whitelist_key(token, account):
+    return sp.set_type_expr(
+        sp.record(
+            token = token,
+            account = account
+        ),
+        whitelist_key_type()
+    )
+
+
+def whitelist_entry_type():
+    return sp.TRecord(
+        epoch=sp.TNat,
+        expiry=sp.TTimestamp
+    ).layout(("epoch", "expiry"))
+
+
+# Read in place of a missing entry: it has already expired.
+def no_whitelist_entry():
+    return sp.set_type_expr(
+        sp.record(
+            epoch = sp.nat(0),
+            expiry = sp.timestamp(0)
+        ),
+        whitelist_entry_type()
+    )
+
+
+def whitelist_batch_type():
+    return sp.TList(
+        sp.TRecord(
+            token=sp.TAddress,
+            accounts=sp.TList(sp.TAddress)
+        ).layout(("token", "accounts"))
+    )
+
+
+def make_token_whitelist():
+    return sp.big_map(
+        {},
+        tkey=whitelist_key_type(),
+        tvalue=whitelist_entry_type()
+    )
+
+
+def whitelist_renewal_type():
+    return sp.TList(
+        sp.TRecord(
+            token=sp.TAddress,
+            accounts=sp.TList(sp.TAddress),
+            expiry=sp.TTimestamp
+        ).layout(("token", ("accounts", "expiry")))
     )
 
 
+# Investor groups (e.g. accredited, retail or a jurisdiction): each account
+# belongs to at most one group, and a token admits whole groups. The admitted
+# `(token, group)` pairs are stamped with the token's epoch like
+# `token_whitelist` entries.
+def group_key_type():
+    return sp.TRecord(
+        token=sp.TAddress,
+        group=sp.TNat
+    ).layout(("token", "group"))
+
+
+def make_group_key(token, group):
+    return sp.set_type_expr(
+        sp.record(
+            token = token,
+            group = group
+        ),
+        group_key_type()
+    )
+
+
+# Opening or closing a token to a group takes the group's members, which
+# cannot be enumerated on chain, to push their validity to a subscribed token.
+# They are checked against `investor_groups` and the size of the group.
+def group_members_type():
+    return sp.TRecord(
+        token=sp.TAddress,
+        group=sp.TNat,
+        members=sp.TSet(sp.TAddress)
+    ).layout(("token", ("group", "members")))
+
+
+def investor_groups_type():
+    return sp.TList(
+        sp.TRecord(
+            account=sp.TAddress,
+            group=sp.TOption(sp.TNat)
+        ).layout(("account", "group"))
+    )
+
+
+# Merkle whitelists: a token's approved accounts can be committed to as the
+# root of a Merkle tree whose leaves are `sha256(pack(account))` and whose
+# nodes hash the concatenation of their two children in ascending order, so
+# that a proof is just the list of siblings from the leaf up. See
+# `scripts/merkle.js` for the tree and proof builder.
+def merkle_leaf(account):
+    return sp.sha256(sp.pack(account))
+
+
+def merkle_parent(a, b):
+    return sp.sha256(sp.eif(a < b, a + b, b + a))
+
+
+def membership_proof_type():
+    return sp.TRecord(
+        token=sp.TAddress,
+        account=sp.TAddress,
+        proof=sp.TList(sp.TBytes)
+    ).layout(("token", ("account", "proof")))
+
+
+# Changes pushed to subscribed tokens: `valid` tells whether `account` may
+# now hold and move the token, and `expiry` until when, `sp.none` standing
+# for an account valid through its group.
+def whitelist_update_type():
+    return sp.TRecord(
+        account=sp.TAddress,
+        valid=sp.TBool,
+        expiry=sp.TOption(sp.TTimestamp)
+    ).layout(("account", ("valid", "expiry")))
+
+
 class AccessControl(sp.Contract):
-    
+
+    def roles_of(self, account):
+        return self.data.roles.get(account, sp.nat(0))
+
+    # `mask` is a bitmask of roles, see `role_mask`.
+    def has_any_role(self, mask, account):
+        return (self.roles_of(account) & mask) != 0
+
     def has_role(self, role, account):
-        return (self.data.roles.contains(role) & self.data.roles[role].members.contains(account))
+        return self.has_any_role(sp.nat(1) << role, account)
     
     def sender_has_role(self, role):
         return self.has_role(role, sp.sender)
-    
+
+    def sender_has_any_role(self, mask):
+        return self.has_any_role(mask, sp.sender)
+
+    # admin has all roles
+    def is_member(self, role, account):
+        return self.has_any_role(role_mask(ADMIN_ROLE) | (sp.nat(1) << role), account)
+
+    # Every role is administered by the ADMIN_ROLE.
+    def verify_role_admin(self, role):
+        sp.verify(role <= BLACKLIST_ADMIN_ROLE)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+
+    def add_role(self, role, account):
+        self.data.roles[account] = self.roles_of(account) | (sp.nat(1) << role)
+
+    def remove_role(self, role, account):
+        roles = sp.local("roles", self.roles_of(account))
+        roles.value = sp.as_nat(roles.value - (roles.value & (sp.nat(1) << role)))
+        sp.if roles.value == 0:
+            del self.data.roles[account]
+        sp.else:
+            self.data.roles[account] = roles.value
+
     @sp.entry_point
     def assertRole(self, params):
-        # admin has all roles
-        sp.verify(self.has_role(ADMIN_ROLE, params.account) | self.has_role(params.role, params.account))
-    
+        sp.verify(self.is_member(params.role, params.account))
+
     @sp.entry_point
     def grantRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if ~self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.add(p.account)
+            self.verify_role_admin(p.role)
+            self.add_role(p.role, p.account)
     
     @sp.entry_point
     def revokeRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
+            self.verify_role_admin(p.role)
+            self.remove_role(p.role, p.account)
     
     @sp.entry_point
     def renounceRole(self, params):
         sp.for p in params:
             sp.verify(p.account == sp.sender)
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
-    
+            self.remove_role(p.role, p.account)
+
 
 class Whitelist(AccessControl):
     
-    def __init__(self, administrators):
+    def __init__(self, administrators, kyc_validity=KYC_VALIDITY):
         self.init(
-            token_whitelist = sp.map(
-                {},
-                tkey=sp.TAddress,
-                tvalue=sp.TSet(
-                    t=sp.TAddress
-                )
-            ),
-            blacklist = sp.set([],t=sp.TAddress),
+            token_whitelist = make_token_whitelist(),
+            blacklist = make_blacklist(),
+            subscribers = sp.set([], t=sp.TAddress),
+            merkle_roots = sp.big_map(tkey=sp.TAddress, tvalue=sp.TBytes),
+            investor_groups = sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
+            group_sizes = sp.big_map(tkey=sp.TNat, tvalue=sp.TNat),
+            token_groups = sp.big_map(tkey=group_key_type(), tvalue=sp.TNat),
+            token_epochs = sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
+            revoked_proofs = sp.big_map(tkey=whitelist_key_type(), tvalue=sp.TBytes),
+            kyc_validity = sp.int(kyc_validity),
             roles = make_roles(administrators=administrators)
         )
 
+    def current_epoch(self, token):
+        return self.data.token_epochs.get(token, sp.nat(0))
+
+    def whitelist_entry(self, token, account):
+        return sp.compute(
+            self.data.token_whitelist.get(make_whitelist_key(token, account), no_whitelist_entry())
+        )
+
+    def is_valid_entry(self, token, entry):
+        return (entry.epoch == self.current_epoch(token)) & (sp.now < entry.expiry)
+
+    # An account is whitelisted for a token on its own, by an entry of the
+    # token's current epoch whose KYC has not expired, or through its group.
+    def is_whitelisted(self, token, account):
+        entry = self.whitelist_entry(token, account)
+        return sp.eif(
+            self.is_valid_entry(token, entry),
+            True,
+            self.is_group_admitted(token, account)
+        )
+
+    def is_group_admitted(self, token, account):
+        return sp.eif(
+            self.data.investor_groups.contains(account),
+            self.data.token_groups.get_opt(
+                make_group_key(token, self.data.investor_groups[account])
+            ) == sp.some(self.current_epoch(token)),
+            False
+        )
+
+    def is_valid_account(self, token, account):
+        return ~self.data.blacklist.contains(account) & self.is_whitelisted(token, account)
+
+    def is_whitelist_admin(self, account):
+        return self.has_any_role(role_mask(WHITELIST_ADMIN_ROLE, ADMIN_ROLE), account)
+
+    def is_blacklist_admin(self, account):
+        return self.has_any_role(role_mask(BLACKLIST_ADMIN_ROLE, ADMIN_ROLE), account)
+
+    # An entry left over from a previous epoch is overwritten in place, so
+    # re-whitelisting an account after a reset reuses its storage.
+    def add_to_whitelist(self, token, account):
+        sp.verify(~self.data.blacklist.contains(account))
+
+        key = make_whitelist_key(token, account)
+        self.data.token_whitelist[key] = sp.record(
+            epoch = self.current_epoch(token),
+            expiry = sp.now.add_seconds(self.data.kyc_validity)
+        )
+        del self.data.revoked_proofs[key]
+
+    # A removed account cannot be whitelisted again with its proof for the
+    # token's Merkle root: the removal is recorded with the root, if any, and
+    # holds until the account is whitelisted by an admin or the root changes.
+    def remove_from_whitelist(self, token, account):
+        key = make_whitelist_key(token, account)
+        del self.data.token_whitelist[key]
+        sp.if self.data.merkle_roots.contains(token):
+            self.data.revoked_proofs[key] = self.data.merkle_roots[token]
+
+    # Push mode: subscribed tokens keep their own set of valid accounts and
+    # validate transfers locally. Every change of validity for a subscribed
+    # token is sent to its `updateWhitelisted` entry point, one operation per
+    # token and call, with the expiry the token checks by itself.
+    def send_updates(self, token, updates):
+        sp.transfer(
+            updates,
+            sp.mutez(0),
+            sp.contract(
+                sp.TList(whitelist_update_type()),
+                token,
+                entry_point="updateWhitelisted"
+            ).open_some()
+        )
+
+    def update_of(self, token, account):
+        entry = self.whitelist_entry(token, account)
+        group = sp.compute(self.is_group_admitted(token, account))
+        return sp.record(
+            account = account,
+            valid = ~self.data.blacklist.contains(account) & (group | self.is_valid_entry(token, entry)),
+            expiry = sp.eif(group, sp.none, sp.some(entry.expiry))
+        )
+
+    def push(self, token, accounts):
+        sp.if self.data.subscribers.contains(token):
+            updates = sp.local("updates", sp.list([], t=whitelist_update_type()))
+            sp.for account in accounts:
+                updates.value.push(self.update_of(token, account))
+            self.send_updates(token, updates.value)
+
+    # A blacklist change affects every subscribed token the accounts are
+    # whitelisted for.
+    def push_blacklist(self, accounts):
+        sp.for token in self.data.subscribers.elements():
+            updates = sp.local("updates", sp.list([], t=whitelist_update_type()))
+            sp.for account in accounts:
+                sp.if self.is_whitelisted(token, account):
+                    updates.value.push(self.update_of(token, account))
+            sp.if sp.len(updates.value) > 0:
+                self.send_updates(token, updates.value)
+
     @sp.entry_point
     def addToWhitelist(self, params):
-        sp.verify(self.has_role(WHITELIST_ADMIN_ROLE, sp.sender) | self.has_role(ADMIN_ROLE, sp.sender))
-        sp.verify(~self.data.blacklist.contains(params.account))
+        sp.verify(self.is_whitelist_admin(sp.sender))
 
-        sp.if ~self.data.token_whitelist.contains(params.token):
-            self.data.token_whitelist[params.token] = sp.set([])
-        
-        self.data.token_whitelist[params.token].add(params.account)
+        self.add_to_whitelist(params.token, params.account)
+        self.push(params.token, sp.list([params.account]))
     
     @sp.entry_point
     def removeFromWhitelist(self, params):
-        sp.verify(self.has_role(WHITELIST_ADMIN_ROLE, sp.sender) | self.has_role(ADMIN_ROLE, sp.sender))
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        self.remove_from_whitelist(params.token, params.account)
+        self.push(params.token, sp.list([params.account]))
 
-        sp.if self.data.token_whitelist.contains(params.token):
-            self.data.token_whitelist[params.token].remove(params.account)
+    # Batch variants check the sender's role once per call and take the
+    # accounts grouped by token.
+    @sp.entry_point
+    def addToWhitelistBatch(self, params):
+        sp.set_type(params, whitelist_batch_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.for batch in params:
+            sp.for account in batch.accounts:
+                self.add_to_whitelist(batch.token, account)
+            self.push(batch.token, batch.accounts)
+
+    @sp.entry_point
+    def removeFromWhitelistBatch(self, params):
+        sp.set_type(params, whitelist_batch_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.for batch in params:
+            sp.for account in batch.accounts:
+                self.remove_from_whitelist(batch.token, account)
+            self.push(batch.token, batch.accounts)
+
+    # Migration path from the previous `token -> set(account)` storage layout:
+    # the old `token_whitelist` value can be sent as is (or in chunks).
+    @sp.entry_point
+    def importWhitelist(self, params):
+        sp.set_type(params, sp.TMap(sp.TAddress, sp.TSet(sp.TAddress)))
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.for item in params.items():
+            sp.for account in item.value.elements():
+                self.add_to_whitelist(item.key, account)
+            self.push(item.key, item.value.elements())
      
     @sp.entry_point
     def addToBlacklist(self, params):
-        sp.verify(self.has_role(BLACKLIST_ADMIN_ROLE, sp.sender) | self.has_role(ADMIN_ROLE, sp.sender))
+        sp.verify(self.is_blacklist_admin(sp.sender))
 
-        self.data.blacklist.add(params.account)
+        self.data.blacklist[params.account] = sp.unit
+        self.push_blacklist(sp.list([params.account]))
     
     @sp.entry_point
     def removeFromBlacklist(self, params):
-        sp.verify(self.has_role(BLACKLIST_ADMIN_ROLE, sp.sender) | self.has_role(ADMIN_ROLE, sp.sender))
+        sp.verify(self.is_blacklist_admin(sp.sender))
+
+        del self.data.blacklist[params.account]
+        self.push_blacklist(sp.list([params.account]))
+
+    @sp.entry_point
+    def addToBlacklistBatch(self, accounts):
+        sp.set_type(accounts, sp.TList(sp.TAddress))
+        sp.verify(self.is_blacklist_admin(sp.sender))
 
-        self.data.blacklist.remove(params.account)
+        sp.for account in accounts:
+            self.data.blacklist[account] = sp.unit
+        self.push_blacklist(accounts)
+
+    @sp.entry_point
+    def removeFromBlacklistBatch(self, accounts):
+        sp.set_type(accounts, sp.TList(sp.TAddress))
+        sp.verify(self.is_blacklist_admin(sp.sender))
+
+        sp.for account in accounts:
+            del self.data.blacklist[account]
+        self.push_blacklist(accounts)
+
+    # Moving accounts between groups changes their validity for the
+    # subscribed tokens, which is pushed to all of them.
+    @sp.entry_point
+    def setInvestorGroups(self, params):
+        sp.set_type(params, investor_groups_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        updates = sp.local(
+            "updates",
+            sp.map(tkey=sp.TAddress, tvalue=sp.TList(whitelist_update_type()))
+        )
+        sp.for token in self.data.subscribers.elements():
+            updates.value[token] = sp.list([], t=whitelist_update_type())
+
+        # Only the accounts whose admission through their group changes for
+        # a subscribed token are pushed to it.
+        sp.for p in params:
+            admitted = sp.local("admitted", sp.map(tkey=sp.TAddress, tvalue=sp.TBool))
+            sp.for token in self.data.subscribers.elements():
+                admitted.value[token] = self.is_group_admitted(token, p.account)
+
+            sp.if self.data.investor_groups.contains(p.account):
+                group = sp.local("group", self.data.investor_groups[p.account])
+                self.data.group_sizes[group.value] = sp.as_nat(self.data.group_sizes[group.value] - 1)
+            sp.if p.group.is_some():
+                self.data.investor_groups[p.account] = p.group.open_some()
+                self.data.group_sizes[p.group.open_some()] = self.data.group_sizes.get(p.group.open_some(), sp.nat(0)) + 1
+            sp.else:
+                del self.data.investor_groups[p.account]
+
+            sp.for token in self.data.subscribers.elements():
+                sp.if self.is_group_admitted(token, p.account) != admitted.value[token]:
+                    updates.value[token].push(self.update_of(token, p.account))
+
+        sp.for item in updates.value.items():
+            sp.if sp.len(item.value) > 0:
+                self.send_updates(item.key, item.value)
+
+    # A subscribed token is only opened or closed to a group together with
+    # every member of the group, whose validity is pushed to it. Other tokens
+    # can be given an empty set.
+    def verify_group_members(self, params):
+        sp.if self.data.subscribers.contains(params.token):
+            sp.verify(sp.len(params.members) == self.data.group_sizes.get(params.group, sp.nat(0)))
+            sp.for member in params.members.elements():
+                sp.verify(self.data.investor_groups.get_opt(member) == sp.some(params.group))
+
+    # Opens a token to a whole group in one call.
+    @sp.entry_point
+    def admitGroup(self, params):
+        sp.set_type(params, group_members_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+        self.verify_group_members(params)
+
+        self.data.token_groups[make_group_key(params.token, params.group)] = self.current_epoch(params.token)
+        self.push(params.token, params.members.elements())
+
+    @sp.entry_point
+    def dismissGroup(self, params):
+        sp.set_type(params, group_members_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+        self.verify_group_members(params)
+
+        del self.data.token_groups[make_group_key(params.token, params.group)]
+        self.push(params.token, params.members.elements())
+
+    # Resets the whitelist of a token, e.g. when every investor has to go
+    # through KYC again: the entries and admitted groups of the previous
+    # epochs no longer count, and its Merkle root is removed. A subscribed
+    # token is told to drop the accounts pushed to it.
+    @sp.entry_point
+    def resetWhitelist(self, token):
+        sp.set_type(token, sp.TAddress)
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        self.data.token_epochs[token] = self.current_epoch(token) + 1
+        del self.data.merkle_roots[token]
+        sp.if self.data.subscribers.contains(token):
+            sp.transfer(
+                sp.unit,
+                sp.mutez(0),
+                sp.contract(sp.TUnit, token, entry_point="resetWhitelisted").open_some()
+            )
+
+    # Anyone can delete entries left over from previous epochs, and removals
+    # recorded for a previous Merkle root; the others are kept.
+    @sp.entry_point
+    def reclaimWhitelist(self, keys):
+        sp.set_type(keys, sp.TList(whitelist_key_type()))
+
+        sp.for key in keys:
+            epoch = sp.local("epoch", self.current_epoch(key.token))
+            sp.if self.data.token_whitelist.get(key, no_whitelist_entry()).epoch != epoch.value:
+                del self.data.token_whitelist[key]
+            sp.if self.data.revoked_proofs.get_opt(key) != self.data.merkle_roots.get_opt(key.token):
+                del self.data.revoked_proofs[key]
+
+    # Period of validity of the KYC of the accounts whitelisted from now on,
+    # in seconds.
+    @sp.entry_point
+    def setKycValidity(self, validity):
+        sp.set_type(validity, sp.TInt)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+        sp.verify(validity > 0)
+
+        self.data.kyc_validity = validity
+
+    # Batched KYC renewal: sets the expiry of accounts whitelisted for a token
+    # in its current epoch, whether their KYC has expired or not.
+    @sp.entry_point
+    def renewWhitelist(self, params):
+        sp.set_type(params, whitelist_renewal_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.for batch in params:
+            epoch = sp.local("epoch", self.current_epoch(batch.token))
+            sp.for account in batch.accounts:
+                key = make_whitelist_key(batch.token, account)
+                sp.verify(self.data.token_whitelist.contains(key))
+                sp.verify(self.data.token_whitelist[key].epoch == epoch.value)
+                self.data.token_whitelist[key].expiry = batch.expiry
+            self.push(batch.token, batch.accounts)
+
+    # Merkle mode: instead of whitelisting every account, the admin commits
+    # to the approved accounts of a token with a Merkle root. `sp.none`
+    # removes the root; accounts already proven stay whitelisted.
+    @sp.entry_point
+    def setMerkleRoot(self, params):
+        sp.set_type(
+            params,
+            sp.TRecord(
+                token=sp.TAddress,
+                root=sp.TOption(sp.TBytes)
+            ).layout(("token", "root"))
+        )
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.if params.root.is_some():
+            self.data.merkle_roots[params.token] = params.root.open_some()
+        sp.else:
+            del self.data.merkle_roots[params.token]
+
+    # Anyone can submit a proof. A valid one whitelists the account like
+    # `addToWhitelist`, so that later checks are plain lookups, unless the
+    # account was removed from the whitelist under the same root. A proof does not renew
+    # the KYC of an account it already whitelisted: the entry is kept as is
+    # while it has not expired, and an expired one is only renewed by an
+    # admin (`renewWhitelist`).
+    @sp.entry_point
+    def proveMembership(self, params):
+        sp.set_type(params, membership_proof_type())
+        key = sp.compute(make_whitelist_key(params.token, params.account))
+        epoch = sp.compute(self.current_epoch(params.token))
+        root = sp.compute(self.data.merkle_roots.get(params.token, sp.bytes("0x")))
+
+        node = sp.local("node", merkle_leaf(params.account))
+        sp.for sibling in params.proof:
+            node.value = merkle_parent(node.value, sibling)
+        sp.verify(root == node.value)
+        sp.verify(self.data.revoked_proofs.get_opt(key) != sp.some(root))
+
+        entry = self.whitelist_entry(params.token, params.account)
+        sp.if self.data.token_whitelist.contains(key) & (entry.epoch == epoch):
+            sp.verify(sp.now < entry.expiry)
+        sp.else:
+            self.add_to_whitelist(params.token, params.account)
+            self.push(params.token, sp.list([params.account]))
+
+    # The token has to accept updates from this contract (`setWhitelist`)
+    # before it is subscribed: an empty update is sent to it, so that the
+    # subscription fails otherwise. A subscriber that stops accepting updates
+    # makes every change pushed to it fail, including blacklist and group
+    # changes, which reach all subscribers, until it is removed.
+    @sp.entry_point
+    def addSubscriber(self, token):
+        sp.set_type(token, sp.TAddress)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+        sp.verify(sp.contract(sp.TUnit, token, entry_point="resetWhitelisted").is_some())
+        self.send_updates(token, sp.list([], t=whitelist_update_type()))
+
+        self.data.subscribers.add(token)
+
+    @sp.entry_point
+    def removeSubscriber(self, token):
+        sp.set_type(token, sp.TAddress)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+
+        self.data.subscribers.remove(token)
+
+    # A new subscriber starts with no valid account: the accounts already
+    # whitelisted for it are pushed with their current validity, in chunks.
+    @sp.entry_point
+    def syncSubscriber(self, params):
+        sp.set_type(params, whitelist_batch_type())
+        sp.verify(self.is_whitelist_admin(sp.sender))
+
+        sp.for batch in params:
+            sp.verify(self.data.subscribers.contains(batch.token))
+            updates = sp.local("updates", sp.list([], t=whitelist_update_type()))
+            sp.for account in batch.accounts:
+                updates.value.push(self.update_of(batch.token, account))
+            self.send_updates(batch.token, updates.value)
 
     @sp.entry_point
     def assertValid(self, params):
-        sp.verify(~self.data.blacklist.contains(params.account))
-        sp.verify(self.data.token_whitelist.contains(params.token))
-        sp.verify(self.data.token_whitelist[params.token].contains(params.account))
+        sp.set_type(params, whitelist_key_type())
+        sp.verify(self.is_valid_account(params.token, params.account))
+
+    @sp.entry_point
+    def assertValidMany(self, params):
+        sp.set_type(params, whitelist_batch_type())
+        sp.for batch in params:
+            sp.for account in batch.accounts:
+                sp.verify(self.is_valid_account(batch.token, account))
+
+    # Synchronous alternatives to `assertValid`: validators read them with
+    # `sp.view` instead of emitting an internal operation per account.
+    @sp.onchain_view()
+    def is_valid(self, params):
+        sp.set_type(params, whitelist_key_type())
+        sp.result(self.is_valid_account(params.token, params.account))
+
+    @sp.onchain_view()
+    def are_valid(self, params):
+        sp.set_type(
+            params,
+            sp.TRecord(
+                token=sp.TAddress,
+                accounts=sp.TList(sp.TAddress)
+            ).layout(("token", "accounts"))
+        )
+        valid = sp.local("valid", True)
+        sp.for account in params.accounts:
+            valid.value = valid.value & self.is_valid_account(params.token, account)
+        sp.result(valid.value)
 
 
 class TestToken(sp.Contract):
@@ -138,16 +700,431 @@ class TestToken(sp.Contract):
             sp.mutez(0),
             c
         )
-        
+
+
+# Stands for a token in push mode: keeps the accounts pushed by the Whitelist,
+# stamped with its own epoch and with their expiry as the Whitelist does.
+class TestSubscriber(sp.Contract):
+    def __init__(self, whitelist):
+        self.init(
+            whitelist=whitelist,
+            whitelisted=sp.big_map(
+                tkey=sp.TAddress,
+                tvalue=sp.TRecord(
+                    epoch=sp.TNat,
+                    expiry=sp.TOption(sp.TTimestamp)
+                ).layout(("epoch", "expiry"))
+            ),
+            whitelisted_epoch=sp.nat(0)
+        )
+
+    def is_whitelisted(self, account):
+        entry = sp.compute(
+            self.data.whitelisted.get(
+                account,
+                sp.record(epoch=sp.nat(0), expiry=sp.some(sp.timestamp(0)))
+            )
+        )
+        return (entry.epoch == self.data.whitelisted_epoch) & sp.eif(
+            entry.expiry.is_some(),
+            sp.now < entry.expiry.open_some(),
+            True
+        )
+
+    @sp.entry_point
+    def updateWhitelisted(self, params):
+        sp.set_type(params, sp.TList(whitelist_update_type()))
+        sp.verify(sp.sender == self.data.whitelist)
+
+        sp.for update in params:
+            sp.if update.valid:
+                self.data.whitelisted[update.account] = sp.record(
+                    epoch=self.data.whitelisted_epoch,
+                    expiry=update.expiry
+                )
+            sp.else:
+                del self.data.whitelisted[update.account]
+
+    @sp.entry_point
+    def resetWhitelisted(self):
+        sp.verify(sp.sender == self.data.whitelist)
+
+        self.data.whitelisted_epoch += 1
+
+    # Stands for a token switching to another Whitelist.
+    @sp.entry_point
+    def setWhitelist(self, whitelist):
+        sp.set_type(whitelist, sp.TAddress)
+        self.data.whitelist = whitelist
+
+    @sp.onchain_view()
+    def is_valid(self, account):
+        sp.set_type(account, sp.TAddress)
+        sp.result(self.is_whitelisted(account))
+
 
 if "templates" not in __name__:
     @sp.add_test(name="Whitelist", is_default=True)
     def test():
-        pass
+        scenario = sp.test_scenario()
+        scenario.h1("Whitelist")
+
+        admin = sp.test_account("Administrator")
+        alice = sp.test_account("Alice")
+        bob = sp.test_account("Bob")
+        token = sp.test_account("Token")
+        other_token = sp.test_account("Other Token")
+
+        c = Whitelist(administrators=[admin.address])
+        scenario += c
+
+        scenario.h2("Whitelisting is per token")
+        scenario += c.addToWhitelist(token=token.address, account=alice.address).run(sender=bob, valid=False)
+        scenario += c.addToWhitelist(token=token.address, account=alice.address).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=alice.address)
+        scenario += c.assertValid(token=other_token.address, account=alice.address).run(valid=False)
+        scenario += c.assertValid(token=token.address, account=bob.address).run(valid=False)
+
+        scenario.h2("On-chain views")
+        scenario.verify(c.is_valid(sp.record(token=token.address, account=alice.address)))
+        scenario.verify(~c.is_valid(sp.record(token=token.address, account=bob.address)))
+        scenario.verify(~c.are_valid(sp.record(token=token.address, accounts=sp.list([alice.address, bob.address]))))
+
+        scenario += c.assertValidMany(
+            sp.list([sp.record(token=token.address, accounts=sp.list([alice.address]))])
+        )
+        scenario += c.assertValidMany(
+            sp.list([sp.record(token=token.address, accounts=sp.list([alice.address, bob.address]))])
+        ).run(valid=False)
+
+        scenario.h2("Import from the previous storage layout")
+        scenario += c.importWhitelist(
+            sp.map({
+                token.address: sp.set([bob.address]),
+                other_token.address: sp.set([alice.address, bob.address])
+            })
+        ).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=bob.address)
+        scenario += c.assertValid(token=other_token.address, account=alice.address)
+
+        scenario.h2("Removal and blacklist")
+        scenario += c.removeFromWhitelist(token=token.address, account=bob.address).run(sender=admin)
+        scenario.verify(~c.data.revoked_proofs.contains(make_whitelist_key(token.address, bob.address)))
+        scenario += c.assertValid(token=token.address, account=bob.address).run(valid=False)
+        scenario += c.addToBlacklist(account=alice.address).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=alice.address).run(valid=False)
+        scenario += c.addToWhitelist(token=token.address, account=alice.address).run(sender=admin, valid=False)
+
+        scenario.h2("Batch administration")
+        scenario += c.addToWhitelistBatch(
+            sp.list([sp.record(token=token.address, accounts=sp.list([bob.address]))])
+        ).run(sender=bob, valid=False)
+        scenario += c.addToWhitelistBatch(
+            sp.list([
+                sp.record(token=token.address, accounts=sp.list([bob.address])),
+                sp.record(token=other_token.address, accounts=sp.list([bob.address]))
+            ])
+        ).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=bob.address)
+        scenario += c.removeFromWhitelistBatch(
+            sp.list([sp.record(token=other_token.address, accounts=sp.list([bob.address]))])
+        ).run(sender=admin)
+        scenario += c.assertValid(token=other_token.address, account=bob.address).run(valid=False)
+        scenario += c.addToBlacklistBatch(sp.list([bob.address])).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=bob.address).run(valid=False)
+        scenario += c.removeFromBlacklistBatch(sp.list([alice.address, bob.address])).run(sender=admin)
+        scenario += c.assertValid(token=token.address, account=bob.address)
+
+        scenario.h2("Roles")
+        scenario += c.grantRole(sp.list([sp.record(role=WHITELIST_ADMIN_ROLE, account=bob.address)])).run(sender=bob, valid=False)
+        scenario += c.grantRole(sp.list([sp.record(role=WHITELIST_ADMIN_ROLE, account=bob.address)])).run(sender=admin)
+        scenario += c.addToWhitelist(token=other_token.address, account=bob.address).run(sender=bob)
+        scenario += c.addToBlacklist(account=alice.address).run(sender=bob, valid=False)
+        scenario += c.renounceRole(sp.list([sp.record(role=WHITELIST_ADMIN_ROLE, account=bob.address)])).run(sender=bob)
+        scenario.verify(~c.data.roles.contains(bob.address))
+        scenario += c.addToWhitelist(token=other_token.address, account=alice.address).run(sender=bob, valid=False)
+
+        scenario.h2("Push mode")
+        subscriber = TestSubscriber(c.address)
+        scenario += subscriber
+        scenario += c.addSubscriber(subscriber.address).run(sender=bob, valid=False)
+        scenario.p("Only tokens with an updateWhitelisted entry point can subscribe")
+        scenario += c.addSubscriber(token.address).run(sender=admin, valid=False)
+        scenario += c.addSubscriber(subscriber.address).run(sender=admin)
+        scenario += c.addToWhitelist(token=subscriber.address, account=alice.address).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(alice.address))
+        scenario += c.addToWhitelistBatch(
+            sp.list([sp.record(token=subscriber.address, accounts=sp.list([bob.address]))])
+        ).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(bob.address))
+        scenario += c.addToBlacklist(account=bob.address).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(bob.address))
+        scenario += c.removeFromBlacklist(account=bob.address).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(bob.address))
+        scenario += c.removeFromWhitelist(token=subscriber.address, account=alice.address).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(alice.address))
+        scenario.p("Only the Whitelist updates its subscribers")
+        scenario += subscriber.updateWhitelisted(
+            sp.list([sp.record(account=alice.address, valid=True, expiry=sp.none)])
+        ).run(sender=admin, valid=False)
+
+        scenario.p("Accounts whitelisted before the subscription are synchronized")
+        late_subscriber = TestSubscriber(c.address)
+        scenario += late_subscriber
+        scenario += c.addToWhitelist(token=late_subscriber.address, account=alice.address).run(sender=admin)
+        scenario += c.syncSubscriber(
+            sp.list([sp.record(token=late_subscriber.address, accounts=sp.list([alice.address, bob.address]))])
+        ).run(sender=admin, valid=False)
+        scenario += c.addSubscriber(late_subscriber.address).run(sender=admin)
+        scenario += c.syncSubscriber(
+            sp.list([sp.record(token=late_subscriber.address, accounts=sp.list([alice.address, bob.address]))])
+        ).run(sender=admin)
+        scenario.verify(late_subscriber.data.whitelisted.contains(alice.address))
+        scenario.verify(~late_subscriber.data.whitelisted.contains(bob.address))
+
+        scenario.p("Changes are no longer pushed once unsubscribed")
+        scenario += c.removeSubscriber(subscriber.address).run(sender=admin)
+        scenario += c.addToWhitelist(token=subscriber.address, account=alice.address).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(alice.address))
+
+        scenario.p("Tokens that do not accept updates from this Whitelist cannot subscribe")
+        stranger = TestSubscriber(admin.address)
+        scenario += stranger
+        scenario += c.addSubscriber(stranger.address).run(sender=admin, valid=False)
+
+        scenario.p("A subscriber that stops accepting updates blocks blacklisting until it is removed")
+        blocked = TestSubscriber(c.address)
+        scenario += blocked
+        scenario += c.addSubscriber(blocked.address).run(sender=admin)
+        scenario += c.addToWhitelist(token=blocked.address, account=bob.address).run(sender=admin)
+        scenario += blocked.setWhitelist(admin.address)
+        scenario += c.addToBlacklist(account=bob.address).run(sender=admin, valid=False)
+        scenario += c.removeSubscriber(blocked.address).run(sender=admin)
+        scenario += c.addToBlacklist(account=bob.address).run(sender=admin)
+        scenario += c.removeFromBlacklist(account=bob.address).run(sender=admin)
+
+        scenario.h2("Merkle whitelist")
+        carol = sp.test_account("Carol")
+        merkle_token = sp.test_account("Merkle Token").address
+        leaves = [scenario.compute(merkle_leaf(account.address)) for account in [alice, bob, carol]]
+        alice_bob = scenario.compute(merkle_parent(leaves[0], leaves[1]))
+        root = scenario.compute(merkle_parent(alice_bob, leaves[2]))
+        scenario += c.setMerkleRoot(token=merkle_token, root=sp.some(root)).run(sender=bob, valid=False)
+        scenario += c.setMerkleRoot(token=merkle_token, root=sp.some(root)).run(sender=admin)
+        scenario += c.assertValid(token=merkle_token, account=alice.address).run(valid=False)
+        scenario += c.proveMembership(
+            token=merkle_token, account=alice.address, proof=sp.list([leaves[1], leaves[2]])
+        ).run(sender=alice)
+        scenario += c.assertValid(token=merkle_token, account=alice.address)
+        scenario += c.proveMembership(
+            token=merkle_token, account=carol.address, proof=sp.list([alice_bob])
+        ).run(sender=alice)
+        scenario += c.assertValid(token=merkle_token, account=carol.address)
+        scenario.p("Removed accounts cannot prove their membership again")
+        scenario += c.removeFromWhitelist(token=merkle_token, account=carol.address).run(sender=admin)
+        scenario += c.proveMembership(
+            token=merkle_token, account=carol.address, proof=sp.list([alice_bob])
+        ).run(sender=carol, valid=False)
+        scenario += c.assertValid(token=merkle_token, account=carol.address).run(valid=False)
+        scenario += c.addToWhitelist(token=merkle_token, account=carol.address).run(sender=admin)
+        scenario += c.assertValid(token=merkle_token, account=carol.address)
+        scenario.verify(~c.data.revoked_proofs.contains(
+            make_whitelist_key(merkle_token, carol.address)
+        ))
+        scenario.p("Removed accounts can prove their membership with a new root")
+        scenario += c.removeFromWhitelist(token=merkle_token, account=carol.address).run(sender=admin)
+        scenario += c.setMerkleRoot(token=merkle_token, root=sp.some(leaves[2])).run(sender=admin)
+        scenario += c.proveMembership(
+            token=merkle_token, account=carol.address, proof=sp.list([])
+        ).run(sender=carol)
+        scenario += c.assertValid(token=merkle_token, account=carol.address)
+        scenario += c.setMerkleRoot(token=merkle_token, root=sp.some(root)).run(sender=admin)
+        scenario.p("Wrong proofs, accounts outside the tree and other tokens are rejected")
+        scenario += c.proveMembership(
+            token=merkle_token, account=bob.address, proof=sp.list([leaves[2]])
+        ).run(sender=bob, valid=False)
+        scenario += c.proveMembership(
+            token=merkle_token, account=admin.address, proof=sp.list([alice_bob])
+        ).run(sender=admin, valid=False)
+        scenario += c.proveMembership(
+            token=other_token.address, account=bob.address, proof=sp.list([leaves[0], leaves[2]])
+        ).run(sender=bob, valid=False)
+        scenario.p("Proven accounts stay whitelisted when the root is removed")
+        scenario += c.setMerkleRoot(token=merkle_token, root=sp.none).run(sender=admin)
+        scenario += c.proveMembership(
+            token=merkle_token, account=bob.address, proof=sp.list([leaves[0], leaves[2]])
+        ).run(sender=bob, valid=False)
+        scenario += c.assertValid(token=merkle_token, account=alice.address)
+
+        scenario.h2("Investor groups")
+        ACCREDITED = 1
+        RETAIL = 2
+        group_token = sp.test_account("Group Token").address
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=alice.address, group=sp.some(ACCREDITED)),
+            sp.record(account=carol.address, group=sp.some(RETAIL))
+        ])).run(sender=bob, valid=False)
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=alice.address, group=sp.some(ACCREDITED)),
+            sp.record(account=carol.address, group=sp.some(RETAIL))
+        ])).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=alice.address).run(valid=False)
+        scenario += c.admitGroup(token=group_token, group=ACCREDITED, members=sp.set([])).run(sender=bob, valid=False)
+        scenario += c.admitGroup(token=group_token, group=ACCREDITED, members=sp.set([])).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=alice.address)
+        scenario += c.assertValid(token=group_token, account=carol.address).run(valid=False)
+        scenario += c.assertValid(token=group_token, account=bob.address).run(valid=False)
+        scenario.p("Accounts can still be whitelisted on their own")
+        scenario += c.addToWhitelist(token=group_token, account=bob.address).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=bob.address)
+        scenario.p("Blacklisted members are not valid")
+        scenario += c.addToBlacklist(account=alice.address).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=alice.address).run(valid=False)
+        scenario += c.removeFromBlacklist(account=alice.address).run(sender=admin)
+        scenario.p("Moving an account between groups")
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=carol.address, group=sp.some(ACCREDITED)),
+            sp.record(account=alice.address, group=sp.none)
+        ])).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=carol.address)
+        scenario += c.assertValid(token=group_token, account=alice.address).run(valid=False)
+        scenario.p("Group changes are pushed to subscribers")
+        scenario += c.addSubscriber(subscriber.address).run(sender=admin)
+        scenario += c.admitGroup(
+            token=subscriber.address, group=RETAIL, members=sp.set([])
+        ).run(sender=admin)
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=alice.address, group=sp.some(RETAIL))
+        ])).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(alice.address))
+        scenario += c.dismissGroup(
+            token=group_token, group=ACCREDITED, members=sp.set([])
+        ).run(sender=bob, valid=False)
+        scenario += c.dismissGroup(
+            token=group_token, group=ACCREDITED, members=sp.set([])
+        ).run(sender=admin)
+        scenario += c.assertValid(token=group_token, account=carol.address).run(valid=False)
+        scenario.p("Accounts whose validity does not change for a subscriber are not pushed to it")
+        scenario += blocked.setWhitelist(c.address)
+        scenario += c.addSubscriber(blocked.address).run(sender=admin)
+        scenario += blocked.setWhitelist(admin.address)
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=carol.address, group=sp.some(RETAIL))
+        ])).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(carol.address))
+        scenario += c.removeSubscriber(blocked.address).run(sender=admin)
+        scenario += c.setInvestorGroups(sp.list([
+            sp.record(account=carol.address, group=sp.some(ACCREDITED))
+        ])).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(carol.address))
+        scenario.p("Dismissing a group pushes its members to subscribers")
+        scenario += c.dismissGroup(
+            token=subscriber.address, group=RETAIL, members=sp.set([])
+        ).run(sender=admin, valid=False)
+        scenario += c.dismissGroup(
+            token=subscriber.address, group=RETAIL, members=sp.set([carol.address])
+        ).run(sender=admin, valid=False)
+        scenario += c.dismissGroup(
+            token=subscriber.address, group=RETAIL, members=sp.set([alice.address])
+        ).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(alice.address))
+        scenario.p("Admitting a group pushes its members to subscribers")
+        scenario += c.admitGroup(
+            token=subscriber.address, group=ACCREDITED, members=sp.set([])
+        ).run(sender=admin, valid=False)
+        scenario += c.admitGroup(
+            token=subscriber.address, group=ACCREDITED, members=sp.set([carol.address])
+        ).run(sender=admin)
+        scenario.verify(subscriber.data.whitelisted.contains(carol.address))
+        scenario += c.dismissGroup(
+            token=subscriber.address, group=ACCREDITED, members=sp.set([carol.address])
+        ).run(sender=admin)
+        scenario.verify(~subscriber.data.whitelisted.contains(carol.address))
+
+        scenario.h2("Whitelist reset")
+        reset_token = sp.test_account("Reset Token").address
+        scenario += c.addToWhitelist(token=reset_token, account=bob.address).run(sender=admin)
+        scenario += c.admitGroup(token=reset_token, group=ACCREDITED, members=sp.set([])).run(sender=admin)
+        scenario += c.setMerkleRoot(token=reset_token, root=sp.some(root)).run(sender=admin)
+        scenario += c.assertValid(token=reset_token, account=bob.address)
+        scenario += c.assertValid(token=reset_token, account=carol.address)
+        scenario += c.resetWhitelist(reset_token).run(sender=alice, valid=False)
+        scenario += c.resetWhitelist(reset_token).run(sender=admin)
+        scenario += c.assertValid(token=reset_token, account=bob.address).run(valid=False)
+        scenario += c.assertValid(token=reset_token, account=carol.address).run(valid=False)
+        scenario.verify(~c.data.merkle_roots.contains(reset_token))
+        scenario.p("Other tokens are not affected")
+        scenario += c.assertValid(token=token.address, account=bob.address)
+        scenario.p("Accounts are whitelisted again in the new epoch")
+        scenario += c.addToWhitelist(token=reset_token, account=bob.address).run(sender=admin)
+        scenario += c.assertValid(token=reset_token, account=bob.address)
+        scenario += c.assertValid(token=reset_token, account=carol.address).run(valid=False)
+        scenario.p("Only entries of previous epochs are reclaimed")
+        bob_key = sp.record(token=reset_token, account=bob.address)
+        scenario += c.reclaimWhitelist(sp.list([bob_key])).run(sender=alice)
+        scenario.verify(c.data.token_whitelist.contains(bob_key))
+        scenario += c.resetWhitelist(reset_token).run(sender=admin)
+        scenario += c.reclaimWhitelist(sp.list([bob_key])).run(sender=alice)
+        scenario.verify(~c.data.token_whitelist.contains(bob_key))
+        scenario.p("Subscribed tokens are reset too")
+        scenario.verify(subscriber.is_valid(alice.address))
+        scenario += c.resetWhitelist(subscriber.address).run(sender=admin)
+        scenario.verify(~subscriber.is_valid(alice.address))
+        scenario += subscriber.resetWhitelisted().run(sender=admin, valid=False)
+
+        scenario.h2("KYC expiry")
+        kyc_token = sp.test_account("KYC Token").address
+        scenario += c.setKycValidity(100).run(sender=bob, valid=False)
+        scenario += c.setKycValidity(100).run(sender=admin)
+        scenario += c.addToWhitelistBatch(
+            sp.list([sp.record(token=kyc_token, accounts=sp.list([alice.address, bob.address]))])
+        ).run(sender=admin, now=sp.timestamp(1000))
+        scenario += c.assertValid(token=kyc_token, account=alice.address).run(now=sp.timestamp(1099))
+        scenario += c.assertValid(token=kyc_token, account=alice.address).run(now=sp.timestamp(1100), valid=False)
+        scenario.p("Renewal extends the KYC of many accounts at once, expired or not")
+        renewal = sp.list([sp.record(token=kyc_token, accounts=sp.list([alice.address]), expiry=sp.timestamp(2000))])
+        scenario += c.renewWhitelist(renewal).run(sender=bob, now=sp.timestamp(1200), valid=False)
+        scenario += c.renewWhitelist(renewal).run(sender=admin, now=sp.timestamp(1200))
+        scenario += c.assertValid(token=kyc_token, account=alice.address).run(now=sp.timestamp(1999))
+        scenario += c.assertValid(token=kyc_token, account=bob.address).run(now=sp.timestamp(1999), valid=False)
+        scenario.p("Only whitelisted accounts are renewed")
+        scenario += c.renewWhitelist(
+            sp.list([sp.record(token=kyc_token, accounts=sp.list([carol.address]), expiry=sp.timestamp(2000))])
+        ).run(sender=admin, now=sp.timestamp(1200), valid=False)
+        scenario.p("Accounts admitted through their group do not expire")
+        scenario += c.admitGroup(token=kyc_token, group=ACCREDITED, members=sp.set([])).run(sender=admin)
+        scenario += c.assertValid(token=kyc_token, account=carol.address).run(now=sp.timestamp(10000))
+        scenario.p("Subscribed tokens receive the expiry")
+        scenario += c.addToWhitelist(token=subscriber.address, account=bob.address).run(sender=admin, now=sp.timestamp(3000))
+        scenario.verify(subscriber.data.whitelisted[bob.address].expiry == sp.some(sp.timestamp(3100)))
+        scenario += c.renewWhitelist(
+            sp.list([sp.record(token=subscriber.address, accounts=sp.list([bob.address]), expiry=sp.timestamp(5000))])
+        ).run(sender=admin, now=sp.timestamp(3000))
+        scenario.verify(subscriber.data.whitelisted[bob.address].expiry == sp.some(sp.timestamp(5000)))
+        scenario.p("Proofs do not renew the KYC of accounts they whitelisted")
+        kyc_merkle_token = sp.test_account("KYC Merkle Token").address
+        scenario += c.setMerkleRoot(token=kyc_merkle_token, root=sp.some(root)).run(sender=admin)
+        kyc_proof = sp.list([leaves[1], leaves[2]])
+        scenario += c.proveMembership(
+            token=kyc_merkle_token, account=alice.address, proof=kyc_proof
+        ).run(sender=alice, now=sp.timestamp(1000))
+        scenario += c.proveMembership(
+            token=kyc_merkle_token, account=alice.address, proof=kyc_proof
+        ).run(sender=alice, now=sp.timestamp(1050))
+        scenario.verify(
+            c.data.token_whitelist[make_whitelist_key(kyc_merkle_token, alice.address)].expiry
+            == sp.timestamp(1100)
+        )
+        scenario += c.proveMembership(
+            token=kyc_merkle_token, account=alice.address, proof=kyc_proof
+        ).run(sender=alice, now=sp.timestamp(1200), valid=False)
+        scenario += c.assertValid(token=kyc_merkle_token, account=alice.address).run(
+            now=sp.timestamp(1200), valid=False
+        )
 
     sp.add_compilation_target(
         "Whitelist_compiled", 
         Whitelist(
-            administrators = sp.set([sp.address("tz1f6KNARa6KykKhoxAugtKwohmEfz8jrvUH")])
+            administrators = [sp.address("tz1f6KNARa6KykKhoxAugtKwohmEfz8jrvUH")]
         )
     )
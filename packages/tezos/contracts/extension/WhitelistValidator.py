@@ -2,86 +2,263 @@
 import smartpy as sp
 
 
+def transfer_type():
+    return sp.TRecord(
+        from_=sp.TAddress,
+        to_=sp.TAddress,
+        operator=sp.TAddress,
+        is_controller=sp.TBool
+    )
+
+
+# A whole batch of transfers made by one operator, with the parties
+# deduplicated by the token.
+def transfers_type():
+    return sp.TRecord(
+        senders=sp.TSet(sp.TAddress),
+        receivers=sp.TSet(sp.TAddress),
+        operator=sp.TAddress,
+        is_controller=sp.TBool
+    )
+
+
+# Parameter of the Whitelist `are_valid` view. The layout has to match the
+# one of `Whitelist.are_valid`, otherwise the view is not found.
+def are_valid_type():
+    return sp.TRecord(
+        token=sp.TAddress,
+        accounts=sp.TList(sp.TAddress)
+    ).layout(("token", "accounts"))
+
+
 class WhitelistValidator(sp.Contract):
 
-    @sp.entry_point
-    def assertTransfer(self, params):
-        sp.set_type(
-            params, 
-            sp.TRecord(
-                from_=sp.TAddress,
-                to_=sp.TAddress,
-                operator=sp.TAddress,
-                is_controller=sp.TBool
-            )
-        )
+    # The storage is the address of the Whitelist contract.
+    def __init__(self, whitelist=None):
+        self.init_type(sp.TAddress)
+        if whitelist is not None:
+            self.init_storage(whitelist)
 
-        c = sp.contract(
-            t = sp.TRecord(
-                address=sp.TAddress,
-                token=sp.TAddress
+    def is_valid(self, token, params):
+        # Only controller can move tokens from a valid or invalid address
+        accounts = sp.local("accounts", sp.list([params.to_]))
+        sp.if ~params.is_controller:
+            accounts.value.push(params.from_)
+
+        return sp.view(
+            "are_valid",
+            self.data,
+            sp.set_type_expr(
+                sp.record(
+                    token=token,
+                    accounts=accounts.value
+                ),
+                are_valid_type()
             ),
-            address = self.data, 
-            entry_point = "assertValid"
+            t=sp.TBool
         ).open_some()
 
-        # Only controller can move tokens from a valid or invalid address
+    def are_valid(self, token, params):
+        accounts = sp.local("accounts", params.receivers)
         sp.if ~params.is_controller:
-            sp.transfer(
+            sp.for sender in params.senders.elements():
+                accounts.value.add(sender)
+
+        return sp.view(
+            "are_valid",
+            self.data,
+            sp.set_type_expr(
                 sp.record(
-                    address=params.from_,
-                    token=sp.sender
+                    token=token,
+                    accounts=accounts.value.elements()
                 ),
-                sp.mutez(0),
-                c
-            )
-        
-        sp.transfer(
-            sp.record(
-                address=params.to_,
-                token=sp.sender
+                are_valid_type()
             ),
-            sp.mutez(0),
-            c
-        )
+            t=sp.TBool
+        ).open_some()
+
+    @sp.entry_point
+    def assertTransfer(self, params):
+        sp.set_type(params, transfer_type())
+
+        sp.verify(self.is_valid(sp.sender, params))
+
+    # Read by the token contract (the view's sender) with `sp.view` so that
+    # a transfer does not emit any validation operation.
+    @sp.onchain_view()
+    def validateTransfer(self, params):
+        sp.set_type(params, transfer_type())
+
+        sp.result(self.is_valid(sp.sender, params))
+
+    @sp.entry_point
+    def assertTransfers(self, params):
+        sp.set_type(params, transfers_type())
+
+        sp.verify(self.are_valid(sp.sender, params))
+
+    # Batched `validateTransfer`: one Whitelist read for all the parties of a
+    # `transferMultiple` or FA2 `transfer` call.
+    @sp.onchain_view()
+    def validateTransfers(self, params):
+        sp.set_type(params, transfers_type())
+
+        sp.result(self.are_valid(sp.sender, params))
+
+
+class TestWhitelist(sp.Contract):
+    def __init__(self, valid):
+        self.init(valid=valid)
+
+    @sp.onchain_view()
+    def are_valid(self, params):
+        sp.set_type(params, are_valid_type())
+        valid = sp.local("valid", True)
+        sp.for account in params.accounts:
+            valid.value = valid.value & self.data.valid.contains(account)
+        sp.result(valid.value)
 
 
 class TestToken(sp.Contract):
-    def __init__(self, validator, controller):
-        self.init(validator=validator, controller=controller)
-    
+    def __init__(self, validator):
+        self.init(validator=validator)
+
+    # pull-style validation through an internal operation
     @sp.entry_point
     def transfer(self, params):
-        # controller should be able to move tokens out of a blocked address
         c = sp.contract(
-            t = sp.TRecord(
-                from_=sp.TAddress,
-                to_=sp.TAddress,
-                operator=sp.TAddress,
-                is_controller=sp.TBool
-            ), 
-            address = self.data.validator, 
+            t = transfer_type(),
+            address = self.data.validator,
             entry_point = "assertTransfer"
         ).open_some()
-                    
+
         sp.transfer(
             sp.record(
                 from_=params.from_,
                 to_=params.to_,
                 operator=sp.sender,
-                is_controller=True
+                is_controller=params.is_controller
             ),
             sp.mutez(0),
             c
         )
-        
+
+    # synchronous validation through the on-chain view
+    @sp.entry_point
+    def transferWithView(self, params):
+        sp.verify(
+            sp.view(
+                "validateTransfer",
+                self.data.validator,
+                sp.set_type_expr(
+                    sp.record(
+                        from_=params.from_,
+                        to_=params.to_,
+                        operator=sp.sender,
+                        is_controller=params.is_controller
+                    ),
+                    transfer_type()
+                ),
+                t=sp.TBool
+            ).open_some()
+        )
+
 
 if "templates" not in __name__:
     @sp.add_test(name="WhitelistValidator", is_default=True)
     def test():
-        pass
+        scenario = sp.test_scenario()
+        scenario.h1("WhitelistValidator")
+
+        alice = sp.test_account("Alice")
+        bob = sp.test_account("Bob")
+        mallory = sp.test_account("Mallory")
+
+        whitelist = TestWhitelist(sp.set([alice.address, bob.address]))
+        scenario += whitelist
+
+        validator = WhitelistValidator(whitelist.address)
+        scenario += validator
+
+        token = TestToken(validator.address)
+        scenario += token
+
+        scenario.h2("Through the assertTransfer entrypoint")
+        scenario += token.transfer(from_=alice.address, to_=bob.address, is_controller=False)
+        scenario += token.transfer(from_=mallory.address, to_=bob.address, is_controller=False).run(valid=False)
+        scenario += token.transfer(from_=mallory.address, to_=bob.address, is_controller=True)
+
+        scenario.h2("Through the validateTransfer view")
+        scenario += token.transferWithView(from_=alice.address, to_=bob.address, is_controller=False)
+        scenario += token.transferWithView(from_=alice.address, to_=mallory.address, is_controller=False).run(valid=False)
+        scenario += token.transferWithView(from_=mallory.address, to_=bob.address, is_controller=False).run(valid=False)
+        scenario += token.transferWithView(from_=mallory.address, to_=bob.address, is_controller=True)
+
+        scenario.h2("Batches")
+        scenario += validator.assertTransfers(
+            senders=sp.set([alice.address, bob.address]),
+            receivers=sp.set([alice.address, bob.address]),
+            operator=alice.address,
+            is_controller=False
+        )
+        scenario += validator.assertTransfers(
+            senders=sp.set([alice.address, mallory.address]),
+            receivers=sp.set([bob.address]),
+            operator=alice.address,
+            is_controller=False
+        ).run(valid=False)
+        scenario += validator.assertTransfers(
+            senders=sp.set([alice.address, mallory.address]),
+            receivers=sp.set([bob.address]),
+            operator=alice.address,
+            is_controller=True
+        )
+        scenario += validator.assertTransfers(
+            senders=sp.set([alice.address]),
+            receivers=sp.set([bob.address, mallory.address]),
+            operator=alice.address,
+            is_controller=True
+        ).run(valid=False)
+
+    # Against the Whitelist contract itself, whose `are_valid` view has to
+    # accept the parameter the validator sends.
+    @sp.add_test(name="WhitelistValidator_Whitelist")
+    def test():
+        compliance = sp.io.import_script_from_url(
+            "file:contracts/compliance/Whitelist.py",
+            name="templates/Whitelist"
+        )
+
+        scenario = sp.test_scenario()
+        scenario.h1("WhitelistValidator with the Whitelist")
+
+        admin = sp.test_account("Administrator")
+        alice = sp.test_account("Alice")
+        bob = sp.test_account("Bob")
+        mallory = sp.test_account("Mallory")
+
+        whitelist = compliance.Whitelist(administrators=[admin.address])
+        scenario += whitelist
+
+        validator = WhitelistValidator(whitelist.address)
+        scenario += validator
+
+        token = TestToken(validator.address)
+        scenario += token
+
+        scenario += whitelist.addToWhitelistBatch(
+            sp.list([sp.record(token=token.address, accounts=sp.list([alice.address, bob.address]))])
+        ).run(sender=admin)
+
+        scenario.h2("Through the assertTransfer entrypoint")
+        scenario += token.transfer(from_=alice.address, to_=bob.address, is_controller=False)
+        scenario += token.transfer(from_=mallory.address, to_=bob.address, is_controller=False).run(valid=False)
+
+        scenario.h2("Through the validateTransfer view")
+        scenario += token.transferWithView(from_=alice.address, to_=bob.address, is_controller=False)
+        scenario += token.transferWithView(from_=alice.address, to_=mallory.address, is_controller=False).run(valid=False)
 
     sp.add_compilation_target(
-        "WhitelistValidator_compiled", 
+        "WhitelistValidator_compiled",
         WhitelistValidator()
     )
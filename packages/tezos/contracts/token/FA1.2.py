@@ -1,3 +1,5 @@
+import os
+
 import smartpy as sp
     
 
@@ -9,63 +11,123 @@ PAUSER_ROLE = 4
 VALIDATOR_ROLE = 5
 
 
-def make_role(role_admin, members=sp.set([], t=sp.TAddress)):
-    return sp.record(
-        role_admin = role_admin,
-        members = members
+def role_mask(*roles):
+    mask = 0
+    for role in roles:
+        mask |= 1 << role
+    return sp.nat(mask)
+
+
+# Roles are kept in a big-map from each member to the bitmask of its roles
+# (bit `n` is set for role `n`), so that a single lookup answers every role
+# question about an account. An address listed under several roles gets one
+# entry with all of their bits.
+def make_roles(administrators=[], validators=[], controllers=[], burners=[], minters=[]):
+    masks = {}
+    for role, members in [
+        (ADMIN_ROLE, administrators),
+        (CONTROLLER_ROLE, controllers),
+        (MINTER_ROLE, minters),
+        (BURNER_ROLE, burners),
+        (VALIDATOR_ROLE, validators),
+    ]:
+        for member in members:
+            masks[member] = masks.get(member, 0) | (1 << role)
+    return sp.big_map(
+        {member: sp.nat(mask) for member, mask in masks.items()},
+        tkey=sp.TAddress,
+        tvalue=sp.TNat
     )
 
-def make_roles(administrators, validators, controllers, burners, minters):
-    return sp.map(
-        {
-            ADMIN_ROLE: make_role(ADMIN_ROLE, administrators),
-            CONTROLLER_ROLE: make_role(ADMIN_ROLE, controllers),
-            MINTER_ROLE: make_role(ADMIN_ROLE, minters),
-            BURNER_ROLE: make_role(ADMIN_ROLE, burners),
-            PAUSER_ROLE: make_role(ADMIN_ROLE),
-            VALIDATOR_ROLE: make_role(ADMIN_ROLE, validators)
-        },
-        tkey=sp.TNat, 
-        tvalue=sp.TRecord(
-            role_admin=sp.TNat,
-            members=sp.TSet(t=sp.TAddress)
-        )
-    )
+
+# Changes pushed by the Whitelist in push mode, see `TransferValidation`.
+# `expiry` is the end of the account's KYC, `sp.none` if it does not expire.
+def whitelist_update_type():
+    return sp.TRecord(
+        account=sp.TAddress,
+        valid=sp.TBool,
+        expiry=sp.TOption(sp.TTimestamp)
+    ).layout(("account", ("valid", "expiry")))
+
+
+def whitelisted_entry_type():
+    return sp.TRecord(
+        epoch=sp.TNat,
+        expiry=sp.TOption(sp.TTimestamp)
+    ).layout(("epoch", "expiry"))
 
 
 class AccessControl(sp.Contract):
-    
+
+    def roles_of(self, account):
+        return self.data.roles.get(account, sp.nat(0))
+
+    # `mask` is a bitmask of roles, see `role_mask`.
+    def has_any_role(self, mask, account):
+        return (self.roles_of(account) & mask) != 0
+
     def has_role(self, role, account):
-        return (self.data.roles.contains(role) & self.data.roles[role].members.contains(account))
+        return self.has_any_role(sp.nat(1) << role, account)
     
     def sender_has_role(self, role):
         return self.has_role(role, sp.sender)
-    
+
+    def sender_has_any_role(self, mask):
+        return self.has_any_role(mask, sp.sender)
+
+    # admin has all roles
+    def is_member(self, role, account):
+        return self.has_any_role(role_mask(ADMIN_ROLE) | (sp.nat(1) << role), account)
+
+    # Every role is administered by the ADMIN_ROLE.
+    def verify_role_admin(self, role):
+        sp.verify(role <= VALIDATOR_ROLE)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+
+    def add_role(self, role, account):
+        self.data.roles[account] = self.roles_of(account) | (sp.nat(1) << role)
+        # validators are also kept in a small set, to be iterated over on
+        # every transfer
+        sp.if role == VALIDATOR_ROLE:
+            self.data.validators.add(account)
+
+    def remove_role(self, role, account):
+        roles = sp.local("roles", self.roles_of(account))
+        roles.value = sp.as_nat(roles.value - (roles.value & (sp.nat(1) << role)))
+        sp.if roles.value == 0:
+            del self.data.roles[account]
+        sp.else:
+            self.data.roles[account] = roles.value
+        sp.if role == VALIDATOR_ROLE:
+            self.data.validators.remove(account)
+
     @sp.entry_point
     def assertRole(self, params):
-        # admin has all roles
-        sp.verify(self.has_role(ADMIN_ROLE, params.account) | self.has_role(params.role, params.account))
+        sp.verify(self.is_member(params.role, params.account))
+
+    # Synchronous alternative to `assertRole` for other contracts.
+    @sp.onchain_view()
+    def hasRole(self, params):
+        sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
+        sp.result(self.is_member(params.role, params.account))
     
     @sp.entry_point
     def grantRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if ~self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.add(p.account)
+            self.verify_role_admin(p.role)
+            self.add_role(p.role, p.account)
     
     @sp.entry_point
     def revokeRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
+            self.verify_role_admin(p.role)
+            self.remove_role(p.role, p.account)
     
     @sp.entry_point
     def renounceRole(self, params):
         sp.for p in params:
             sp.verify(p.account == sp.sender)
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
+            self.remove_role(p.role, p.account)
 
 
 class Pausable(AccessControl):
@@ -75,13 +137,13 @@ class Pausable(AccessControl):
 
     @sp.entry_point
     def set_paused(self, paused):
-        sp.verify(self.sender_has_role(PAUSER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        sp.verify(self.sender_has_any_role(role_mask(PAUSER_ROLE, ADMIN_ROLE)))
         self.data.paused = paused
 
 class Mintable(AccessControl):
 
     def is_minter(self):
-        return (self.sender_has_role(MINTER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        return self.sender_has_any_role(role_mask(MINTER_ROLE, ADMIN_ROLE))
 
     @sp.sub_entry_point
     def _mint(self, params):
@@ -95,9 +157,7 @@ class Mintable(AccessControl):
         # verify issuable
         sp.verify(self.data.issuable)
         
-        self.add_address_if_necessary(params.address)
-
-        self.data.ledger[params.address].balance += params.amount
+        self.data.ledger[params.address] = self.data.ledger.get(params.address, sp.nat(0)) + params.amount
         self.data.total_supply += params.amount
 
     # a.k.a issue / issueMultiple
@@ -118,7 +178,7 @@ class Mintable(AccessControl):
 class Burnable(AccessControl):
                         
     def is_burner(self):
-        return (self.sender_has_role(BURNER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        return self.sender_has_any_role(role_mask(BURNER_ROLE, ADMIN_ROLE))
 
     @sp.sub_entry_point
     def _burn(self, params):
@@ -129,7 +189,7 @@ class Burnable(AccessControl):
             )
         )
 
-        sp.verify(self.data.ledger[params.address].balance >= params.amount)
+        sp.verify(self.data.ledger.get(params.address, sp.nat(0)) >= params.amount)
 
         self.decrease_and_remove_balance_if_necessary(params.address, params.amount)
         
@@ -149,7 +209,7 @@ class Controller(AccessControl):
     def is_controller(self, account):
         return (
             self.data.controllable & 
-            (self.has_role(CONTROLLER_ROLE, account) | self.has_role(ADMIN_ROLE, account))
+            self.has_any_role(role_mask(CONTROLLER_ROLE, ADMIN_ROLE), account)
         )
     
     @sp.entry_point
@@ -166,11 +226,8 @@ class Operator(Controller):
             (params.owner == params.operator) | 
             (self.is_controller(params.operator)) |
             (self.data.operable & (
-                (self.data.ledger.contains(params.owner) & 
-                self.data.ledger[params.owner].operators.contains(params.operator)) | 
-                (self.data.ledger.contains(params.owner) & 
-                self.data.ledger[params.owner].approvals.contains(params.operator) & 
-                (self.data.ledger[params.owner].approvals[params.operator] >= params.amount))
+                self.data.operators.contains(Operator_key.make(params.owner, params.operator)) | 
+                (self.data.approvals.get(Allowance_key.make(params.owner, params.operator), sp.nat(0)) >= params.amount)
             ))
         )
 
@@ -200,53 +257,54 @@ class Operator(Controller):
                                 (upd.owner == sp.sender) |
                                 (self.is_controller(sp.sender))
                             )
-                            self.data.ledger[upd.owner].operators.add(upd.operator)
+                            self.data.operators[Operator_key.make(upd.owner, upd.operator)] = sp.unit
                     with arg.match("remove_operators") as remove_operators:
                         sp.for upd in remove_operators:
                             sp.verify(
                                 (upd.owner == sp.sender) |
                                 (self.is_controller(sp.sender))
                             )
-                            self.data.ledger[upd.owner].operators.remove(upd.operator)
+                            del self.data.operators[Operator_key.make(upd.owner, upd.operator)]
         sp.else:
             sp.failwith("noop")
 
 
-class Ledger_key:
-    
-    def __init__(self, config):
-        self.config = config
+## Balances are kept in a lean `address -> nat` big-map. Operators and
+## allowances live in their own big-maps keyed by `(owner, operator)` and
+## `(owner, spender)`, so a balance update does not load them.
+class Operator_key:
 
-    def make(self, user):
-        user = sp.set_type_expr(user, sp.TAddress)
+    def get_type():
+        return sp.TRecord(
+            owner=sp.TAddress,
+            operator=sp.TAddress
+        ).layout(("owner", "operator"))
 
-        result = user
+    def make(owner, operator):
+        return sp.set_type_expr(
+            sp.record(
+                owner=owner,
+                operator=operator
+            ),
+            Operator_key.get_type()
+        )
 
-        if self.config.readable:
-            return result
-        else:
-            return sp.pack(result)
 
+class Allowance_key:
 
-class Ledger_value:
-   
     def get_type():
         return sp.TRecord(
-            balance=sp.TNat,
-            operators=sp.TSet(
-                sp.TAddress
-            ),
-            approvals=sp.TMap(
-                sp.TAddress,
-                sp.TNat,
-            ),
-        )
+            owner=sp.TAddress,
+            spender=sp.TAddress
+        ).layout(("owner", "spender"))
 
-    def make(balance):
-        return sp.record(
-            balance=balance,
-            operators=sp.set([], t=sp.TAddress),
-            approvals=sp.map()
+    def make(owner, spender):
+        return sp.set_type_expr(
+            sp.record(
+                owner=owner,
+                spender=spender
+            ),
+            Allowance_key.get_type()
         )
 
 
@@ -260,54 +318,124 @@ class Ledger(sp.Contract):
 
         self.init(
             total_supply=sp.as_nat(0),
-            ledger=self.ledger_map(tvalue=Ledger_value.get_type()),
+            ledger=self.ledger_map(tkey=sp.TAddress, tvalue=sp.TNat),
+            operators=self.ledger_map(tkey=Operator_key.get_type(), tvalue=sp.TUnit),
+            approvals=self.ledger_map(tkey=Allowance_key.get_type(), tvalue=sp.TNat),
             **extra_storage
         )
 
-    def decrease_approval_if_necessary(self, key, operator, amount):
-        sp.if self.data.ledger.contains(key):
-            sp.if self.data.ledger[key].approvals.contains(operator):
-                sp.if self.data.ledger[key].approvals[operator] > amount:
-                    self.data.ledger[key].approvals[operator] = sp.as_nat(self.data.ledger[key].approvals[operator] - amount)
+    def decrease_approval_if_necessary(self, owner, spender, amount):
+        key = Allowance_key.make(owner, spender)
+        sp.if self.data.approvals.contains(key):
+            sp.if self.data.approvals[key] >= amount:
+                self.data.approvals[key] = sp.as_nat(self.data.approvals[key] - amount)
+                sp.if self.data.approvals[key] == 0:
+                    del self.data.approvals[key]
 
     def decrease_and_remove_balance_if_necessary(self, key, amount):
         sp.if self.data.ledger.contains(key):
-            self.data.ledger[key].balance = sp.as_nat(self.data.ledger[key].balance - amount)
-            sp.if self.data.ledger[key].balance <= 0:
+            self.data.ledger[key] = sp.as_nat(self.data.ledger[key] - amount)
+            sp.if self.data.ledger[key] == 0:
                 del self.data.ledger[key]
-    
-    def add_address_if_necessary(self, address):
-        sp.if ~self.data.ledger.contains(address):
-            self.data.ledger[address] = Ledger_value.make(0)
 
 
 class TransferValidation(Controller):
 
-    def assertTransfer(self, params):
-        sp.set_type(params, sp.TRecord(from_ = sp.TAddress, to_ = sp.TAddress))
-        sp.for validator in self.data.roles[VALIDATOR_ROLE].members.elements():
-            c = sp.contract(
-                t = sp.TRecord(
-                    from_=sp.TAddress,
-                    to_=sp.TAddress,
-                    operator=sp.TAddress,
-                    is_controller=sp.TBool
-                ), 
-                address = validator, 
-                entry_point = "assertTransfer"
-            ).open_some()
-                        
-            sp.transfer(
-                sp.record(
-                    operator=sp.sender,
-                    is_controller=self.is_controller(sp.sender),
-                    from_=params.from_,
-                    to_=params.to_
-                ),
-                sp.mutez(0),
-                c
+    # Validators expose the `validateTransfers` on-chain view, so validation
+    # is synchronous and does not emit any internal operation. A batch of
+    # transfers is validated with one read per validator, with the senders
+    # and receivers deduplicated.
+    def assertTransfers(self, params):
+        senders = sp.local("senders", sp.set([], t = sp.TAddress))
+        receivers = sp.local("receivers", sp.set([], t = sp.TAddress))
+        sp.for p in params:
+            senders.value.add(p.from_)
+            receivers.value.add(p.to_)
+
+        sp.for validator in self.data.validators.elements():
+            sp.verify(
+                sp.view(
+                    "validateTransfers",
+                    validator,
+                    sp.set_type_expr(
+                        sp.record(
+                            senders=senders.value,
+                            receivers=receivers.value,
+                            operator=sp.sender,
+                            is_controller=self.is_controller(sp.sender)
+                        ),
+                        sp.TRecord(
+                            senders=sp.TSet(sp.TAddress),
+                            receivers=sp.TSet(sp.TAddress),
+                            operator=sp.TAddress,
+                            is_controller=sp.TBool
+                        )
+                    ),
+                    t = sp.TBool
+                ).open_some()
             )
 
+        # Push mode: the accounts valid for this token are pushed by the
+        # Whitelist contract, so they are checked with local reads instead
+        # of through a validator.
+        sp.if self.data.whitelist.is_some():
+            sp.for receiver in receivers.value.elements():
+                sp.verify(self.is_whitelisted(receiver))
+            # Only controller can move tokens from a valid or invalid address
+            sp.if ~self.is_controller(sp.sender):
+                sp.for sender in senders.value.elements():
+                    sp.verify(self.is_whitelisted(sender))
+
+    # Pushed accounts are stamped with `whitelisted_epoch`: bumping it drops
+    # them all at once, and a stale entry is overwritten by the next update.
+    # An expired KYC makes the account invalid without any update.
+    def is_whitelisted(self, account):
+        entry = sp.compute(
+            self.data.whitelisted.get(
+                account,
+                sp.record(epoch=sp.nat(0), expiry=sp.some(sp.timestamp(0)))
+            )
+        )
+        return (entry.epoch == self.data.whitelisted_epoch) & sp.eif(
+            entry.expiry.is_some(),
+            sp.now < entry.expiry.open_some(),
+            True
+        )
+
+    # Switching to push mode: the Whitelist is set here before it subscribes
+    # this token, then the WhitelistValidator can be revoked. `sp.none`
+    # switches back to the validators alone. The accounts pushed by a
+    # previous Whitelist are dropped.
+    @sp.entry_point
+    def setWhitelist(self, whitelist):
+        sp.set_type(whitelist, sp.TOption(sp.TAddress))
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+
+        sp.if self.data.whitelist != whitelist:
+            self.data.whitelisted_epoch += 1
+        self.data.whitelist = whitelist
+
+    @sp.entry_point
+    def updateWhitelisted(self, params):
+        sp.set_type(params, sp.TList(whitelist_update_type()))
+        sp.verify(self.data.whitelist == sp.some(sp.sender))
+
+        sp.for update in params:
+            sp.if update.valid:
+                self.data.whitelisted[update.account] = sp.record(
+                    epoch=self.data.whitelisted_epoch,
+                    expiry=update.expiry
+                )
+            sp.else:
+                del self.data.whitelisted[update.account]
+
+    # Sent by the Whitelist when it resets this token's whitelist.
+    @sp.entry_point
+    def resetWhitelisted(self):
+        sp.verify(self.data.whitelist == sp.some(sp.sender))
+
+        self.data.whitelisted_epoch += 1
+
 
 class FA12_config:
     def __init__(
@@ -365,6 +493,12 @@ class FA12_core(Ledger):
     def __init__(self, config, **extra_storage):
         self.config = config
 
+        if config.lazy_entry_points:
+            self.add_flag("lazy-entry-points", "single")
+
+        if config.lazy_entry_points_multiple:
+            self.add_flag("lazy-entry-points", "multiple")
+
         Ledger.__init__(
             self,
             debug_mode=self.config.debug_mode,
@@ -394,13 +528,9 @@ class FA12_core(Ledger):
                 )
             )
 
-        self.assertTransfer(sp.record(from_ = params.from_, to_ = params.to_))
-
-        self.add_address_if_necessary(params.to_)
-
-        sp.verify(self.data.ledger[params.from_].balance >= params.value)
+        sp.verify(self.data.ledger.get(params.from_, sp.nat(0)) >= params.value)
         
-        self.data.ledger[params.to_].balance += params.value
+        self.data.ledger[params.to_] = self.data.ledger.get(params.to_, sp.nat(0)) + params.value
         self.decrease_and_remove_balance_if_necessary(params.from_, params.value)
         
         self.decrease_approval_if_necessary(params.from_, sp.sender, params.value)
@@ -417,17 +547,21 @@ class FA12_core(Ledger):
                 ("from_ as from", ("to_ as to", "value"))
             )
         )
-        
-        self._transfer(
-            sp.record(
-                from_ = params.from_,
-                to_ = params.to_,
-                value = params.value
-            )
+
+        transfer = sp.record(
+            from_ = params.from_,
+            to_ = params.to_,
+            value = params.value
         )
 
+        self.assertTransfers(sp.list([transfer]))
+        
+        self._transfer(transfer)
+
     @sp.entry_point
     def transferMultiple(self, params):
+        self.assertTransfers(params)
+
         sp.for p in params:
             self._transfer(p)
 
@@ -445,17 +579,21 @@ class FA12_core(Ledger):
         sp.verify(~self.is_paused())
 
         # Allow changing approve value to any value
-        # alreadyApproved = self.data.ledger[sp.sender].approvals.get(params.spender, 0)
+        # alreadyApproved = self.data.approvals.get(Allowance_key.make(sp.sender, params.spender), 0)
         # sp.verify((alreadyApproved == 0) | (params.value == 0), "UnsafeAllowanceChange")
         
-        self.data.ledger[sp.sender].approvals[params.spender] = params.value
+        key = Allowance_key.make(sp.sender, params.spender)
+        sp.if params.value == 0:
+            del self.data.approvals[key]
+        sp.else:
+            self.data.approvals[key] = params.value
     
     # (view (address :owner) nat)                   %getBalance
     @sp.utils.view(sp.TNat)
     def getBalance(self, params):
         sp.set_type(params, sp.TAddress)
         
-        sp.result(self.data.ledger[params].balance)
+        sp.result(self.data.ledger.get(params, sp.nat(0)))
     
     # (view (address :owner, address :spender) nat) %getAllowance
     @sp.utils.view(sp.TNat)
@@ -470,7 +608,7 @@ class FA12_core(Ledger):
         
         sp.verify(self.data.operable)
         
-        sp.result(self.data.ledger[params.owner].approvals[params.spender])
+        sp.result(self.data.approvals.get(Allowance_key.make(params.owner, params.spender), sp.nat(0)))
     
     # (view unit nat)                               %getTotalSupply
     @sp.utils.view(sp.TNat)
@@ -493,10 +631,11 @@ class ST12(
             contract_metadata,
             token_metadata,
             administrators,
-            validators=sp.set([], t=sp.TAddress),
-            controllers=sp.set([], t=sp.TAddress),
-            burners=sp.set([], t=sp.TAddress),
-            minters=sp.set([], t=sp.TAddress)
+            validators=[],
+            controllers=[],
+            burners=[],
+            minters=[],
+            whitelist=None
         ):
             
         FA12_core.__init__(
@@ -515,8 +654,16 @@ class ST12(
                 validators=validators,
                 controllers=controllers,
                 burners=burners,
-                minters=burners,
-            )
+                minters=minters,
+            ),
+            validators=sp.set(validators, t=sp.TAddress),
+            # push mode
+            whitelist=sp.set_type_expr(
+                sp.none if whitelist is None else sp.some(whitelist),
+                sp.TOption(sp.TAddress)
+            ),
+            whitelisted=sp.big_map(tkey=sp.TAddress, tvalue=whitelisted_entry_type()),
+            whitelisted_epoch=sp.nat(0)
         )
     
     @sp.entry_point
@@ -543,7 +690,7 @@ def add_test(config, is_default=True):
 
         c1 = ST12(
             config = config,
-            administrators = sp.set([admin.address]),
+            administrators = [admin.address],
             contract_metadata = sp.big_map(l = {
                 "": sp.utils.bytes_of_string("tezos-storage:m"),
                 "m" : sp.utils.bytes_of_string("{\"name\":\"Test\",\"version\":\"security token v1.0\",\"description\":\"Test Digital Security Token\"}"),
@@ -572,7 +719,7 @@ def add_test(config, is_default=True):
         scenario += c1.transfer(from_=alice.address, to_=bob.address, value=4).run(
             sender=alice
         )
-        scenario.verify(c1.data.ledger[alice.address].balance == 14)
+        scenario.verify(c1.data.ledger[alice.address] == 14)
         scenario.h2("Bob tries to transfer from Alice but he doesn't have her approval")
         scenario += c1.transfer(from_=alice.address, to_=bob.address, value=4).run(
             sender=bob, valid=False
@@ -590,7 +737,7 @@ def add_test(config, is_default=True):
         )
         scenario.h2("Admin burns Bob token")
         scenario += c1.burn(sp.list([sp.record(address=bob.address, amount=1)])).run(sender=admin)
-        scenario.verify(c1.data.ledger[alice.address].balance == 10)
+        scenario.verify(c1.data.ledger[alice.address] == 10)
         scenario.h2("Alice tries to burn Bob token")
         scenario += c1.burn(sp.list([sp.record(address=bob.address, amount=1)])).run(
             sender=alice, valid=False
@@ -600,21 +747,21 @@ def add_test(config, is_default=True):
         scenario += c1.transfer(from_=alice.address, to_=bob.address, value=4).run(
             sender=alice, valid=False
         )
-        scenario.verify(c1.data.ledger[alice.address].balance == 10)
+        scenario.verify(c1.data.ledger[alice.address] == 10)
         scenario.h2("Admin transfers while on pause")
         scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(
             sender=admin
         )
         scenario.h2("Admin unpauses the contract and transferts are allowed")
         scenario += c1.set_paused(False).run(sender=admin)
-        scenario.verify(c1.data.ledger[alice.address].balance == 9)
+        scenario.verify(c1.data.ledger[alice.address] == 9)
         scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(
             sender=admin
         )
 
         scenario.verify(c1.data.total_supply == 17)
-        scenario.verify(c1.data.ledger[alice.address].balance == 8)
-        scenario.verify(c1.data.ledger[bob.address].balance == 9)
+        scenario.verify(c1.data.ledger[alice.address] == 8)
+        scenario.verify(c1.data.ledger[bob.address] == 9)
         
         scenario.h2("Burn")
         scenario += c1.burn(
@@ -637,8 +784,76 @@ def add_test(config, is_default=True):
             )
         ).run(sender=admin)
 
+        scenario.h2("Allowances are consumed")
+        scenario += c1.approve(spender=bob.address, value=2).run(sender=alice)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=bob)
+        scenario.verify(c1.data.approvals[sp.record(owner=alice.address, spender=bob.address)] == 1)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=bob)
+        scenario.verify(~c1.data.approvals.contains(sp.record(owner=alice.address, spender=bob.address)))
+        scenario.verify(~c1.data.ledger.contains(alice.address))
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=bob, valid=False)
+
+        scenario.h2("Roles")
+        scenario += c1.mint(sp.list([sp.record(address=alice.address, amount=5)])).run(sender=admin)
+        scenario += c1.grantRole(sp.list([sp.record(role=CONTROLLER_ROLE, account=bob.address)])).run(sender=alice, valid=False)
+        scenario += c1.grantRole(sp.list([
+            sp.record(role=CONTROLLER_ROLE, account=bob.address),
+            sp.record(role=MINTER_ROLE, account=bob.address)
+        ])).run(sender=admin)
+        scenario.verify(c1.data.roles[bob.address] == role_mask(CONTROLLER_ROLE, MINTER_ROLE))
+        scenario += c1.assertRole(role=CONTROLLER_ROLE, account=bob.address)
+        scenario += c1.assertRole(role=BURNER_ROLE, account=bob.address).run(valid=False)
+        scenario.p("Admin has all roles")
+        scenario += c1.assertRole(role=BURNER_ROLE, account=admin.address)
+        scenario.p("Bob moves Alice's tokens as a controller")
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=bob)
+        scenario += c1.revokeRole(sp.list([sp.record(role=CONTROLLER_ROLE, account=bob.address)])).run(sender=admin)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=bob, valid=False)
+        scenario += c1.renounceRole(sp.list([sp.record(role=MINTER_ROLE, account=bob.address)])).run(sender=alice, valid=False)
+        scenario += c1.renounceRole(sp.list([sp.record(role=MINTER_ROLE, account=bob.address)])).run(sender=bob)
+        scenario.verify(~c1.data.roles.contains(bob.address))
+        scenario += c1.grantRole(sp.list([sp.record(role=VALIDATOR_ROLE + 1, account=bob.address)])).run(sender=admin, valid=False)
+
+        scenario.h2("Push mode")
+        whitelist = sp.test_account("Whitelist")
+        scenario += c1.setWhitelist(sp.some(whitelist.address)).run(sender=alice, valid=False)
+        scenario += c1.setWhitelist(sp.some(whitelist.address)).run(sender=admin)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=alice, valid=False)
+        scenario += c1.updateWhitelisted(
+            sp.list([sp.record(account=alice.address, valid=True, expiry=sp.none)])
+        ).run(sender=admin, valid=False)
+        scenario += c1.updateWhitelisted(sp.list([
+            sp.record(account=alice.address, valid=True, expiry=sp.none),
+            sp.record(account=bob.address, valid=True, expiry=sp.none)
+        ])).run(sender=whitelist)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=alice)
+        scenario += c1.updateWhitelisted(
+            sp.list([sp.record(account=alice.address, valid=False, expiry=sp.none)])
+        ).run(sender=whitelist)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=alice, valid=False)
+        scenario.p("Controllers move tokens out of accounts that are no longer valid, but not into them")
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=admin)
+        scenario += c1.transfer(from_=bob.address, to_=alice.address, value=1).run(sender=admin, valid=False)
+        scenario.p("A reset by the Whitelist drops every pushed account")
+        scenario += c1.resetWhitelisted().run(sender=admin, valid=False)
+        scenario += c1.resetWhitelisted().run(sender=whitelist)
+        scenario += c1.transfer(from_=bob.address, to_=bob.address, value=1).run(sender=bob, valid=False)
+        scenario += c1.updateWhitelisted(
+            sp.list([sp.record(account=bob.address, valid=True, expiry=sp.none)])
+        ).run(sender=whitelist)
+        scenario += c1.transfer(from_=bob.address, to_=bob.address, value=1).run(sender=bob)
+        scenario.p("Accounts are no longer valid once their KYC expires")
+        scenario += c1.updateWhitelisted(
+            sp.list([sp.record(account=bob.address, valid=True, expiry=sp.some(sp.timestamp(100)))])
+        ).run(sender=whitelist)
+        scenario += c1.transfer(from_=bob.address, to_=bob.address, value=1).run(sender=bob, now=sp.timestamp(99))
+        scenario += c1.transfer(from_=bob.address, to_=bob.address, value=1).run(sender=bob, now=sp.timestamp(100), valid=False)
+        scenario += c1.setWhitelist(sp.none).run(sender=admin)
+        scenario += c1.transfer(from_=alice.address, to_=bob.address, value=1).run(sender=alice)
+
         scenario.table_of_contents()
 
+
 #
 # # Global Environment Parameters
 #
@@ -674,6 +889,8 @@ def environment_config():
 if "templates" not in __name__:
     add_test(environment_config())
 
+    # the vesting escrow mints and burns
+    escrow = sp.address("KT1S3M3Cn7XBLcNi54cfvMP15j9ew4W4eb1C")
     sp.add_compilation_target(
         "ST12_compiled", 
         ST12(
@@ -692,9 +909,9 @@ if "templates" not in __name__:
                     })
                 )
             }),
-            administrators = sp.set([sp.address("tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr")]),
-            validators = sp.set([sp.address("KT1QkFxZqfCok6LZUJ7zDn6gCDBS7kSao26P")]),
-            burners = sp.set([sp.address("KT1S3M3Cn7XBLcNi54cfvMP15j9ew4W4eb1C")]),
-            minters = sp.set([sp.address("KT1S3M3Cn7XBLcNi54cfvMP15j9ew4W4eb1C")]),
+            administrators = [sp.address("tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr")],
+            validators = [sp.address("KT1QkFxZqfCok6LZUJ7zDn6gCDBS7kSao26P")],
+            burners = [escrow],
+            minters = [escrow],
         )
     )
@@ -1,6 +1,8 @@
 # This protocol is not being used at this moment
 # Still work in progress
 
+import os
+
 import smartpy as sp
 
 
@@ -12,64 +14,104 @@ PAUSER_ROLE = 4
 VALIDATOR_ROLE = 5
 
 
-def make_role(role_admin, members=sp.set([], t=sp.TAddress)):
-    return sp.record(
-        role_admin = role_admin,
-        members = members
+def role_mask(*roles):
+    mask = 0
+    for role in roles:
+        mask |= 1 << role
+    return sp.nat(mask)
+
+
+# Roles are kept in a big-map from each member to the bitmask of its roles
+# (bit `n` is set for role `n`), so that a single lookup answers every role
+# question about an account. An address listed under several roles gets one
+# entry with all of their bits.
+def make_roles(administrators=[], validators=[], controllers=[]):
+    masks = {}
+    for role, members in [
+        (ADMIN_ROLE, administrators),
+        (CONTROLLER_ROLE, controllers),
+        (VALIDATOR_ROLE, validators),
+    ]:
+        for member in members:
+            masks[member] = masks.get(member, 0) | (1 << role)
+    return sp.big_map(
+        {member: sp.nat(mask) for member, mask in masks.items()},
+        tkey=sp.TAddress,
+        tvalue=sp.TNat
     )
 
 
-def make_roles(administrators, validators, controllers):
-    return sp.map(
-        {
-            ADMIN_ROLE: make_role(ADMIN_ROLE, administrators),
-            CONTROLLER_ROLE: make_role(ADMIN_ROLE, controllers),
-            MINTER_ROLE: make_role(ADMIN_ROLE),
-            BURNER_ROLE: make_role(ADMIN_ROLE),
-            PAUSER_ROLE: make_role(ADMIN_ROLE),
-            VALIDATOR_ROLE: make_role(ADMIN_ROLE, validators)
-        },
-        tkey=sp.TNat, 
-        tvalue=sp.TRecord(
-            role_admin=sp.TNat,
-            members=sp.TSet(t=sp.TAddress)
-        )
-    )
+class AccessControl(sp.Contract):
 
+    def roles_of(self, account):
+        return self.data.roles.get(account, sp.nat(0))
+
+    # `mask` is a bitmask of roles, see `role_mask`.
+    def has_any_role(self, mask, account):
+        return (self.roles_of(account) & mask) != 0
 
-class AccessControl(sp.Contract):
-    
     def has_role(self, role, account):
-        return (self.data.roles.contains(role) & self.data.roles[role].members.contains(account))
+        return self.has_any_role(sp.nat(1) << role, account)
     
     def sender_has_role(self, role):
         return self.has_role(role, sp.sender)
-    
+
+    def sender_has_any_role(self, mask):
+        return self.has_any_role(mask, sp.sender)
+
+    # admin has all roles
+    def is_member(self, role, account):
+        return self.has_any_role(role_mask(ADMIN_ROLE) | (sp.nat(1) << role), account)
+
+    # Every role is administered by the ADMIN_ROLE.
+    def verify_role_admin(self, role):
+        sp.verify(role <= VALIDATOR_ROLE)
+        sp.verify(self.sender_has_role(ADMIN_ROLE))
+
+    def add_role(self, role, account):
+        self.data.roles[account] = self.roles_of(account) | (sp.nat(1) << role)
+        # validators are also kept in a small set, to be iterated over on
+        # every transfer
+        sp.if role == VALIDATOR_ROLE:
+            self.data.validators.add(account)
+
+    def remove_role(self, role, account):
+        roles = sp.local("roles", self.roles_of(account))
+        roles.value = sp.as_nat(roles.value - (roles.value & (sp.nat(1) << role)))
+        sp.if roles.value == 0:
+            del self.data.roles[account]
+        sp.else:
+            self.data.roles[account] = roles.value
+        sp.if role == VALIDATOR_ROLE:
+            self.data.validators.remove(account)
+
     @sp.entry_point
     def assertRole(self, params):
-        # admin has all roles
-        sp.verify(self.has_role(ADMIN_ROLE, params.account) | self.has_role(params.role, params.account))
+        sp.verify(self.is_member(params.role, params.account))
+
+    # Synchronous alternative to `assertRole` for other contracts.
+    @sp.onchain_view()
+    def hasRole(self, params):
+        sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
+        sp.result(self.is_member(params.role, params.account))
     
     @sp.entry_point
     def grantRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if ~self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.add(p.account)
+            self.verify_role_admin(p.role)
+            self.add_role(p.role, p.account)
     
     @sp.entry_point
     def revokeRole(self, params):
         sp.for p in params:
-            sp.verify(self.sender_has_role(self.data.roles[p.role].role_admin))
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
+            self.verify_role_admin(p.role)
+            self.remove_role(p.role, p.account)
     
     @sp.entry_point
     def renounceRole(self, params):
         sp.for p in params:
             sp.verify(p.account == sp.sender)
-            sp.if self.has_role(p.role, p.account):
-                self.data.roles[p.role].members.remove(p.account)
+            self.remove_role(p.role, p.account)
 
 
 class Pausable(AccessControl):
@@ -79,12 +121,12 @@ class Pausable(AccessControl):
 
     @sp.entry_point
     def pause(self):
-        sp.verify(self.sender_has_role(PAUSER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        sp.verify(self.sender_has_any_role(role_mask(PAUSER_ROLE, ADMIN_ROLE)))
         self.data.paused = True
 
     @sp.entry_point
     def resume(self):
-        sp.verify(self.sender_has_role(PAUSER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        sp.verify(self.sender_has_any_role(role_mask(PAUSER_ROLE, ADMIN_ROLE)))
 
 
 class Controller(AccessControl):
@@ -92,7 +134,7 @@ class Controller(AccessControl):
     def is_controller(self, account):
         return (
             self.data.controllable & 
-            (self.has_role(CONTROLLER_ROLE, account) | self.has_role(ADMIN_ROLE, account))
+            self.has_any_role(role_mask(CONTROLLER_ROLE, ADMIN_ROLE), account)
         )
     
     @sp.entry_point
@@ -105,7 +147,7 @@ class Controller(AccessControl):
 class Mintable(AccessControl):
 
     def is_minter(self):
-        return (self.sender_has_role(MINTER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        return self.sender_has_any_role(role_mask(MINTER_ROLE, ADMIN_ROLE))
 
     @sp.sub_entry_point
     def _mint(self, params):
@@ -168,7 +210,7 @@ class Mintable(AccessControl):
 class Burnable(AccessControl):
                         
     def is_burner(self):
-        return (self.sender_has_role(BURNER_ROLE) | self.sender_has_role(ADMIN_ROLE))
+        return self.sender_has_any_role(role_mask(BURNER_ROLE, ADMIN_ROLE))
 
     @sp.sub_entry_point
     def _burn(self, params):
@@ -266,29 +308,34 @@ class Ledger(sp.Contract):
                 del self.data.ledger[key]
 
 
-class Transferlist(AccessControl):
-
-    def assertTransfer(self, params):
-        sp.set_type(params, sp.TRecord(from_ = sp.TAddress, to_ = sp.TAddress))
-        sp.for validator in self.data.roles[VALIDATOR_ROLE].members.elements():
-            c = sp.contract(
-                t = sp.TRecord(
-                    from_=sp.TAddress,
-                    to_=sp.TAddress,
-                    operator=sp.TAddress
-                ), 
-                address = validator, 
-                entry_point = "assertTransfer"
-            ).open_some()
-                        
-            sp.transfer(
-                sp.record(
-                    from_=params.from_,
-                    to_=params.to_,
-                    operator=sp.sender
-                ),
-                sp.mutez(0),
-                c
+class Transferlist(Controller):
+
+    # Validators expose the `validateTransfers` on-chain view, so validation
+    # is synchronous and does not emit any internal operation. A batch of
+    # transfers is validated with one read per validator, with the senders
+    # and receivers deduplicated by the caller.
+    def assertTransfers(self, senders, receivers):
+        sp.for validator in self.data.validators.elements():
+            sp.verify(
+                sp.view(
+                    "validateTransfers",
+                    validator,
+                    sp.set_type_expr(
+                        sp.record(
+                            senders=senders,
+                            receivers=receivers,
+                            operator=sp.sender,
+                            is_controller=self.is_controller(sp.sender)
+                        ),
+                        sp.TRecord(
+                            senders=sp.TSet(sp.TAddress),
+                            receivers=sp.TSet(sp.TAddress),
+                            operator=sp.TAddress,
+                            is_controller=sp.TBool
+                        )
+                    ),
+                    t = sp.TBool
+                ).open_some()
             )
                 
                 
@@ -661,13 +708,6 @@ class FA2_core(Ledger):
         sp.if self.is_paused():
             sp.verify(self.is_controller(sp.sender))
         
-        self.assertTransfer(
-            sp.record(
-                from_=params.from_, 
-                to_=params.to_
-            )
-        )
-        
         if self.config.single_asset:
             sp.verify(params.token_id == 0, "single-asset: token-id <> 0")
         
@@ -711,6 +751,15 @@ class FA2_core(Ledger):
     @sp.entry_point
     def transfer(self, params):
         sp.set_type(params, self.batch_transfer.get_type())
+
+        senders = sp.local("senders", sp.set([], t = sp.TAddress))
+        receivers = sp.local("receivers", sp.set([], t = sp.TAddress))
+        sp.for transfer in params:
+            senders.value.add(transfer.from_)
+            sp.for tx in transfer.txs:
+                receivers.value.add(tx.to_)
+
+        self.assertTransfers(senders.value, receivers.value)
         
         sp.for transfer in params:
             sp.for tx in transfer.txs:
@@ -725,6 +774,14 @@ class FA2_core(Ledger):
 
     @sp.entry_point
     def transferMultiple(self, params):
+        senders = sp.local("senders", sp.set([], t = sp.TAddress))
+        receivers = sp.local("receivers", sp.set([], t = sp.TAddress))
+        sp.for p in params:
+            senders.value.add(p.from_)
+            receivers.value.add(p.to_)
+
+        self.assertTransfers(senders.value, receivers.value)
+
         sp.for p in params:
             self._transfer(p)
 
@@ -898,9 +955,9 @@ class ST2(
         self,
         config,
         metadata,
-        administrators=sp.set([], t=sp.TAddress),
-        validators=sp.set([], t=sp.TAddress),
-        controllers=sp.set([], t=sp.TAddress)):
+        administrators=[],
+        validators=[],
+        controllers=[]):
         # Let's show off some meta-programming:
         if config.assume_consecutive_token_ids:
             self.all_tokens.doc = """
@@ -971,7 +1028,8 @@ class ST2(
                 administrators=administrators, 
                 validators=validators,
                 controllers=controllers
-            )
+            ),
+            validators=sp.set(validators, t=sp.TAddress)
         )
     
     @sp.entry_point
@@ -1029,7 +1087,7 @@ def add_test(config, is_default = True):
 
         c1 = ST2(
             config = config,
-            administrators = sp.set([admin.address]),
+            administrators = [admin.address],
             metadata = sp.metadata_of_url("https://example.com")
         )
         
@@ -1503,6 +1561,6 @@ if "templates" not in __name__:
         ST2(
             config = environment_config(),
             metadata = sp.metadata_of_url("https://example.com"),
-            administrators = sp.set([sp.address("tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr")])
+            administrators = [sp.address("tz1M9CMEtsXm3QxA7FmMU2Qh7xzsuGXVbcDr")]
         )
     )
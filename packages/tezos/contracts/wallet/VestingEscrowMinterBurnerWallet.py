@@ -8,437 +8,681 @@ import smartpy as sp
 
 TOKEN_ADMIN_ROLE = 0
 
-def assert_token_admin(token, account):
-    c = sp.contract(
-        t = sp.TRecord(
-            account=sp.TAddress,
-            role=sp.TNat
-        ), 
-        address = token, 
-        entry_point = "assertRole"
-    ).open_some()
-    
-    sp.transfer(
-        sp.record(
-            role=TOKEN_ADMIN_ROLE,
-            account=account
-        ),
-        sp.mutez(0),
-        c
+# The role is read through the token's `hasRole` on-chain view, once per
+# distinct token of a call, instead of sending an `assertRole` operation per
+# schedule.
+def assert_token_admin(tokens, account):
+    sp.for token in tokens.elements():
+        sp.verify(
+            sp.view(
+                "hasRole",
+                token,
+                sp.set_type_expr(
+                    sp.record(
+                        role=TOKEN_ADMIN_ROLE,
+                        account=account
+                    ),
+                    sp.TRecord(
+                        account=sp.TAddress,
+                        role=sp.TNat
+                    )
+                ),
+                t = sp.TBool
+            ).open_some()
+        )
+
+# Schedules are kept in a big-map keyed by an auto-incremented `nat` id,
+# with a per-beneficiery index of schedule ids, so that a claim only loads
+# the schedules of its beneficiery. Their optional human-readable labels are
+# kept apart in `schedule_labels`.
+def vest_type():
+    return sp.TRecord(
+        beneficiery = sp.TAddress,
+        plan_id = sp.TNat,
+        vesting_amount = sp.TNat,
+        label = sp.TOption(sp.TString)
+    )
+
+
+# Vested amounts are summed per `(token_address, token_id)`.
+def token_key_type():
+    return sp.TRecord(
+        token_address = sp.TAddress,
+        token_id = sp.TOption(sp.TNat)
+    ).layout(("token_address", "token_id"))
+
+
+# Claims are summed per `(beneficiery, token_address, token_id)` before being
+# transferred.
+def claim_key_type():
+    return sp.TRecord(
+        beneficiery = sp.TAddress,
+        token_address = sp.TAddress,
+        token_id = sp.TOption(sp.TNat)
+    ).layout(("beneficiery", ("token_address", "token_id")))
+
+
+def mint_type():
+    return sp.TRecord(
+        amount = sp.TNat,
+        metadata = sp.TOption(sp.TMap(sp.TString, sp.TBytes))
+    )
+
+
+def fa12_mint_type():
+    return sp.TRecord(
+        address = sp.TAddress,
+        amount = sp.TNat
+    )
+
+
+def fa2_mint_type():
+    return sp.TRecord(
+        address = sp.TAddress,
+        amount = sp.TNat,
+        token_id = sp.TNat,
+        metadata = sp.TMap(sp.TString, sp.TBytes)
+    )
+
+
+def fa12_tx_type():
+    return sp.TRecord(
+        from_ = sp.TAddress,
+        to_ = sp.TAddress,
+        value = sp.TNat
+    )
+
+
+def fa2_tx_type():
+    return sp.TRecord(
+        to_ = sp.TAddress,
+        token_id = sp.TNat,
+        amount = sp.TNat
+    ).layout(("to_", ("token_id", "amount")))
+
+
+def fa2_transfer_type():
+    return sp.TList(
+        sp.TRecord(
+            from_ = sp.TAddress,
+            txs = sp.TList(fa2_tx_type())
+        ).layout(("from_", "txs"))
+    )
+
+
+# Parameters shared by every schedule of a vesting plan, stored once in
+# `vesting_plans`.
+def vesting_plan_type():
+    return sp.TRecord(
+        start = sp.TTimestamp,
+        end = sp.TTimestamp,
+        cliff = sp.TTimestamp,
+        token_address = sp.TAddress,
+        token_id = sp.TOption(sp.TNat),
+        metadata = sp.TOption(sp.TMap(sp.TString, sp.TBytes))
+    )
+
+
+def make_token_key(plan):
+    return sp.record(
+        token_address = plan.token_address,
+        token_id = plan.token_id
     )
 
+
+def schedule_type():
+    return sp.TRecord(
+        plan_id = sp.TNat,
+        vesting_amount = sp.TNat,
+        claimed_amount = sp.TNat,
+        revoked = sp.TBool,
+        revokedAt = sp.TOption(sp.TTimestamp),
+        revokedBy = sp.TOption(sp.TAddress)
+    )
+
+
+def amounts_type():
+    return sp.TRecord(
+        vesting_amount = sp.TNat,
+        vested_amount = sp.TNat,
+        claimed_amount = sp.TNat,
+        claimable_amount = sp.TNat
+    )
+
+
+def compute_vested(plan, schedule):
+    return sp.eif(
+        schedule.revoked | (plan.start > sp.now) | (plan.cliff > sp.now),
+        sp.nat(0),
+        sp.eif(
+            sp.now >= plan.end,
+            schedule.vesting_amount,
+            schedule.vesting_amount * sp.as_nat(sp.now - plan.start) / sp.as_nat(plan.end - plan.start)
+        )
+    )
+
+
+# A revoked schedule vests nothing, so nothing is claimable even if part of
+# it was claimed before the revocation.
+def compute_claimable(plan, schedule):
+    return sp.as_nat(sp.max(compute_vested(plan, schedule), schedule.claimed_amount) - schedule.claimed_amount)
+
+
 class VestingEscrowMinterBurnerWallet(sp.Contract):
     def __init__(self):
         self.init(
-            schedules = sp.map(
-                tkey= sp.TAddress, 
-                tvalue= sp.TMap(
-                    sp.TString,
-                    sp.TRecord(
-                        revoked = sp.TBool,
-                        revokedAt = sp.TOption(sp.TTimestamp),
-                        revokedBy = sp.TOption(sp.TAddress),
-                        start = sp.TTimestamp,
-                        end = sp.TTimestamp,
-                        cliff = sp.TTimestamp,
-                        vesting_amount = sp.TNat,
-                        claimed_amount = sp.TNat,
-                        token_address = sp.TAddress,
-                        token_id = sp.TOption(sp.TNat)
-                    )
-                )
-            )
-        )
-    
-    @sp.sub_entry_point
-    def _vest(self, params):
-        sp.set_type(params,
-            sp.TRecord(
-                schedule_name = sp.TString,
-                beneficiery = sp.TAddress,
-                start = sp.TTimestamp,
-                end = sp.TTimestamp,
-                cliff = sp.TTimestamp,
-                vesting_amount = sp.TNat,
-                token_address = sp.TAddress,
-                token_id = sp.TOption(sp.TNat),
-                metadata=sp.TOption(sp.TMap(sp.TString, sp.TBytes))
-            )
+            vesting_plans = sp.big_map(
+                tkey = sp.TNat,
+                tvalue = vesting_plan_type()
+            ),
+            next_plan_id = sp.nat(0),
+            schedules = sp.big_map(
+                tkey = sp.TNat,
+                tvalue = schedule_type()
+            ),
+            next_schedule_id = sp.nat(0),
+            schedule_labels = sp.big_map(
+                tkey = sp.TNat,
+                tvalue = sp.TString
+            ),
+            beneficiery_schedules = sp.big_map(
+                tkey = sp.TAddress,
+                tvalue = sp.TSet(sp.TNat)
+            ),
+            claim_queue = sp.big_map(
+                tkey = sp.TNat,
+                tvalue = sp.TAddress
+            ),
+            claim_queue_head = sp.nat(0),
+            claim_queue_tail = sp.nat(0),
+            queued = sp.big_map(
+                tkey = sp.TAddress,
+                tvalue = sp.TUnit
+            ),
+            claim_cursor = sp.nat(0)
         )
+
+    def index_schedule(self, beneficiery, schedule_id):
+        sp.if ~self.data.beneficiery_schedules.contains(beneficiery):
+            self.data.beneficiery_schedules[beneficiery] = sp.set([])
+        self.data.beneficiery_schedules[beneficiery].add(schedule_id)
+
+    def unindex_schedule(self, beneficiery, schedule_id):
+        sp.verify(self.data.beneficiery_schedules[beneficiery].contains(schedule_id))
         
-        # if you send the same schedule_name
-        # it will add to the vesting amount
-        schedule_name = params.schedule_name
+        self.data.beneficiery_schedules[beneficiery].remove(schedule_id)
+        sp.if sp.len(self.data.beneficiery_schedules[beneficiery]) == 0:
+            del self.data.beneficiery_schedules[beneficiery]
+
+    def remove_schedule(self, beneficiery, schedule_id):
+        del self.data.schedules[schedule_id]
+        del self.data.schedule_labels[schedule_id]
+
+        self.unindex_schedule(beneficiery, schedule_id)
+    
+    @sp.entry_point
+    def addVestingPlan(self, params):
+        sp.set_type(params, vesting_plan_type())
         
         sp.verify(params.start < params.cliff)
         sp.verify(params.start < params.end)
         sp.verify(params.cliff < params.end)
+        sp.verify(params.token_id.is_none() | params.metadata.is_some())
+        
+        self.data.vesting_plans[self.data.next_plan_id] = params
+        self.data.next_plan_id += 1
+    
+    @sp.sub_entry_point
+    def _vest(self, params):
+        sp.set_type(params, vest_type())
         
-        beneficiery = params.beneficiery
+        schedule_id = sp.local("schedule_id", self.data.next_schedule_id).value
         
-        schedule = sp.record(
+        self.data.schedules[schedule_id] = sp.record(
+            plan_id = params.plan_id,
+            vesting_amount = params.vesting_amount,
+            claimed_amount = sp.nat(0),
             revoked = False,
             revokedAt = sp.none,
-            revokedBy = sp.none,
-            start = params.start,
-            end = params.end,
-            cliff = params.cliff,
-            claimed_amount = sp.as_nat(0),
-            token_id = params.token_id,
-            token_address = params.token_address,
-            vesting_amount = params.vesting_amount,
+            revokedBy = sp.none
         )
+        self.index_schedule(params.beneficiery, schedule_id)
         
-        sp.if ~self.data.schedules.contains(beneficiery):
-            self.data.schedules[beneficiery] = {}
-            self.data.schedules[beneficiery][schedule_name] = schedule
-        sp.else:
-            sp.if ~self.data.schedules[beneficiery].contains(schedule_name):
-                self.data.schedules[beneficiery][schedule_name] = schedule
-            sp.else:
-                self.data.schedules[beneficiery][schedule_name].vesting_amount += params.vesting_amount
+        sp.if params.label.is_some():
+            self.data.schedule_labels[schedule_id] = params.label.open_some()
+        
+        self.data.next_schedule_id += 1
    
+    # Every vested schedule gets a new id, taken in order from
+    # `next_schedule_id`.
     @sp.entry_point
     def vest(self, params):
-        sp.set_type(
-            params, 
-            sp.TList(
-                sp.TRecord(
-                    schedule_name = sp.TString,
-                    beneficiery = sp.TAddress,
-                    start = sp.TTimestamp,
-                    end = sp.TTimestamp,
-                    cliff = sp.TTimestamp,
-                    vesting_amount = sp.TNat,
-                    token_address = sp.TAddress,
-                    token_id = sp.TOption(sp.TNat),
-                    metadata=sp.TOption(sp.TMap(sp.TString, sp.TBytes))
-                )
-            )
-        )
+        sp.set_type(params, sp.TList(vest_type()))
 
-        sp.for schedule in params:
-            self._vest(schedule)
-            self._mint(
-                sp.record(
-                    to_ = sp.self_address,
-                    amount = schedule.vesting_amount,
-                    token_id = schedule.token_id,
-                    token_address = schedule.token_address,
-                    metadata = schedule.metadata
-                )
-            )
-
-    @sp.sub_entry_point
-    def _vested(self, params):
-        vested_amount = sp.local('vested_amount', sp.as_nat(0))
+        mints = sp.local("mints", sp.map(tkey = sp.TNat, tvalue = sp.TNat))
         
-        sp.verify(self.data.schedules.contains(params.beneficiery) & 
-            self.data.schedules[params.beneficiery].contains(params.schedule_name))
+        sp.for schedule in params:
+            sp.verify(self.data.vesting_plans.contains(schedule.plan_id))
             
-        schedule = self.data.schedules[params.beneficiery][params.schedule_name]
+            self._vest(schedule)
             
-        sp.verify(schedule.claimed_amount < schedule.vesting_amount)
+            mints.value[schedule.plan_id] = mints.value.get(schedule.plan_id, sp.nat(0)) + schedule.vesting_amount
         
-        sp.if schedule.revoked:
-            vested_amount.value = sp.as_nat(0)
-        sp.else:    
-            sp.if ((schedule.start > sp.now) | (schedule.cliff > sp.now)):
-                vested_amount.value = sp.as_nat(0)
-            sp.else:
-                sp.if sp.now >= schedule.end:
-                    vested_amount.value = schedule.vesting_amount
-                sp.else:
-                    sp.if ((sp.now >= schedule.cliff) & (sp.now < schedule.end)):
-                        vested_amount.value = schedule.vesting_amount * sp.as_nat(sp.now - schedule.start) / sp.as_nat(schedule.end - schedule.start)
+        # Plans are read once per distinct plan, not once per schedule.
+        token_mints = sp.local("token_mints", sp.map(tkey = token_key_type(), tvalue = mint_type()))
+        
+        sp.for mint in mints.value.items():
+            plan = self.data.vesting_plans[mint.key]
+            token = make_token_key(plan)
             
-        sp.result(vested_amount.value)
+            sp.if token_mints.value.contains(token):
+                token_mints.value[token].amount += mint.value
+            sp.else:
+                token_mints.value[token] = sp.record(
+                    amount = mint.value,
+                    metadata = plan.metadata
+                )
         
+        self.mint_vested(token_mints.value)
+
+    def plan_of(self, schedule):
+        return self.data.vesting_plans[schedule.plan_id]
+
     @sp.entry_point
     def vestedAmount(self, params):
-        vested_amount = self._vested(sp.record(
-                beneficiery= params.beneficiery, schedule_name= params.schedule_name))
+        schedule = self.data.schedules[params.schedule_id]
         
         sp.transfer(
-            vested_amount, 
+            compute_vested(self.plan_of(schedule), schedule), 
             sp.tez(0), sp.contract(sp.TNat, params.target).open_some())
 
     @sp.entry_point
     def claimableAmount(self, params):
-        vested_amount = self._vested(
-            sp.record(
-                beneficiery = params.beneficiery,
-                schedule_name = params.schedule_name
-            )
-        )
-        
-        schedule = self.data.schedules[params.beneficiery][params.schedule_name]
+        schedule = self.data.schedules[params.schedule_id]
         
         sp.transfer(
-            sp.as_nat(vested_amount - schedule.claimed_amount), 
+            compute_claimable(self.plan_of(schedule), schedule), 
             sp.tez(0), sp.contract(sp.TNat, params.target).open_some())
+
+    # Synchronous alternatives to `vestedAmount` and `claimableAmount`. They
+    # can be read by other contracts with `sp.view`, and off-chain for free
+    # through the `run_script_view` RPC.
+    @sp.onchain_view()
+    def get_vested_amount(self, schedule_id):
+        sp.set_type(schedule_id, sp.TNat)
+        schedule = self.data.schedules[schedule_id]
+        sp.result(compute_vested(self.plan_of(schedule), schedule))
+
+    @sp.onchain_view()
+    def get_claimable_amount(self, schedule_id):
+        sp.set_type(schedule_id, sp.TNat)
+        schedule = self.data.schedules[schedule_id]
+        sp.result(compute_claimable(self.plan_of(schedule), schedule))
+
+    # Totals of a beneficiery's schedules per `(token_address, token_id)`.
+    @sp.onchain_view()
+    def get_beneficiery_amounts(self, beneficiery):
+        sp.set_type(beneficiery, sp.TAddress)
+        
+        amounts = sp.local("amounts", sp.map(tkey = token_key_type(), tvalue = amounts_type()))
+        
+        sp.if self.data.beneficiery_schedules.contains(beneficiery):
+            sp.for schedule_id in self.data.beneficiery_schedules[beneficiery].elements():
+                schedule = self.data.schedules[schedule_id]
+                plan = self.plan_of(schedule)
+                
+                token = make_token_key(plan)
+                sp.if ~amounts.value.contains(token):
+                    amounts.value[token] = sp.record(
+                        vesting_amount = 0,
+                        vested_amount = 0,
+                        claimed_amount = 0,
+                        claimable_amount = 0
+                    )
+                amounts.value[token].vesting_amount += schedule.vesting_amount
+                amounts.value[token].vested_amount += compute_vested(plan, schedule)
+                amounts.value[token].claimed_amount += schedule.claimed_amount
+                amounts.value[token].claimable_amount += compute_claimable(plan, schedule)
+        
+        sp.result(amounts.value)
     
-    @sp.sub_entry_point
-    def _mint(self, params):
-        sp.set_type(params, 
-            sp.TRecord(
-                to_ = sp.TAddress,
-                amount = sp.TNat,
-                token_address = sp.TAddress,
-                token_id = sp.TOption(sp.TNat),
-                metadata=sp.TOption(sp.TMap(sp.TString, sp.TBytes))
-            )
-        )
+    def mint_vested(self, mints):
+        # Vested amounts are summed per `(token_address, token_id)` and sent
+        # as one list-form mint per token contract.
+        fa12_mints = sp.local("fa12_mints", sp.map(tkey = sp.TAddress, tvalue = sp.TList(fa12_mint_type())))
+        fa2_mints = sp.local("fa2_mints", sp.map(tkey = sp.TAddress, tvalue = sp.TList(fa2_mint_type())))
         
-        sp.if params.token_id.is_some():
+        sp.for mint in mints.items():
+            sp.if mint.key.token_id.is_some():
+                sp.if ~fa2_mints.value.contains(mint.key.token_address):
+                    fa2_mints.value[mint.key.token_address] = sp.list([])
+                fa2_mints.value[mint.key.token_address].push(
+                    sp.record(
+                        address = sp.self_address,
+                        amount = mint.value.amount,
+                        token_id = mint.key.token_id.open_some(),
+                        metadata = mint.value.metadata.open_some()
+                    )
+                )
+            sp.else:
+                sp.if ~fa12_mints.value.contains(mint.key.token_address):
+                    fa12_mints.value[mint.key.token_address] = sp.list([])
+                fa12_mints.value[mint.key.token_address].push(
+                    sp.record(
+                        address = sp.self_address,
+                        amount = mint.value.amount
+                    )
+                )
+        
+        sp.for fa12_mint in fa12_mints.value.items():
             c = sp.contract(
-                t = sp.TRecord(
-                        address = sp.TAddress,
-                        amount = sp.TNat,
-                        token_id=sp.TNat,
-                        metadata=sp.TMap(sp.TString, sp.TBytes)
-                    ), 
-                    address = params.token_address, 
-                    entry_point = "mint"
-                ).open_some()
-                            
-            sp.transfer(
-                sp.record(
-                    address = params.to_,
-                    amount = params.amount,
-                    token_id = params.token_id.open_some(),
-                    metadata = params.metadata.open_some()
-                ), 
-                sp.mutez(0),
-                c
-            )
-        sp.else:
+                t = sp.TList(fa12_mint_type()),
+                address = fa12_mint.key,
+                entry_point = "mint"
+            ).open_some()
+            
+            sp.transfer(fa12_mint.value, sp.mutez(0), c)
+        
+        sp.for fa2_mint in fa2_mints.value.items():
             c = sp.contract(
-                t = sp.TRecord(
-                        address = sp.TAddress,
-                        amount = sp.TNat
-                    ), 
-                    address = params.token_address, 
-                    entry_point = "mint"
-                ).open_some()
-                            
-            sp.transfer(
-                sp.record(
-                    address = params.to_,
-                    amount = params.amount
-                ), 
-                sp.mutez(0),
-                c
-            )
+                t = sp.TList(fa2_mint_type()),
+                address = fa2_mint.key,
+                entry_point = "mint"
+            ).open_some()
+            
+            sp.transfer(fa2_mint.value, sp.mutez(0), c)
     
-    @sp.sub_entry_point
-    def _transfer(self, params):
-        sp.set_type(params, 
-            sp.TRecord(
-                token_id = sp.TOption(sp.TNat),
-                token_address = sp.TAddress,
-                from_ = sp.TAddress, 
-                to_ = sp.TAddress,
-                amount = sp.TNat
-            )
-        )
-        sp.if params.token_id.is_some():
+    def transfer_claims(self, claims):
+        # Claims are grouped per token contract: FA2 claims into a single
+        # batch transfer, FA1.2 claims into a single `transferMultiple`.
+        fa12_txs = sp.local("fa12_txs", sp.map(tkey = sp.TAddress, tvalue = sp.TList(fa12_tx_type())))
+        fa2_txs = sp.local("fa2_txs", sp.map(tkey = sp.TAddress, tvalue = sp.TList(fa2_tx_type())))
+        
+        sp.for claim in claims.items():
+            sp.if claim.key.token_id.is_some():
+                sp.if ~fa2_txs.value.contains(claim.key.token_address):
+                    fa2_txs.value[claim.key.token_address] = sp.list([])
+                fa2_txs.value[claim.key.token_address].push(
+                    sp.set_type_expr(
+                        sp.record(
+                            to_ = claim.key.beneficiery,
+                            token_id = claim.key.token_id.open_some(),
+                            amount = claim.value
+                        ),
+                        fa2_tx_type()
+                    )
+                )
+            sp.else:
+                sp.if ~fa12_txs.value.contains(claim.key.token_address):
+                    fa12_txs.value[claim.key.token_address] = sp.list([])
+                fa12_txs.value[claim.key.token_address].push(
+                    sp.set_type_expr(
+                        sp.record(
+                            from_ = sp.self_address,
+                            to_ = claim.key.beneficiery,
+                            value = claim.value
+                        ),
+                        fa12_tx_type()
+                    )
+                )
+        
+        sp.for txs in fa12_txs.value.items():
             c = sp.contract(
-                t = sp.TRecord(
-                    token_id = sp.TNat,
-                    from_ = sp.TAddress, 
-                    to_ = sp.TAddress,
-                    amount = sp.TNat
-                ), 
-                address = params.token_address,
-                entry_point = "transfer"
+                t = sp.TList(fa12_tx_type()),
+                address = txs.key,
+                entry_point = "transferMultiple"
             ).open_some()
-                
-            sp.transfer(
-                sp.record(
-                    token_id = params.token_id.open_some(),
-                    from_ = params.from_,
-                    to_ = params.to_,
-                    amount = params.amount
-                ), 
-                sp.mutez(0),
-                c
-            )
-        sp.else:
+            
+            sp.transfer(txs.value, sp.mutez(0), c)
+        
+        sp.for txs in fa2_txs.value.items():
             c = sp.contract(
-                t = sp.TRecord(
-                    from_ = sp.TAddress, 
-                    to_ = sp.TAddress,
-                    value = sp.TNat
-                ), 
-                address = params.token_address,
+                t = fa2_transfer_type(),
+                address = txs.key,
                 entry_point = "transfer"
             ).open_some()
-                            
+            
             sp.transfer(
-                sp.record(
-                    from_ = params.from_,
-                    to_ = params.to_,
-                    value = params.amount
-                ), 
+                sp.list([
+                    sp.record(
+                        from_ = sp.self_address,
+                        txs = txs.value
+                    )
+                ]),
                 sp.mutez(0),
                 c
             )
     
+    def schedule_ids_of(self, beneficiery):
+        return self.data.beneficiery_schedules.get(beneficiery, sp.set([], t = sp.TNat)).elements()
+    
+    def settle_schedule(self, beneficiery, schedule_id, claims):
+        schedule = self.data.schedules[schedule_id]
+        
+        # Schedules still in their cliff are skipped before computing
+        # anything. Fully claimed and revoked schedules have nothing
+        # left to claim and are pruned, so that later claims only
+        # iterate over active schedules.
+        sp.if schedule.revoked:
+            self.remove_schedule(beneficiery, schedule_id)
+        sp.else:
+            plan = sp.local("plan", self.plan_of(schedule))
+            
+            sp.if sp.now >= plan.value.cliff:
+                claim_amount = sp.local('claim_amount', compute_claimable(plan.value, schedule))
+                
+                sp.if claim_amount.value > 0:
+                    schedule.claimed_amount += claim_amount.value
+                    
+                    claim = sp.record(
+                        beneficiery = beneficiery,
+                        token_address = plan.value.token_address,
+                        token_id = plan.value.token_id
+                    )
+                    claims[claim] = claims.get(claim, sp.nat(0)) + claim_amount.value
+                
+                sp.if schedule.claimed_amount >= schedule.vesting_amount:
+                    self.remove_schedule(beneficiery, schedule_id)
+    
+    def collect_claims(self, beneficiery, claims):
+        sp.for schedule_id in self.schedule_ids_of(beneficiery):
+            self.settle_schedule(beneficiery, schedule_id, claims)
+    
+    def claim_schedules(self, beneficieries):
+        claims = sp.local("claims", sp.map(tkey = claim_key_type(), tvalue = sp.TNat))
+        
+        sp.for beneficiery in beneficieries:
+            self.collect_claims(beneficiery, claims.value)
+        
+        self.transfer_claims(claims.value)
+
     @sp.entry_point
     def claimFor(self, beneficiery):
-        sp.verify(self.data.schedules.contains(beneficiery))
+        sp.verify(self.data.beneficiery_schedules.contains(beneficiery))
         
-        sp.for schedule_name in self.data.schedules[beneficiery].keys():
-            schedule = self.data.schedules[beneficiery][schedule_name]
-            
-            vested_amount = self._vested(
-                sp.record(
-                    beneficiery= beneficiery,
-                    schedule_name= schedule_name
-                )
-            )
-            
-            claim_amount = sp.local('claim_amount', sp.as_nat(0))
-            
-            claim_amount.value = sp.as_nat(vested_amount - schedule.claimed_amount)
-            schedule.claimed_amount += claim_amount.value
-            
-            self._transfer(
-                sp.record(
-                    from_ = sp.self_address,
-                    to_ = beneficiery,
-                    amount = claim_amount.value,
-                    token_id = schedule.token_id,
-                    token_address = schedule.token_address
-                )
-            )
+        self.claim_schedules(sp.list([beneficiery]))
     
     @sp.entry_point
     def claim(self):
-        sp.verify(self.data.schedules.contains(sp.sender))
+        sp.verify(self.data.beneficiery_schedules.contains(sp.sender))
         
-        sp.for schedule_name in self.data.schedules[sp.sender].keys():
-            schedule = self.data.schedules[sp.sender][schedule_name]
-            
-            vested_amount = self._vested(
-                sp.record(
-                    beneficiery= sp.sender,
-                    schedule_name= schedule_name
-                )
-            )
+        self.claim_schedules(sp.list([sp.sender]))
+
+    # Keeper entrypoints: beneficieries without schedules are skipped instead
+    # of failing the whole batch.
+    @sp.entry_point
+    def claimForMany(self, beneficieries):
+        sp.set_type(beneficieries, sp.TList(sp.TAddress))
+        
+        self.claim_schedules(beneficieries)
+
+    # Only beneficieries with schedules are queued, and each at most once
+    # (`queued`), so the queue holds no more entries than there are
+    # beneficieries.
+    @sp.entry_point
+    def queueClaims(self, beneficieries):
+        sp.set_type(beneficieries, sp.TList(sp.TAddress))
+        
+        sp.for beneficiery in beneficieries:
+            sp.if self.data.beneficiery_schedules.contains(beneficiery) & ~self.data.queued.contains(beneficiery):
+                self.data.queued[beneficiery] = sp.unit
+                self.data.claim_queue[self.data.claim_queue_tail] = beneficiery
+                self.data.claim_queue_tail += 1
+
+    # Settles queued beneficieries schedule by schedule, up to
+    # `max_schedules` schedules per call, resuming where the previous call
+    # left off. Every dequeued beneficiery costs at least one unit of the
+    # budget. A beneficiery with more schedules than the budget is settled
+    # over several calls: `claim_cursor` is the lowest schedule id of the
+    # head of the queue still to settle.
+    @sp.entry_point
+    def processClaims(self, max_schedules):
+        sp.set_type(max_schedules, sp.TNat)
+        sp.verify(max_schedules > 0)
+        
+        budget = sp.local("budget", max_schedules)
+        claims = sp.local("claims", sp.map(tkey = claim_key_type(), tvalue = sp.TNat))
+        
+        sp.while (budget.value > 0) & (self.data.claim_queue_head < self.data.claim_queue_tail):
+            beneficiery = sp.local("beneficiery", self.data.claim_queue[self.data.claim_queue_head])
+            settled = sp.local("settled", sp.nat(0))
+            pending = sp.local("pending", False)
             
-            claim_amount = sp.local('claim_amount', sp.as_nat(0))
+            sp.for schedule_id in self.schedule_ids_of(beneficiery.value):
+                sp.if schedule_id >= self.data.claim_cursor:
+                    sp.if settled.value < budget.value:
+                        self.settle_schedule(beneficiery.value, schedule_id, claims.value)
+                        settled.value += 1
+                        self.data.claim_cursor = schedule_id + 1
+                    sp.else:
+                        pending.value = True
             
-            claim_amount.value = sp.as_nat(vested_amount - schedule.claimed_amount)
-            schedule.claimed_amount += claim_amount.value
+            budget.value = sp.as_nat(budget.value - sp.max(settled.value, 1))
             
-            self._transfer(
-                sp.record(
-                    from_ = sp.self_address,
-                    to_ = sp.sender,
-                    amount = claim_amount.value,
-                    token_id = schedule.token_id,
-                    token_address = schedule.token_address
-                )
-            )
+            sp.if ~pending.value:
+                del self.data.claim_queue[self.data.claim_queue_head]
+                del self.data.queued[beneficiery.value]
+                self.data.claim_queue_head += 1
+                self.data.claim_cursor = 0
         
+        self.transfer_claims(claims.value)
+
+    # `revokedAt` / `revokedBy` record the first revocation only.
+    def revoke(self, tokens, schedule_id):
+        schedule = self.data.schedules[schedule_id]
+        sp.verify(~schedule.revoked, "ALREADY_REVOKED")
+        
+        tokens.add(self.plan_of(schedule).token_address)
+        
+        schedule.revoked = True
+        schedule.revokedAt = sp.some(sp.now)
+        schedule.revokedBy = sp.some(sp.sender)
+
     @sp.entry_point
-    def revokeSchedule(self, params):
-        sp.for p in params:
-            schedule = self.data.schedules[p.beneficiery][p.schedule_name]
-                
-            assert_token_admin(schedule.token_address, sp.sender)
-            
-            schedule.revoked = True
-            schedule.revokedAt = sp.some(sp.now)
-            schedule.revokedBy = sp.some(sp.sender)
+    def revokeSchedule(self, schedule_ids):
+        sp.set_type(schedule_ids, sp.TList(sp.TNat))
+        
+        tokens = sp.local("tokens", sp.set([], t = sp.TAddress))
+        
+        sp.for schedule_id in schedule_ids:
+            self.revoke(tokens.value, schedule_id)
+        
+        assert_token_admin(tokens.value, sp.sender)
         
     @sp.entry_point
     def revokeSchedules(self, beneficieries):
+        tokens = sp.local("tokens", sp.set([], t = sp.TAddress))
+        
+        # schedules revoked before and not pruned yet are skipped
         sp.for beneficiery in beneficieries:
-            sp.for schedule_name in self.data.schedules[beneficiery].keys():
-                schedule = self.data.schedules[beneficiery][schedule_name]
-                
-                assert_token_admin(schedule.token_address, sp.sender)
-                
-                schedule.revoked = True
-                schedule.revokedAt = sp.some(sp.now)
-                schedule.revokedBy = sp.some(sp.sender)
+            sp.for schedule_id in self.data.beneficiery_schedules[beneficiery].elements():
+                sp.if ~self.data.schedules[schedule_id].revoked:
+                    self.revoke(tokens.value, schedule_id)
+        
+        assert_token_admin(tokens.value, sp.sender)
+
+    # Only the beneficiery index changes: schedules are not keyed by their
+    # beneficiery.
+    def move_schedule(self, tokens, from_, to_, schedule_id):
+        sp.verify(from_ != to_)
+        
+        tokens.add(self.plan_of(self.data.schedules[schedule_id]).token_address)
+        
+        self.unindex_schedule(from_, schedule_id)
+        self.index_schedule(to_, schedule_id)
         
     @sp.entry_point
     def changeBeneficiery(self, params):
+        tokens = sp.local("tokens", sp.set([], t = sp.TAddress))
+        
         sp.for p in params:
-            assert_token_admin(self.data.schedules[p.from_][p.schedule_name].token_address, sp.sender)
-            
-            sp.if ~self.data.schedules.contains(p.to_):
-                self.data.schedules[p.to_] = {}
-            self.data.schedules[p.to_][p.schedule_name] = self.data.schedules[p.from_][p.schedule_name]
-            del self.data.schedules[p.from_][p.schedule_name]
+            self.move_schedule(tokens.value, p.from_, p.to_, p.schedule_id)
+        
+        assert_token_admin(tokens.value, sp.sender)
 
     @sp.entry_point
     def changeBeneficieryForAll(self, params):
+        tokens = sp.local("tokens", sp.set([], t = sp.TAddress))
+        
         sp.for p in params:
-            sp.for schedule_name in self.data.schedules[p.from_].keys():
-                assert_token_admin(self.data.schedules[p.from_][schedule_name].token_address, sp.sender)
-                
-            self.data.schedules[p.to_] = self.data.schedules[p.from_]
-            del self.data.schedules[p.from_]
+            sp.for schedule_id in self.data.beneficiery_schedules[p.from_].elements():
+                self.move_schedule(tokens.value, p.from_, p.to_, schedule_id)
+        
+        assert_token_admin(tokens.value, sp.sender)
 
 
 # Test Security Token FA1.2 Compliant
 class ST12(sp.Contract):
     
     def __init__(self, admin):
-        self.init(admin=admin)
+        self.init(admin=admin, mints=0, transfers=0)
     
     @sp.entry_point
     def assertRole(self, params):
         sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
         sp.verify(self.data.admin == params.account)
     
+    @sp.onchain_view()
+    def hasRole(self, params):
+        sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
+        sp.result(self.data.admin == params.account)
+    
     @sp.entry_point
     def mint(self, params):
-        sp.set_type(params, sp.TRecord(address=sp.TAddress, amount=sp.TNat))
+        sp.set_type(params, sp.TList(fa12_mint_type()))
+        self.data.mints += 1
     
     @sp.entry_point
-    def transfer(self, params):
-        sp.set_type(params, sp.TRecord(from_=sp.TAddress, to_=sp.TAddress, value=sp.TNat))
+    def transferMultiple(self, params):
+        sp.set_type(params, sp.TList(fa12_tx_type()))
+        self.data.transfers += 1
 
 
 # Test Security Token FA2 Compliant
 class ST2(sp.Contract):
     
     def __init__(self, admin):
-        self.init(admin=admin)
+        self.init(admin=admin, mints=0, transfers=0)
     
     @sp.entry_point
     def assertRole(self, params):
         sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
         sp.verify(self.data.admin == params.account)
     
+    @sp.onchain_view()
+    def hasRole(self, params):
+        sp.set_type(params, sp.TRecord(account=sp.TAddress, role=sp.TNat))
+        sp.result(self.data.admin == params.account)
+    
     @sp.entry_point
     def mint(self, params):
-        sp.set_type(params, 
-            sp.TRecord(
-                address=sp.TAddress,
-                amount=sp.TNat,
-                token_id=sp.TNat,
-                metadata=sp.TMap(sp.TString, sp.TBytes),
-            )
-        )
+        sp.set_type(params, sp.TList(fa2_mint_type()))
+        self.data.mints += 1
     
     @sp.entry_point
     def transfer(self, params):
-        sp.set_type(
-            params, 
-            sp.TRecord(
-                token_id = sp.TNat,
-                from_ = sp.TAddress,
-                to_ = sp.TAddress,
-                amount = sp.TNat
-            )
-        )
+        sp.set_type(params, fa2_transfer_type())
+        self.data.transfers += 1
 
 
 def add_test(is_default=True):
@@ -459,25 +703,80 @@ def add_test(is_default=True):
         scenario += fa12
         scenario += fa2
         scenario += v
+        
+        scenario.h2("Vesting plans")
+        metadata = sp.map({
+            "decimals": sp.utils.bytes_of_string("%d" % 18),
+            "name": sp.utils.bytes_of_string("Test"),
+            "symbol": sp.utils.bytes_of_string("TEST")
+        })
+        scenario += v.addVestingPlan(
+            start = sp.timestamp(0),
+            cliff = sp.timestamp(5),
+            end = sp.timestamp(10),
+            token_address = fa2.address,
+            token_id = sp.some(0),
+            metadata = sp.some(metadata)
+        )
+        scenario += v.addVestingPlan(
+            start = sp.timestamp(0),
+            cliff = sp.timestamp(5),
+            end = sp.timestamp(10),
+            token_address = fa12.address,
+            token_id = sp.none,
+            metadata = sp.none
+        )
+        scenario += v.addVestingPlan(
+            start = sp.timestamp(0),
+            cliff = sp.timestamp(50),
+            end = sp.timestamp(100),
+            token_address = fa12.address,
+            token_id = sp.none,
+            metadata = sp.none
+        )
+        scenario.p("Invalid dates and FA2 plans without metadata are rejected")
+        scenario += v.addVestingPlan(
+            start = sp.timestamp(0),
+            cliff = sp.timestamp(10),
+            end = sp.timestamp(5),
+            token_address = fa12.address,
+            token_id = sp.none,
+            metadata = sp.none
+        ).run(valid = False)
+        scenario += v.addVestingPlan(
+            start = sp.timestamp(0),
+            cliff = sp.timestamp(5),
+            end = sp.timestamp(10),
+            token_address = fa2.address,
+            token_id = sp.some(1),
+            metadata = sp.none
+        ).run(valid = False)
+        scenario.verify(v.data.next_plan_id == 3)
+        fa2_plan, fa12_plan, fa12_long_plan = 0, 1, 2
+        
+        scenario.h2("Claims")
         scenario += v.vest(
             sp.list([
                 sp.record(
-                    schedule_name = "4 Months Cliff Vesting From 12-12-2020",
+                    label = sp.some("4 Months Cliff Vesting From 12-12-2020"),
                     beneficiery = alice.address, 
-                    start = sp.timestamp(0), 
-                    cliff = sp.timestamp(5), 
-                    end = sp.timestamp(10), 
-                    vesting_amount = 100,
-                    token_address = fa2.address,
-                    token_id = sp.some(0),
-                    metadata = sp.some(sp.map({
-                        "decimals": sp.utils.bytes_of_string("%d" % 18),
-                        "name": sp.utils.bytes_of_string("Test"),
-                        "symbol": sp.utils.bytes_of_string("TEST")
-                    }))
+                    plan_id = fa2_plan,
+                    vesting_amount = 100
                 )
             ])
         )
+        scenario += v.vest(
+            sp.list([
+                sp.record(
+                    label = sp.none,
+                    beneficiery = alice.address, 
+                    plan_id = 3,
+                    vesting_amount = 100
+                )
+            ])
+        ).run(valid = False)
+        scenario.verify(v.data.next_schedule_id == 1)
+        scenario.verify(v.data.schedule_labels[0] == "4 Months Cliff Vesting From 12-12-2020")
         
         scenario += v.claim().run(sender = alice, now = sp.timestamp(5))
         scenario += v.claim().run(sender = alice, now = sp.timestamp(7))
@@ -488,34 +787,26 @@ def add_test(is_default=True):
         scenario += v.vest(
             sp.list([
                 sp.record(
-                    schedule_name = "5 Months Cliff Vesting From 12-12-2020",
+                    label = sp.some("5 Months Cliff Vesting From 12-12-2020"),
                     beneficiery = alice.address, 
-                    start = sp.timestamp(0), 
-                    cliff = sp.timestamp(5), 
-                    end = sp.timestamp(10), 
-                    vesting_amount = 200,
-                    token_address = fa12.address,
-                    token_id = sp.none,
-                    metadata = sp.none
+                    plan_id = fa12_plan,
+                    vesting_amount = 200
                 ),
                 sp.record(
-                    schedule_name = "8 Months Cliff Vesting From 12-12-2020",
+                    label = sp.some("8 Months Cliff Vesting From 12-12-2020"),
                     beneficiery = bob.address, 
-                    start = sp.timestamp(0), 
-                    cliff = sp.timestamp(5), 
-                    end = sp.timestamp(10), 
-                    vesting_amount = 200,
-                    token_address = fa12.address,
-                    token_id = sp.none,
-                    metadata = sp.none
+                    plan_id = fa12_plan,
+                    vesting_amount = 200
                 )
             ])
         )
         
+        scenario.verify(fa12.data.mints == 1)
+        
         scenario += v.changeBeneficiery(
             sp.list([
                 sp.record(
-                    schedule_name = "8 Months Cliff Vesting From 12-12-2020",
+                    schedule_id = 2,
                     from_ = bob.address, 
                     to_ = alice.address
                 )
@@ -525,13 +816,24 @@ def add_test(is_default=True):
         scenario += v.changeBeneficiery(
             sp.list([
                 sp.record(
-                    schedule_name = "8 Months Cliff Vesting From 12-12-2020",
+                    schedule_id = 2,
                     from_ = bob.address, 
                     to_ = alice.address
                 )
             ])
         ).run(sender = admin)
         
+        scenario.p("Schedules are moved from their current beneficiery only")
+        scenario += v.changeBeneficiery(
+            sp.list([
+                sp.record(
+                    schedule_id = 2,
+                    from_ = bob.address, 
+                    to_ = alice.address
+                )
+            ])
+        ).run(sender = admin, valid = False)
+        
         scenario += v.changeBeneficieryForAll(
             sp.list([
                 sp.record(
@@ -549,6 +851,124 @@ def add_test(is_default=True):
                 )
             ])
         ).run(sender = admin)
+        
+        scenario.verify(~v.data.beneficiery_schedules.contains(alice.address))
+        scenario.p("The fully claimed schedule was pruned, the two others moved")
+        scenario.verify(sp.len(v.data.beneficiery_schedules[bob.address]) == 2)
+        
+        scenario.h2("Views")
+        scenario.verify(
+            v.get_beneficiery_amounts(bob.address)[
+                sp.record(token_address = fa12.address, token_id = sp.none)
+            ].vesting_amount == 400
+        )
+        
+        scenario.h2("Claims are aggregated per token")
+        carol = sp.test_account("Carol")
+        scenario += v.vest(
+            sp.list([
+                sp.record(
+                    label = sp.some(name),
+                    beneficiery = carol.address, 
+                    plan_id = fa2_plan,
+                    vesting_amount = 100
+                )
+                for name in ["Tranche 1", "Tranche 2"]
+            ])
+        )
+        scenario.verify(fa2.data.transfers == 3)
+        scenario.verify(fa2.data.mints == 2)
+        scenario.p("Nothing is vested yet: no transfer is sent")
+        scenario += v.claim().run(sender = carol, now = sp.timestamp(3))
+        scenario.verify(fa2.data.transfers == 3)
+        scenario.p("Both tranches are claimed with one transfer")
+        scenario += v.claim().run(sender = carol, now = sp.timestamp(7))
+        scenario.verify(fa2.data.transfers == 4)
+        scenario.verify(
+            v.get_claimable_amount(3) == 0
+        )
+        scenario.p("Finished schedules are pruned")
+        scenario += v.claim().run(sender = carol, now = sp.timestamp(10))
+        scenario.verify(fa2.data.transfers == 5)
+        scenario.verify(~v.data.beneficiery_schedules.contains(carol.address))
+        scenario += v.claim().run(sender = carol, now = sp.timestamp(11), valid = False)
+        
+        scenario.h2("Exhausted and pre-cliff schedules do not block a claim")
+        dan = sp.test_account("Dan")
+        scenario += v.vest(
+            sp.list([
+                sp.record(
+                    label = sp.some("Short"),
+                    beneficiery = dan.address, 
+                    plan_id = fa12_plan,
+                    vesting_amount = 100
+                ),
+                sp.record(
+                    label = sp.some("Long"),
+                    beneficiery = dan.address, 
+                    plan_id = fa12_long_plan,
+                    vesting_amount = 100
+                )
+            ])
+        )
+        scenario += v.claim().run(sender = dan, now = sp.timestamp(20))
+        scenario.verify(sp.len(v.data.beneficiery_schedules[dan.address]) == 1)
+        scenario += v.claim().run(sender = dan, now = sp.timestamp(30))
+        scenario += v.claim().run(sender = dan, now = sp.timestamp(60))
+        scenario.verify(v.data.schedules[6].claimed_amount == 60)
+        
+        scenario.h2("Revocation")
+        scenario += v.revokeSchedule(sp.list([6])).run(sender = dan, now = sp.timestamp(70), valid = False)
+        scenario += v.revokeSchedules(sp.list([dan.address])).run(sender = dan, now = sp.timestamp(70), valid = False)
+        scenario += v.revokeSchedules(sp.list([dan.address])).run(sender = admin, now = sp.timestamp(70))
+        scenario.verify(v.data.schedules[6].revoked)
+        scenario.p("A revoked schedule cannot be revoked again")
+        scenario += v.revokeSchedule(sp.list([6])).run(sender = admin, now = sp.timestamp(75), valid = False)
+        scenario.verify(v.data.schedules[6].revokedAt == sp.some(sp.timestamp(70)))
+        scenario += v.revokeSchedules(sp.list([dan.address])).run(sender = admin, now = sp.timestamp(75))
+        scenario.verify(v.data.schedules[6].revokedAt == sp.some(sp.timestamp(70)))
+        scenario.p("The revoked schedule is pruned on the next claim")
+        scenario += v.claim().run(sender = dan, now = sp.timestamp(80))
+        scenario.verify(~v.data.beneficiery_schedules.contains(dan.address))
+        
+        scenario.h2("Keeper claims")
+        eve = sp.test_account("Eve")
+        frank = sp.test_account("Frank")
+        scenario += v.vest(
+            sp.list([
+                sp.record(
+                    label = sp.some(name),
+                    beneficiery = beneficiery.address, 
+                    plan_id = fa2_plan,
+                    vesting_amount = 100
+                )
+                for beneficiery in [eve, frank]
+                for name in ["Tranche 1", "Tranche 2"]
+            ])
+        )
+        scenario.p("Beneficieries without schedules are skipped; one FA2 transfer settles both")
+        scenario += v.claimForMany(sp.list([eve.address, frank.address, alice.address])).run(now = sp.timestamp(6))
+        scenario.verify(fa2.data.transfers == 6)
+        scenario.p("Beneficieries without schedules and repeated ones are not queued")
+        scenario += v.queueClaims(sp.list([eve.address, alice.address, frank.address, eve.address]))
+        scenario.verify(v.data.claim_queue_tail == 2)
+        scenario += v.processClaims(0).run(now = sp.timestamp(8), valid = False)
+        scenario.p("A budget of 2 schedules settles Eve only")
+        scenario += v.processClaims(2).run(now = sp.timestamp(8))
+        scenario.verify(v.data.claim_queue_head == 1)
+        scenario.verify(v.data.schedules[7].claimed_amount == 80)
+        scenario.verify(v.data.schedules[9].claimed_amount == 60)
+        scenario.p("A beneficiery with more schedules than the budget is settled over several calls")
+        scenario += v.processClaims(1).run(now = sp.timestamp(9))
+        scenario.verify(v.data.claim_queue_head == 1)
+        scenario.verify(v.data.schedules[9].claimed_amount == 90)
+        scenario.verify(v.data.schedules[10].claimed_amount == 60)
+        scenario += v.processClaims(1).run(now = sp.timestamp(9))
+        scenario.verify(v.data.claim_queue_head == 2)
+        scenario.verify(v.data.claim_cursor == 0)
+        scenario.verify(v.data.schedules[10].claimed_amount == 90)
+        scenario.verify(~v.data.queued.contains(frank.address))
+        scenario += v.processClaims(2).run(now = sp.timestamp(9))
 
 
 if "templates" not in __name__:
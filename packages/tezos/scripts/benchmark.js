@@ -0,0 +1,122 @@
+#!/usr/bin/env node
+/**
+ * Gas and storage benchmark of the standard workloads (benchmarks/workloads.js)
+ * for each compilation variant (benchmarks/variants.js).
+ *
+ * Every variant is compiled with the SmartPy CLI, then each workload is
+ * originated and called in an `octez-client` mockup, which runs offline and reports the consumed
+ * gas, storage size and paid storage bytes of every operation. The report is
+ * written to build/benchmark/report.json and, with `--baseline`, compared
+ * with the report of an earlier run.
+ *
+ * usage: node ./scripts/benchmark.js [--variant <name>]... [--baseline <report.json>] [--tolerance <percent>]
+ *
+ * @format
+ */
+const fs = require("fs");
+const path = require("path");
+
+const smartpy = require("./smartpy");
+const { readJSON, measure } = require("./measure");
+const workloads = require("../benchmarks/workloads");
+const variants = require("../benchmarks/variants");
+
+const METRICS = ["gas", "storage_size", "paid_storage_bytes", "internal_operations"];
+
+const reportPath = path.join(smartpy.root, "build", "benchmark", "report.json");
+
+function parseArgs(argv) {
+  const args = { variants: [], baseline: null, tolerance: 2 };
+  for (let i = 0; i < argv.length; i++) {
+    if (argv[i] === "--variant") args.variants.push(argv[++i]);
+    else if (argv[i] === "--tolerance") args.tolerance = parseFloat(argv[++i]);
+    else if (argv[i] === "--baseline") args.baseline = argv[++i];
+    else throw new Error(`unknown argument ${argv[i]}`);
+  }
+  if (args.variants.length === 0) args.variants = Object.keys(variants);
+  return args;
+}
+
+async function runVariant(name, flags) {
+  const build = path.join(smartpy.root, "build", "benchmark", name);
+  const output = (source) => path.join(build, path.basename(source, ".py"));
+
+  const sources = new Set();
+  for (const workload of Object.values(workloads)) {
+    workload.contracts.forEach((contract) => sources.add(contract.source));
+  }
+  for (const source of sources) {
+    await smartpy.compile(source, output(source), flags);
+  }
+
+  const results = {};
+  for (const [workload, steps] of Object.entries(workloads)) {
+    results[workload] = await measure(steps, output);
+  }
+  return { flags, results };
+}
+
+// Returns the number of metrics that grew by more than `tolerance` percent.
+function compare(baseline, report, tolerance) {
+  const rows = [];
+  let regressions = 0;
+
+  for (const [variant, { results }] of Object.entries(report.variants)) {
+    for (const [workload, receipts] of Object.entries(results)) {
+      for (const [call, receipt] of Object.entries(receipts)) {
+        const before = (((baseline.variants[variant] || {}).results || {})[workload] || {})[call];
+        const row = { variant, workload, call };
+        for (const metric of METRICS) {
+          if (!before || before[metric] === undefined) {
+            row[metric] = `${receipt[metric]} (new)`;
+            continue;
+          }
+          const delta = receipt[metric] - before[metric];
+          const percent = before[metric] ? (delta / before[metric]) * 100 : delta ? Infinity : 0;
+          if (percent > tolerance) {
+            regressions++;
+          }
+          row[metric] = delta
+            ? `${receipt[metric]} (${delta > 0 ? "+" : ""}${Math.round(delta * 1000) / 1000}, ${percent.toFixed(1)}%)`
+            : `${receipt[metric]}`;
+        }
+        rows.push(row);
+      }
+    }
+  }
+
+  console.table(rows);
+  return regressions;
+}
+
+(async () => {
+  const args = parseArgs(process.argv.slice(2));
+  // read before the report is written, which may be the same file
+  const baseline = args.baseline ? readJSON(args.baseline) : null;
+
+  const report = { variants: {} };
+  for (const name of args.variants) {
+    if (!variants[name]) {
+      throw new Error(`unknown variant ${name}`);
+    }
+    console.log(`Benchmarking ${name}`);
+    report.variants[name] = await runVariant(name, variants[name]);
+  }
+
+  fs.mkdirSync(path.dirname(reportPath), { recursive: true });
+  fs.writeFileSync(reportPath, JSON.stringify(report, null, 2));
+  console.log(`Report written to ${reportPath}`);
+
+  if (!baseline) {
+    return;
+  }
+
+  const regressions = compare(baseline, report, args.tolerance);
+  if (regressions > 0) {
+    console.error(`${regressions} metric(s) regressed by more than ${args.tolerance}%`);
+    process.exitCode = 1;
+  }
+})().catch((error) => {
+  console.error(error);
+  process.exitCode = 1;
+});
@@ -0,0 +1,162 @@
+#!/usr/bin/env node
+/**
+ * Incremental replacement for compile.sh / test.sh.
+ *
+ * Each contract is a target whose inputs are hashed: the source and the
+ * sources its scenarios import, the configuration flags set in the
+ * environment, the SmartPy CLI and the extra CLI arguments. A target is
+ * skipped when the hash matches the one recorded in the manifest of its last
+ * successful run and its outputs still exist. The other targets run
+ * concurrently (they only read each other's sources). After compiling, the artifacts of the rebuilt targets, and of any
+ * missing from dist/, are published there as post-compile.js does.
+ *
+ * usage: node ./scripts/build.js <compile|test> [--force] [--jobs <n>] [-- <SmartPy CLI arguments>]
+ *
+ * @format
+ */
+const crypto = require("crypto");
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+const smartpy = require("./smartpy");
+const { pool } = require("./pool");
+
+const COMMANDS = {
+  compile: {
+    output: path.join(smartpy.root, "build"),
+    run: smartpy.compile,
+    sources: Object.keys(smartpy.contracts),
+  },
+  test: {
+    output: path.join(smartpy.root, "smartpy-test-output"),
+    run: smartpy.test,
+    // as in test.sh, Migrations has no scenario
+    sources: Object.keys(smartpy.contracts).filter((s) => s !== "contracts/Migrations.py"),
+  },
+};
+
+function parseArgs(argv) {
+  const args = { command: argv[0], force: false, jobs: os.cpus().length, extra: [] };
+  if (!COMMANDS[args.command]) {
+    throw new Error(`usage: build.js <${Object.keys(COMMANDS).join("|")}> [options]`);
+  }
+  for (let i = 1; i < argv.length; i++) {
+    if (argv[i] === "--force") args.force = true;
+    else if (argv[i] === "--jobs") args.jobs = parseInt(argv[++i], 10);
+    else if (argv[i] === "--") {
+      args.extra = argv.slice(i + 1);
+      break;
+    } else throw new Error(`unknown argument ${argv[i]}`);
+  }
+  return args;
+}
+
+function readManifest(file) {
+  try {
+    return JSON.parse(fs.readFileSync(file).toString());
+  } catch (error) {
+    return {};
+  }
+}
+
+function cliStamp() {
+  try {
+    return `${smartpy.cli}@${fs.statSync(smartpy.cli).mtimeMs}`;
+  } catch (error) {
+    return smartpy.cli;
+  }
+}
+
+function inputHash(command, source, extra) {
+  const hash = crypto.createHash("sha256");
+  hash.update(command);
+  for (const file of [source, ...(smartpy.imports[source] || [])]) {
+    hash.update(fs.readFileSync(path.join(smartpy.root, file)));
+  }
+  for (const flag of smartpy.flags) {
+    hash.update(`${flag}=${process.env[flag] || ""}`);
+  }
+  hash.update(cliStamp());
+  hash.update(JSON.stringify(extra));
+  return hash.digest("hex");
+}
+
+// Artifacts of `source` published in dist/, keyed by build path.
+function distOf(source) {
+  const dir = smartpy.contracts[source];
+  return Object.entries(smartpy.dist).filter(([key]) => key.startsWith(`${dir}/`));
+}
+
+function publish(key, outputPath) {
+  const compiled = fs.readFileSync(
+    path.join(smartpy.root, "build", key, "step_000_cont_0_contract.json")
+  );
+  const file = path.join(smartpy.root, "dist", `${outputPath}.json`);
+  fs.mkdirSync(path.dirname(file), { recursive: true });
+  fs.writeFileSync(file, JSON.stringify(JSON.parse(compiled), null, 2));
+}
+
+function isPublished(outputPath) {
+  return fs.existsSync(path.join(smartpy.root, "dist", `${outputPath}.json`));
+}
+
+(async () => {
+  const args = parseArgs(process.argv.slice(2));
+  const command = COMMANDS[args.command];
+  const manifestPath = path.join(command.output, ".manifest.json");
+  const manifest = readManifest(manifestPath);
+
+  const stale = [];
+  for (const source of command.sources) {
+    const hash = inputHash(args.command, source, args.extra);
+    const output = path.join(command.output, smartpy.contracts[source]);
+    if (!args.force && manifest[source] === hash && fs.existsSync(output)) {
+      console.log(`${source}: up to date`);
+    } else {
+      stale.push({ source, hash, output });
+    }
+  }
+
+  const results = await pool(
+    stale.map(({ source, output }) => () => {
+      console.log(`${source}: ${args.command}`);
+      return command.run(source, output, undefined, args.extra);
+    }),
+    args.jobs
+  );
+
+  let failures = 0;
+  stale.forEach(({ source, hash }, i) => {
+    if (results[i] instanceof Error) {
+      failures++;
+      delete manifest[source];
+      console.error(`${source}: failed\n${results[i].message}`);
+      return;
+    }
+    manifest[source] = hash;
+    if (args.command === "compile") {
+      distOf(source).forEach(([key, outputPath]) => publish(key, outputPath));
+    }
+  });
+
+  if (args.command === "compile") {
+    for (const source of command.sources) {
+      if (manifest[source]) {
+        distOf(source)
+          .filter(([, outputPath]) => !isPublished(outputPath))
+          .forEach(([key, outputPath]) => publish(key, outputPath));
+      }
+    }
+  }
+
+  fs.mkdirSync(command.output, { recursive: true });
+  fs.writeFileSync(manifestPath, JSON.stringify(manifest, null, 2));
+
+  if (failures > 0) {
+    process.exitCode = 1;
+  }
+})().catch((error) => {
+  console.error(error);
+  process.exitCode = 1;
+});
@@ -0,0 +1,308 @@
+#!/usr/bin/env node
+/**
+ * Offline projection of the storage burn, gas and fees of an offering:
+ * onboarding `--investors` accounts (whitelist entry and first mint), vesting
+ * `--schedules` schedules, then `--transfers` transfers per day for `--days`
+ * days. Schedules are vested `--schedules-per-vest` at a time.
+ *
+ * Byte sizes of the entries each action adds (`token_whitelist`, `ledger`,
+ * `schedules`, `beneficiery_schedules`) are derived from the compiled storage
+ * types (run `yarn build` first) by encoding a representative value of each
+ * type in the binary format the protocol pays storage for. Gas per call is
+ * taken from the benchmark report (run `yarn benchmark` first). `vest`
+ * aggregates its mints, so its gas is modelled per operation as a fixed part
+ * plus a part per schedule, fitted on the smallest and largest calls of the
+ * `vest_batch` workload; the calls in between are printed against the model
+ * as a check.
+ *
+ * These are estimates: sample values stand in for real amounts and labels,
+ * and transfers are assumed to be between accounts that already hold tokens.
+ *
+ * usage: node ./scripts/cost-model.js --investors <n> --schedules <m> --transfers <k> [--days <d>]
+ *                                    [--schedules-per-vest <s>] [--variant <name>] [--amount <nat>]
+ *                                    [--out <file.csv>]
+ *
+ * @format
+ */
+const fs = require("fs");
+const path = require("path");
+
+const smartpy = require("./smartpy");
+
+// protocol constants
+const COST_PER_BYTE = 250; // mutez
+const BIG_MAP_KEY_OVERHEAD = 65; // bytes paid for every new big-map key
+const ORIGINATION_SIZE = 257; // bytes paid for every originated contract
+// default baker minimal fees
+const MINIMAL_FEES = 100; // mutez
+const MINIMAL_NANOTEZ_PER_GAS_UNIT = 100;
+const MINIMAL_NANOTEZ_PER_BYTE = 1000;
+// size of a signed single-call operation, without its parameter, and of the
+// parameter of a benchmarked call per item
+const OPERATION_BYTES = 200;
+const PARAMETER_BYTES = 64;
+
+const build = (target) =>
+  path.join(smartpy.root, "build", target, "step_000_cont_0_contract.json");
+
+// Storage entries added per unit of the workload.
+const ENTRIES = [
+  { field: "token_whitelist", target: "compliance/Whitelist_compiled", per: "investors" },
+  { field: "ledger", target: "token/ST12_compiled", per: "investors" },
+  { field: "schedules", target: "wallet/VestingEscrowMinterBurnerWallet_compiled", per: "schedules" },
+  {
+    field: "beneficiery_schedules",
+    target: "wallet/VestingEscrowMinterBurnerWallet_compiled",
+    per: "beneficieries",
+  },
+];
+
+// Calls made per unit of the workload, measured by scripts/benchmark.js.
+// `batch` names the argument giving the units per call (one by default).
+const CALLS = [
+  { entrypoint: "addToWhitelist", per: "investors" },
+  { entrypoint: "mint", per: "investors" },
+  { entrypoint: "vest", per: "schedules", batch: "schedulesPerVest" },
+  { entrypoint: "transfer", per: "transfers" },
+];
+
+function parseArgs(argv) {
+  const args = {
+    investors: 0,
+    schedules: 0,
+    transfers: 0,
+    days: 30,
+    schedulesPerVest: 1,
+    variant: "default",
+    amount: 10n ** 21n,
+    out: path.join(smartpy.root, "build", "cost-model.csv"),
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const flag = argv[i];
+    const value = argv[++i];
+    if (["--investors", "--schedules", "--transfers", "--days"].includes(flag)) {
+      args[flag.slice(2)] = parseInt(value, 10);
+    } else if (flag === "--schedules-per-vest") args.schedulesPerVest = parseInt(value, 10);
+    else if (flag === "--variant") args.variant = value;
+    else if (flag === "--amount") args.amount = BigInt(value);
+    else if (flag === "--out") args.out = value;
+    else throw new Error(`unknown argument ${flag}`);
+  }
+  if (!(args.schedulesPerVest >= 1)) {
+    throw new Error("--schedules-per-vest must be at least 1");
+  }
+  return args;
+}
+
+function readJSON(file, hint) {
+  if (!fs.existsSync(file)) {
+    throw new Error(`${file} not found, run \`${hint}\` first`);
+  }
+  return JSON.parse(fs.readFileSync(file).toString());
+}
+
+function fieldType(type, field) {
+  if ((type.annots || []).includes(`%${field}`)) return type;
+  for (const arg of type.prim === "pair" ? type.args : []) {
+    const found = fieldType(arg, field);
+    if (found) return found;
+  }
+  return undefined;
+}
+
+// Size of the binary Micheline encoding of a zarith number.
+function zarithSize(n) {
+  let size = 1;
+  for (n >>= 6n; n > 0n; n >>= 7n) size++;
+  return size;
+}
+
+// Size of the binary encoding of a representative value of `type`, as the
+// protocol stores it (addresses and timestamps in their optimized form).
+// `nat` is the sample for numbers.
+function valueSize(type, nat) {
+  const prim = (args) => 2 + args.reduce((total, arg) => total + valueSize(arg, nat), 0);
+  switch (type.prim) {
+    case "nat":
+    case "int":
+    case "mutez":
+      return 1 + zarithSize(nat);
+    case "timestamp":
+      return 1 + zarithSize(BigInt(Math.floor(Date.now() / 1000)));
+    case "address":
+      return 5 + 22;
+    case "key_hash":
+      return 5 + 21;
+    case "string":
+      return 5 + 16;
+    case "bytes":
+      return 5 + 32;
+    case "unit":
+    case "bool":
+      return 2;
+    case "option":
+      return prim([type.args[0]]);
+    case "pair":
+      return type.args.length === 2
+        ? prim(type.args)
+        : prim([type.args[0], { prim: "pair", args: type.args.slice(1) }]);
+    case "or":
+      return prim([type.args[0]]);
+    case "list":
+    case "set":
+      return 5 + valueSize(type.args[0], nat);
+    case "map":
+      return 5 + prim(type.args);
+    case "big_map":
+      return 1 + zarithSize(0n);
+    default:
+      throw new Error(`no sample for ${type.prim}`);
+  }
+}
+
+// Bytes paid for a new entry in the map or big-map `type`.
+function entrySize(type, nat) {
+  const [key, value] = type.args;
+  if (type.prim === "big_map") {
+    return BIG_MAP_KEY_OVERHEAD + valueSize(key, nat) + valueSize(value, nat);
+  }
+  return 2 + valueSize(key, nat) + valueSize(value, nat);
+}
+
+function fee(gas, parameterBytes) {
+  const nanotez =
+    MINIMAL_NANOTEZ_PER_GAS_UNIT * gas + MINIMAL_NANOTEZ_PER_BYTE * (OPERATION_BYTES + parameterBytes);
+  return MINIMAL_FEES + Math.ceil(nanotez / 1000);
+}
+
+const tez = (mutez) => (mutez / 1e6).toFixed(6);
+
+// Gas of a call of `size` items: `fixed + size * item`. Calls measured with a
+// single item have no per-item part to fit, and cost the same at any size.
+function gasModel(measured) {
+  const sizes = Object.keys(measured).map(Number).sort((a, b) => a - b);
+  const [low, high] = [sizes[0], sizes[sizes.length - 1]];
+  const item = high > low ? (measured[high] - measured[low]) / (high - low) : 0;
+  const fixed = measured[low] - item * low;
+  return (size) => fixed + item * size;
+}
+
+// Measured gas of `entrypoint` by number of items: `<entrypoint> (<n>)` calls
+// of the `vest_batch` workload, or the single-item call of `st12`.
+function measuredGas(results, entrypoint) {
+  const measured = {};
+  const pattern = new RegExp(`^${entrypoint} \\((\\d+)\\)$`);
+  for (const [label, receipt] of Object.entries(results.vest_batch || {})) {
+    const match = label.match(pattern);
+    if (match) measured[parseInt(match[1], 10)] = receipt.gas;
+  }
+  if (Object.keys(measured).length === 0) {
+    const receipt = results.st12[entrypoint];
+    if (!receipt) {
+      throw new Error(`${entrypoint} not in the benchmark report`);
+    }
+    measured[1] = receipt.gas;
+  }
+  return measured;
+}
+
+// Gas and fees of `units` units of `call`, in calls of `call.size` units and
+// a last call with the remainder.
+function callCost(call, units) {
+  const full = Math.floor(units / call.size);
+  const rest = units % call.size;
+  const cost = (size) => ({
+    gas: call.gas(size),
+    fee: fee(call.gas(size), PARAMETER_BYTES * size),
+  });
+  const [whole, last] = [cost(call.size), rest > 0 ? cost(rest) : { gas: 0, fee: 0 }];
+  return {
+    gas: full * whole.gas + last.gas,
+    fee: full * whole.fee + last.fee,
+  };
+}
+
+function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const report = readJSON(
+    path.join(smartpy.root, "build", "benchmark", "report.json"),
+    "yarn benchmark"
+  );
+  const variant = report.variants[args.variant];
+  if (!variant) {
+    throw new Error(`variant ${args.variant} not in the benchmark report`);
+  }
+  const receipts = variant.results.st12;
+
+  const units = {
+    investors: args.investors,
+    schedules: args.schedules,
+    // schedules go to distinct investors first
+    beneficieries: Math.min(args.schedules, args.investors || args.schedules),
+    transfers: args.transfers,
+  };
+
+  const entries = ENTRIES.map((entry) => {
+    const storage = readJSON(build(entry.target), "yarn build")
+      .find((section) => section.prim === "storage").args[0];
+    const type = fieldType(storage, entry.field);
+    const bytes = entrySize(type, args.amount);
+    return { ...entry, bytes, burn: bytes * COST_PER_BYTE };
+  });
+
+  const calls = CALLS.map((call) => {
+    const measured = measuredGas(variant.results, call.entrypoint);
+    const gas = gasModel(measured);
+    const sizes = Object.keys(measured).map(Number).sort((a, b) => a - b);
+    for (const size of sizes.slice(1, -1)) {
+      console.log(
+        `${call.entrypoint} (${size}): measured ${measured[size]} gas, modelled ${Math.round(gas(size))}`
+      );
+    }
+    return { ...call, size: call.batch ? args[call.batch] : 1, gas };
+  });
+
+  const originations = Object.entries(receipts).filter(([name]) => name.startsWith("originate "));
+  const origination = originations.reduce(
+    (total, [, receipt]) => total + (receipt.paid_storage_bytes + ORIGINATION_SIZE) * COST_PER_BYTE,
+    0
+  );
+
+  console.table([
+    ...entries.map((e) => ({ item: `${e.field} entry`, per: e.per, bytes: e.bytes, burn_tez: tez(e.burn) })),
+    ...calls.map((c) => {
+      const cost = callCost(c, c.size);
+      return { item: `${c.entrypoint} call (${c.size})`, per: c.per, gas: Math.round(cost.gas), fee_tez: tez(cost.fee) };
+    }),
+    { item: "originations", per: "offering", burn_tez: tez(origination) },
+  ]);
+
+  // onboarding on day 0, transfers every day after
+  const rows = [
+    "day,storage_bytes,storage_burn_tez,gas,fees_tez,total_tez,cumulative_tez",
+  ];
+  let cumulative = origination;
+  for (let day = 0; day <= args.days; day++) {
+    const count = (per) => (per === "transfers" ? (day > 0 ? units.transfers : 0) : day === 0 ? units[per] : 0);
+    const bytes = entries.reduce((total, e) => total + e.bytes * count(e.per), 0);
+    const burn = bytes * COST_PER_BYTE + (day === 0 ? origination : 0);
+    const costs = calls.map((c) => callCost(c, count(c.per)));
+    const gas = costs.reduce((total, c) => total + c.gas, 0);
+    const fees = costs.reduce((total, c) => total + c.fee, 0);
+    cumulative += bytes * COST_PER_BYTE + fees;
+    rows.push(
+      [day, bytes, tez(burn), Math.round(gas), tez(fees), tez(burn + fees), tez(cumulative)].join(",")
+    );
+  }
+
+  fs.mkdirSync(path.dirname(args.out), { recursive: true });
+  fs.writeFileSync(args.out, rows.join("\n") + "\n");
+  console.log(`Projection written to ${args.out}`);
+}
+
+try {
+  main();
+} catch (error) {
+  console.error(error.message);
+  process.exitCode = 1;
+}
@@ -0,0 +1,203 @@
+#!/usr/bin/env node
+/**
+ * Builds every combination of the `FA12_config` / `FA2_config` flags read by
+ * `environment_config()`, and tabulates the Michelson code size, initial
+ * storage size and per-entrypoint gas of each variant.
+ *
+ * Each variant is compiled and tested with the SmartPy CLI, then its workload
+ * (benchmarks/workloads.js) is run in an `octez-client` mockup. Variants are
+ * processed concurrently, `--jobs` at a time (number of CPUs by default).
+ * Contracts the workloads need besides the token are compiled once, with the
+ * default flags.
+ *
+ * The table is printed and written, with the raw receipts, to
+ * build/matrix/matrix.md and build/matrix/report.json.
+ *
+ * usage: node ./scripts/matrix.js [--contract <FA12|FA2>]... [--jobs <n>] [--skip-tests]
+ *
+ * @format
+ */
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+const smartpy = require("./smartpy");
+const { measure } = require("./measure");
+const { pool } = require("./pool");
+const workloads = require("../benchmarks/workloads");
+
+// flag -> default value and the suffix it adds to the config name when
+// changed, as in `FA2_config`
+const FLAGS = {
+  debug_mode: { default: false, suffix: "debug" },
+  single_asset: { default: false, suffix: "single_asset" },
+  non_fungible: { default: false, suffix: "nft" },
+  readable: { default: true, suffix: "no_readable" },
+  force_layouts: { default: true, suffix: "no_layout" },
+  assume_consecutive_token_ids: { default: true, suffix: "no_toknat" },
+  lazy_entry_points: { default: false, suffix: "lep" },
+  lazy_entry_points_multiple: { default: false, suffix: "lepm" },
+};
+
+const CONTRACTS = {
+  FA12: {
+    source: "contracts/token/FA1.2.py",
+    workload: workloads.st12,
+    flags: [
+      "debug_mode",
+      "readable",
+      "force_layouts",
+      "lazy_entry_points",
+      "lazy_entry_points_multiple",
+    ],
+  },
+  FA2: {
+    source: "contracts/token/FA2.py",
+    workload: workloads.st2,
+    flags: [
+      "debug_mode",
+      "single_asset",
+      "non_fungible",
+      "readable",
+      "force_layouts",
+      "assume_consecutive_token_ids",
+      "lazy_entry_points",
+      "lazy_entry_points_multiple",
+    ],
+  },
+};
+
+const build = path.join(smartpy.root, "build", "matrix");
+
+function parseArgs(argv) {
+  const args = { contracts: [], jobs: os.cpus().length, tests: true };
+  for (let i = 0; i < argv.length; i++) {
+    if (argv[i] === "--contract") args.contracts.push(argv[++i]);
+    else if (argv[i] === "--jobs") args.jobs = parseInt(argv[++i], 10);
+    else if (argv[i] === "--skip-tests") args.tests = false;
+    else throw new Error(`unknown argument ${argv[i]}`);
+  }
+  if (args.contracts.length === 0) args.contracts = Object.keys(CONTRACTS);
+  return args;
+}
+
+// All combinations of `flags`, except both kinds of lazy entry points
+// together, which the configs reject.
+function variantsOf(prefix, flags) {
+  const variants = [];
+  for (let bits = 0; bits < 1 << flags.length; bits++) {
+    const config = {};
+    let name = prefix;
+    flags.forEach((flag, i) => {
+      config[flag] = Boolean(bits & (1 << i)) !== FLAGS[flag].default;
+      if (config[flag] !== FLAGS[flag].default) {
+        name += `-${FLAGS[flag].suffix}`;
+      }
+    });
+    if (!(config.lazy_entry_points && config.lazy_entry_points_multiple)) {
+      variants.push({ name, config });
+    }
+  }
+  return variants;
+}
+
+async function runVariant(contract, variant, common, tests) {
+  const output = path.join(build, variant.name);
+  const sourceOutput = (source) =>
+    source === contract.source ? output : path.join(common, path.basename(source, ".py"));
+
+  await smartpy.compile(contract.source, output, variant.config);
+  const test = tests
+    ? await smartpy
+        .test(contract.source, path.join(output, "test"), variant.config)
+        .then(() => "pass", () => "fail")
+    : "skipped";
+
+  const results = await measure(contract.workload, sourceOutput);
+  return { ...variant, test, results };
+}
+
+function row(contract, variant) {
+  const row = { variant: variant.name, test: variant.test };
+  const token = variant.results["originate token"];
+  row.code_size = token.code_size;
+  row.storage_size = token.data_size;
+  for (const step of contract.workload.steps.filter((s) => !s.setup)) {
+    row[step.label || step.name] = variant.results[step.label || step.name].gas;
+  }
+  return row;
+}
+
+function markdown(rows) {
+  const columns = [...new Set(rows.flatMap((r) => Object.keys(r)))];
+  const line = (cells) => `| ${cells.join(" | ")} |`;
+  return [
+    line(columns),
+    line(columns.map(() => "---")),
+    ...rows.map((r) => line(columns.map((c) => (r[c] === undefined ? "" : r[c])))),
+  ].join("\n");
+}
+
+(async () => {
+  const args = parseArgs(process.argv.slice(2));
+  const common = path.join(build, "common");
+
+  const sources = new Set();
+  for (const name of args.contracts) {
+    if (!CONTRACTS[name]) {
+      throw new Error(`unknown contract ${name}`);
+    }
+    const { source, workload } = CONTRACTS[name];
+    workload.contracts
+      .filter((c) => c.source !== source)
+      .forEach((c) => sources.add(c.source));
+  }
+  await Promise.all(
+    [...sources].map((source) =>
+      smartpy.compile(source, path.join(common, path.basename(source, ".py")))
+    )
+  );
+
+  const jobs = [];
+  for (const name of args.contracts) {
+    const contract = CONTRACTS[name];
+    for (const variant of variantsOf(name, contract.flags)) {
+      jobs.push({ name, variant, run: () => runVariant(contract, variant, common, args.tests) });
+    }
+  }
+  console.log(`Building ${jobs.length} variants, ${args.jobs} at a time`);
+  const variants = await pool(
+    jobs.map((job) => job.run),
+    args.jobs
+  );
+
+  const report = {};
+  const tables = [];
+  for (const name of args.contracts) {
+    const rows = [];
+    jobs.forEach((job, i) => {
+      if (job.name !== name) return;
+      if (variants[i] instanceof Error) {
+        report[job.variant.name] = { ...job.variant, error: variants[i].message };
+        rows.push({ variant: job.variant.name, error: variants[i].message.split("\n")[0] });
+      } else {
+        report[job.variant.name] = variants[i];
+        rows.push(row(CONTRACTS[name], variants[i]));
+      }
+    });
+    console.table(rows);
+    tables.push(`## ${name}\n\n${markdown(rows)}\n`);
+  }
+
+  fs.mkdirSync(build, { recursive: true });
+  fs.writeFileSync(path.join(build, "report.json"), JSON.stringify(report, null, 2));
+  fs.writeFileSync(path.join(build, "matrix.md"), tables.join("\n"));
+  console.log(`Table written to ${path.join(build, "matrix.md")}`);
+
+  if (Object.values(report).some((v) => v.error || v.test === "fail")) {
+    process.exitCode = 1;
+  }
+})().catch((error) => {
+  console.error(error);
+  process.exitCode = 1;
+});
@@ -0,0 +1,140 @@
+/**
+ * Runs a workload (see benchmarks/workloads.js) in a fresh `octez-client`
+ * mockup and collects the receipt of every operation.
+ *
+ * @format
+ */
+const fs = require("fs");
+const path = require("path");
+const { ParameterSchema } = require("@taquito/michelson-encoder");
+const { emitMicheline } = require("@taquito/michel-codec");
+const { b58decode } = require("@taquito/utils");
+
+const { Mockup } = require("./mockup");
+
+const ACCOUNTS = ["bootstrap1", "bootstrap2", "bootstrap3"];
+
+function readJSON(file) {
+  return JSON.parse(fs.readFileSync(file).toString());
+}
+
+function isAddress(expr) {
+  return expr && typeof expr.string === "string" && /^(tz[1-4]|KT1)\w{33}$/.test(expr.string);
+}
+
+// Set elements and map keys have to stay sorted once their addresses are
+// replaced. Addresses compare as their binary encoding. The storages of the
+// compilation targets hold no list of addresses, which must not be sorted.
+function sortAddresses(sequence) {
+  const key = (e) => (e.prim === "Elt" ? e.args[0] : e);
+  if (sequence.length < 2 || !sequence.every((e) => isAddress(key(e)))) {
+    return sequence;
+  }
+  const bytes = (e) => b58decode(key(e).string);
+  return [...sequence].sort((a, b) => (bytes(a) < bytes(b) ? -1 : bytes(a) > bytes(b) ? 1 : 0));
+}
+
+function substitute(expr, addresses, context) {
+  if (Array.isArray(expr)) {
+    return sortAddresses(expr.map((e) => substitute(e, addresses, context)));
+  }
+  if (isAddress(expr) && addresses[expr.string]) {
+    return { string: context[addresses[expr.string]] };
+  }
+  if (expr && expr.args) {
+    return { ...expr, args: expr.args.map((e) => substitute(e, addresses, context)) };
+  }
+  return expr;
+}
+
+function section(code, prim) {
+  return code.find((s) => s.prim === prim).args[0];
+}
+
+function entrypointType(code, entrypoint) {
+  const find = (type) => {
+    if ((type.annots || []).includes(`%${entrypoint}`)) return type;
+    if (type.prim === "or") return find(type.args[0]) || find(type.args[1]);
+    return undefined;
+  };
+  const type = find(section(code, "parameter"));
+  if (!type) {
+    throw new Error(`entrypoint ${entrypoint} not found`);
+  }
+  return type;
+}
+
+function encode(code, entrypoint, value) {
+  if (value === undefined) {
+    return "Unit";
+  }
+  const schema = new ParameterSchema(entrypointType(code, entrypoint));
+  return emitMicheline(schema.EncodeObject(value));
+}
+
+// `output(source)` is the directory `source` was compiled into. Returns the
+// receipts of the originations (`originate <name>`, with the binary size of
+// the code and of the initial storage) and of the steps not marked `setup`,
+// keyed by their `label` or entrypoint.
+async function measure(workload, output) {
+  const mockup = await new Mockup().create();
+  const results = {};
+
+  try {
+    const context = {};
+    for (const account of ACCOUNTS) {
+      context[account] = await mockup.address(account);
+    }
+
+    const code = {};
+    for (const contract of workload.contracts) {
+      const build = path.join(output(contract.source), contract.target);
+      const script = path.join(build, "step_000_cont_0_contract.tz");
+      code[contract.name] = readJSON(path.join(build, "step_000_cont_0_contract.json"));
+
+      const storage = emitMicheline(
+        contract.storage
+          ? contract.storage(context)
+          : substitute(
+              readJSON(path.join(build, "step_000_cont_0_storage.json")),
+              workload.addresses,
+              context
+            )
+      );
+
+      const { address, ...receipt } = await mockup.originate(contract.name, script, storage);
+      context[contract.name] = address;
+      results[`originate ${contract.name}`] = {
+        ...receipt,
+        code_size: await mockup.scriptSize(script),
+        data_size: await mockup.dataSize(
+          storage,
+          emitMicheline(section(code[contract.name], "storage"))
+        ),
+      };
+    }
+
+    for (const step of workload.steps) {
+      const arg = encode(
+        code[step.contract],
+        step.name,
+        step.arg ? step.arg(context) : undefined
+      );
+      const receipt = await mockup.call(step.contract, step.name, arg, step.sender);
+      if (!step.setup) {
+        results[step.label || step.name] = receipt;
+      }
+    }
+  } finally {
+    mockup.dispose();
+  }
+
+  return results;
+}
+
+module.exports = {
+  readJSON,
+  substitute,
+  encode,
+  measure,
+};
@@ -0,0 +1,131 @@
+#!/usr/bin/env node
+/**
+ * Builds the Merkle tree of a token's approved accounts for
+ * `Whitelist.setMerkleRoot`, and the proofs holders submit to
+ * `Whitelist.proveMembership`.
+ *
+ * Leaves are `sha256(pack(account))`, nodes hash the concatenation of their
+ * two children in ascending order, and a node without a sibling is carried
+ * up to the next level, as `merkle_leaf` / `merkle_parent` in Whitelist.py
+ * expect.
+ *
+ * usage: node ./scripts/merkle.js <accounts.csv> [--out <file.json>]
+ *
+ * The first column of the CSV holds the addresses; a header line is skipped.
+ * The output holds the root and the proof of every account.
+ *
+ * @format
+ */
+const crypto = require("crypto");
+const fs = require("fs");
+const path = require("path");
+const { b58decode, validateAddress, ValidationResult } = require("@taquito/utils");
+
+const sha256 = (buffer) => crypto.createHash("sha256").update(buffer).digest();
+
+// PACK of an address: 0x05 prefix, then its optimized form as bytes (tag
+// 0x0a and 4-byte length).
+function packAddress(address) {
+  return Buffer.from(`050a00000016${b58decode(address)}`, "hex");
+}
+
+function leaf(address) {
+  return sha256(packAddress(address));
+}
+
+function parent(a, b) {
+  return sha256(Buffer.compare(a, b) < 0 ? Buffer.concat([a, b]) : Buffer.concat([b, a]));
+}
+
+// Returns every level of the tree, from the leaves up to the root.
+function build(leaves) {
+  if (leaves.length === 0) {
+    throw new Error("no leaves");
+  }
+  const levels = [leaves];
+  while (levels[levels.length - 1].length > 1) {
+    const level = levels[levels.length - 1];
+    const next = [];
+    for (let i = 0; i < level.length; i += 2) {
+      next.push(i + 1 < level.length ? parent(level[i], level[i + 1]) : level[i]);
+    }
+    levels.push(next);
+  }
+  return levels;
+}
+
+function root(levels) {
+  return levels[levels.length - 1][0];
+}
+
+function proof(levels, index) {
+  const siblings = [];
+  for (const level of levels.slice(0, -1)) {
+    const sibling = index ^ 1;
+    if (sibling < level.length) {
+      siblings.push(level[sibling]);
+    }
+    index >>= 1;
+  }
+  return siblings;
+}
+
+function verify(rootHash, address, siblings) {
+  return siblings.reduce(parent, leaf(address)).equals(rootHash);
+}
+
+const hex = (buffer) => `0x${buffer.toString("hex")}`;
+
+function readAccounts(file) {
+  const accounts = fs
+    .readFileSync(file)
+    .toString()
+    .split(/\r?\n/)
+    .map((line) => line.split(",")[0].trim().replace(/^"|"$/g, ""))
+    .filter((account, i) => account && !(i === 0 && validateAddress(account) !== ValidationResult.VALID));
+
+  const invalid = accounts.filter((a) => validateAddress(a) !== ValidationResult.VALID);
+  if (invalid.length > 0) {
+    throw new Error(`invalid addresses: ${invalid.slice(0, 5).join(", ")}`);
+  }
+  return [...new Set(accounts)];
+}
+
+function main() {
+  const argv = process.argv.slice(2);
+  const outIndex = argv.indexOf("--out");
+  const out = outIndex >= 0 ? argv.splice(outIndex, 2)[1] : "build/merkle.json";
+  if (argv.length !== 1) {
+    throw new Error("usage: merkle.js <accounts.csv> [--out <file.json>]");
+  }
+
+  const accounts = readAccounts(argv[0]);
+  const levels = build(accounts.map(leaf));
+  const proofs = {};
+  accounts.forEach((account, i) => {
+    proofs[account] = proof(levels, i).map(hex);
+  });
+
+  fs.mkdirSync(path.dirname(out), { recursive: true });
+  fs.writeFileSync(out, JSON.stringify({ root: hex(root(levels)), proofs }, null, 2));
+  console.log(`${accounts.length} accounts, root ${hex(root(levels))}, written to ${out}`);
+}
+
+if (require.main === module) {
+  try {
+    main();
+  } catch (error) {
+    console.error(error.message);
+    process.exitCode = 1;
+  }
+}
+
+module.exports = {
+  leaf,
+  parent,
+  build,
+  root,
+  proof,
+  verify,
+  hex,
+};
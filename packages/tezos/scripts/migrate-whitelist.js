@@ -0,0 +1,79 @@
+#!/usr/bin/env node
+/**
+ * Copies the `token_whitelist` of a Whitelist deployed with the previous
+ * `token -> set(account)` storage layout into a new Whitelist contract,
+ * through its `importWhitelist` entrypoint, then its `blacklist` set through
+ * `addToBlacklistBatch` (blacklisted accounts cannot be whitelisted).
+ *
+ * usage: node ./scripts/migrate-whitelist.js <network> <from KT1> <to KT1> [chunk size]
+ */
+const config = require("./config");
+const accounts = require("../keystore/faucet/accounts.json");
+const { importKey } = require("@taquito/signer");
+const { TezosToolkit, MichelsonMap } = require("@taquito/taquito");
+
+const network = process.argv[2] || "jakartanet";
+const from = process.argv[3];
+const to = process.argv[4];
+const chunkSize = parseInt(process.argv[5] || "500", 10);
+
+const rpc = config.networks[network];
+const account = accounts[0];
+
+(async () => {
+  if (!from || !to) {
+    throw new Error("usage: migrate-whitelist.js <network> <from> <to> [chunk size]");
+  }
+
+  const client = new TezosToolkit(rpc);
+
+  await importKey(
+    client,
+    (process.env.PRIVATE_KEY || "").replace(/"/g, "") || account.secretKey
+  );
+
+  const legacy = await client.contract.at(from);
+  const storage = await legacy.storage();
+
+  const entries = [];
+  storage.token_whitelist.forEach((members, token) => {
+    for (const member of members) {
+      entries.push([token, member]);
+    }
+  });
+
+  console.log(`Importing ${entries.length} whitelist entries into ${to}`);
+
+  const contract = await client.contract.at(to);
+
+  for (let i = 0; i < entries.length; i += chunkSize) {
+    const grouped = {};
+    for (const [token, member] of entries.slice(i, i + chunkSize)) {
+      (grouped[token] = grouped[token] || []).push(member);
+    }
+
+    const chunk = new MichelsonMap();
+    for (const [token, members] of Object.entries(grouped)) {
+      chunk.set(token, members);
+    }
+
+    const operation = await contract.methods.importWhitelist(chunk).send();
+    await operation.confirmation();
+
+    console.log(`Imported entries ${i} to ${Math.min(i + chunkSize, entries.length)}: ${operation.hash}`);
+  }
+
+  // a blacklist already kept in a big map cannot be enumerated
+  const blacklist = Array.isArray(storage.blacklist) ? storage.blacklist : [];
+
+  console.log(`Importing ${blacklist.length} blacklisted accounts into ${to}`);
+
+  for (let i = 0; i < blacklist.length; i += chunkSize) {
+    const operation = await contract.methods
+      .addToBlacklistBatch(blacklist.slice(i, i + chunkSize))
+      .send();
+    await operation.confirmation();
+
+    console.log(`Imported accounts ${i} to ${Math.min(i + chunkSize, blacklist.length)}: ${operation.hash}`);
+  }
+})();
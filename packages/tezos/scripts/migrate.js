@@ -86,26 +86,25 @@ async function deploy(path, storage) {
 (async () => {
   await deploy("wallet/VestingEscrowMinterBurnerWallet");
 
+  // roles are a bitmask per member, bit n standing for role n:
   // ADMIN_ROLE = 0
   // WHITELIST_ADMIN_ROLE = 1
   // BLACKLIST_ADMIN_ROLE = 2
   const roles = new MichelsonMap();
-  roles.set(0, {
-    role_admin: 0,
-    members: [account.pkh],
-  });
-  roles.set(1, {
-    role_admin: 0,
-    members: [account.pkh],
-  });
-  roles.set(2, {
-    role_admin: 0,
-    members: [account.pkh],
-  });
+  roles.set(account.pkh, (1 << 0) | (1 << 1) | (1 << 2));
 
   const whitelist_address = await deploy("compliance/Whitelist", {
     token_whitelist: new MichelsonMap(),
-    blacklist: [],
+    blacklist: new MichelsonMap(),
+    subscribers: [],
+    merkle_roots: new MichelsonMap(),
+    investor_groups: new MichelsonMap(),
+    group_sizes: new MichelsonMap(),
+    token_groups: new MichelsonMap(),
+    token_epochs: new MichelsonMap(),
+    revoked_proofs: new MichelsonMap(),
+    // default period of validity of an account's KYC: one year
+    kyc_validity: 365 * 24 * 3600,
     roles,
   });
 
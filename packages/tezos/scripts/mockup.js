@@ -0,0 +1,119 @@
+/**
+ * Offline Tezos context for measurements: `octez-client` in mockup mode
+ * originates contracts and applies operations locally, and prints the same
+ * receipts (consumed gas, storage size, paid storage) as a node would.
+ *
+ * @format
+ */
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+const { execFile } = require("child_process");
+
+const client = process.env.OCTEZ_CLIENT || "octez-client";
+
+function parseReceipt(output) {
+  const sum = (pattern) =>
+    [...output.matchAll(pattern)].reduce((total, m) => total + parseFloat(m[1]), 0);
+  const first = (pattern) => {
+    const m = output.match(pattern);
+    return m ? parseInt(m[1], 10) : 0;
+  };
+
+  // internal operations have their own receipts: gas and paid storage are
+  // summed over the whole operation, the storage size is the called
+  // contract's
+  return {
+    gas: Math.round(sum(/Consumed gas: ([\d.]+)/g) * 1000) / 1000,
+    storage_size: first(/Storage size: (\d+) bytes/),
+    paid_storage_bytes: sum(/Paid storage size diff: (\d+) bytes/g),
+    internal_operations: (output.match(/Internal Transaction:/g) || []).length,
+  };
+}
+
+class Mockup {
+  constructor(baseDir) {
+    this.baseDir = baseDir || fs.mkdtempSync(path.join(os.tmpdir(), "mockup-"));
+  }
+
+  exec(args) {
+    return new Promise((resolve, reject) => {
+      execFile(
+        client,
+        ["--mode", "mockup", "--base-dir", this.baseDir, ...args],
+        { maxBuffer: 64 * 1024 * 1024 },
+        (error, stdout, stderr) => {
+          if (error) {
+            error.message += `\n${stdout}${stderr}`;
+            reject(error);
+          } else {
+            resolve(stdout + stderr);
+          }
+        }
+      );
+    });
+  }
+
+  async create() {
+    const protocol = process.env.OCTEZ_PROTOCOL;
+    await this.exec(["create", "mockup", ...(protocol ? ["--protocol", protocol] : [])]);
+    return this;
+  }
+
+  async address(alias) {
+    const output = await this.exec(["show", "address", alias]);
+    return output.match(/Hash: (\w+)/)[1];
+  }
+
+  async originate(name, code, storage, source = "bootstrap1") {
+    const output = await this.exec([
+      "originate", "contract", name,
+      "transferring", "0", "from", source,
+      "running", code,
+      "--init", storage,
+      "--burn-cap", "100",
+      "--force",
+    ]);
+    return {
+      address: output.match(/New contract (KT1\w+) originated/)[1],
+      ...parseReceipt(output),
+    };
+  }
+
+  async call(contract, entrypoint, arg, source) {
+    const output = await this.exec([
+      "transfer", "0", "from", source,
+      "to", contract,
+      "--entrypoint", entrypoint,
+      "--arg", arg,
+      "--burn-cap", "100",
+    ]);
+    return parseReceipt(output);
+  }
+
+  // size in bytes of the binary encoding of a script file
+  async scriptSize(file) {
+    const output = await this.exec([
+      "convert", "script", file, "from", "michelson", "to", "binary",
+    ]);
+    return output.match(/0x([0-9a-f]*)/)[1].length / 2;
+  }
+
+  // size in bytes of the binary encoding of a value of type `type`
+  async dataSize(data, type) {
+    const output = await this.exec([
+      "convert", "data", data, "from", "michelson", "to", "binary",
+      "--type", type,
+    ]);
+    return output.match(/0x([0-9a-f]*)/)[1].length / 2;
+  }
+
+  dispose() {
+    fs.rmSync(this.baseDir, { recursive: true, force: true });
+  }
+}
+
+module.exports = {
+  Mockup,
+  parseReceipt,
+};
@@ -0,0 +1,32 @@
+/**
+ * Runs asynchronous jobs (typically child processes) with at most
+ * `concurrency` of them in flight.
+ *
+ * @format
+ */
+const os = require("os");
+
+// `jobs` are functions returning promises. Resolves to their results in
+// order; a failed job yields its error instead of aborting the others.
+async function pool(jobs, concurrency = os.cpus().length) {
+  const results = new Array(jobs.length);
+  let next = 0;
+
+  const worker = async () => {
+    while (next < jobs.length) {
+      const i = next++;
+      try {
+        results[i] = await jobs[i]();
+      } catch (error) {
+        results[i] = error instanceof Error ? error : new Error(error);
+      }
+    }
+  };
+
+  await Promise.all(Array.from({ length: Math.min(concurrency, jobs.length) }, worker));
+  return results;
+}
+
+module.exports = {
+  pool,
+};
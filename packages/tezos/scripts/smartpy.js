@@ -0,0 +1,104 @@
+/**
+ * Thin wrapper around the SmartPy CLI used by the build and benchmark
+ * scripts. The contracts read their configuration flags (`readable`,
+ * `force_layouts`, `lazy_entry_points`, ...) from environment variables, see
+ * `global_parameter` in the token contracts.
+ *
+ * @format
+ */
+const os = require("os");
+const path = require("path");
+const { execFile } = require("child_process");
+
+const root = path.join(__dirname, "..");
+
+const cli =
+  process.env.SMARTPY_CLI || path.join(os.homedir(), "smartpy-cli", "SmartPy.sh");
+
+// contract source -> build/test output directory, as in compile.sh / test.sh
+const contracts = {
+  "contracts/Migrations.py": "migrations",
+  "contracts/compliance/Whitelist.py": "compliance",
+  "contracts/extension/WhitelistValidator.py": "extension",
+  "contracts/token/FA1.2.py": "token",
+  "contracts/wallet/VestingEscrowMinterBurnerWallet.py": "wallet",
+};
+
+// contract source -> the sources its scenarios import
+const imports = {
+  "contracts/extension/WhitelistValidator.py": ["contracts/compliance/Whitelist.py"],
+};
+
+// compilation target -> published artifact under dist/, see post-compile.js
+const dist = {
+  "token/ST12_compiled": "tezos/token/FA1.2",
+  //   "token/ST2_compiled": "tezos/token/FA2",
+  "compliance/Whitelist_compiled": "tezos/compliance/Whitelist",
+  "extension/WhitelistValidator_compiled": "tezos/extension/WhitelistValidator",
+  "wallet/VestingEscrowMinterBurnerWallet_compiled":
+    "tezos/wallet/VestingEscrowMinterBurnerWallet",
+};
+
+// configuration flags read from the environment by `environment_config()`
+const flags = [
+  "debug_mode",
+  "single_asset",
+  "non_fungible",
+  "readable",
+  "force_layouts",
+  "assume_consecutive_token_ids",
+  "lazy_entry_points",
+  "lazy_entry_points_multiple",
+];
+
+function flagsToEnv(flags = {}) {
+  const env = {};
+  for (const [flag, value] of Object.entries(flags)) {
+    env[flag] = value ? "true" : "false";
+  }
+  return env;
+}
+
+function run(command, source, output, flags, extra = []) {
+  return new Promise((resolve, reject) => {
+    execFile(
+      cli,
+      [command, path.join(root, source), output, "--purge", ...extra],
+      {
+        cwd: root,
+        env: { ...process.env, ...flagsToEnv(flags) },
+        maxBuffer: 64 * 1024 * 1024,
+      },
+      (error, stdout, stderr) => {
+        if (error) {
+          error.message += `\n${stdout}${stderr}`;
+          reject(error);
+        } else {
+          resolve(stdout);
+        }
+      }
+    );
+  });
+}
+
+// Compiles the compilation targets of `source` into `output`, e.g.
+// `<output>/ST12_compiled/step_000_cont_0_contract.json`. `extra` are
+// additional CLI arguments.
+function compile(source, output, flags, extra) {
+  return run("compile", source, output, flags, extra);
+}
+
+function test(source, output, flags, extra) {
+  return run("test", source, output, flags, extra);
+}
+
+module.exports = {
+  root,
+  cli,
+  contracts,
+  imports,
+  dist,
+  flags,
+  compile,
+  test,
+};